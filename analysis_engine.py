@@ -0,0 +1,158 @@
+"""
+Analysis Engines
+The analyzer's aggregates computed eagerly with pandas or as one optimized lazy Polars plan
+"""
+
+import numpy as np
+import pandas as pd
+
+from incident_schema import observed_counts
+
+try:
+    import polars as pl
+except ImportError:  # optional: only needed for engine='polars'
+    pl = None
+
+ENGINES = ['pandas', 'polars']
+# Categorical columns the aggregates group by; Polars gets their integer codes
+CODE_COLUMNS = ['incident_main_type', 'city', 'place_type', 'transport_disposition', 'day_of_week',
+                'incident_category']
+VALUE_COLUMNS = ['response_time_minutes', 'total_casualties', 'total_time_minutes', 'units_responded', 'alarm_hour']
+
+
+def available_engines():
+    return [engine for engine in ENGINES if engine != 'polars' or pl is not None]
+
+
+def rank_counts(counts):
+    """Order counts from most to least frequent, ties by label, so every engine lists them alike."""
+    order = np.lexsort((counts.index.astype(str).to_numpy(dtype=object), -counts.to_numpy()))
+    return counts.iloc[order]
+
+
+class PandasAggregates:
+    """Reference engine: every aggregate is materialized eagerly with pandas."""
+
+    def __init__(self, df):
+        self.df = df
+
+    def compute(self):
+        df = self.df
+        response = pd.to_numeric(df['response_time_minutes'], errors='coerce').dropna()
+        casualties = pd.to_numeric(df['total_casualties'], errors='coerce').dropna()
+        response_data = df.dropna(subset=['incident_main_type', 'response_time_minutes'])
+        return {
+            'incident_counts': rank_counts(observed_counts(df['incident_main_type'])),
+            'city_counts': rank_counts(observed_counts(df['city'])),
+            'place_counts': rank_counts(observed_counts(df['place_type'])),
+            'transport_counts': rank_counts(observed_counts(df['transport_disposition'])),
+            'day_counts': rank_counts(df['day_of_week'].value_counts()),
+            'hourly_counts': df.groupby('alarm_hour').size(),
+            'daily_counts': df[df['alarm_datetime'].notna()].groupby(df['alarm_datetime'].dt.date).size(),
+            'units_counts': df['units_responded'].value_counts().sort_index(),
+            'response_by_type': response_data.groupby('incident_main_type', observed=True)['response_time_minutes'].mean(),
+            'response_by_city': df.dropna(subset=['response_time_minutes']).groupby('city', observed=True)['response_time_minutes'].mean(),
+            'time_by_category': df.groupby('incident_category', observed=True)['total_time_minutes'].mean(),
+            'response_stats': {
+                'count': len(response), 'mean': response.mean(), 'median': response.median(),
+                'p90': response.quantile(0.9), 'max': response.max(),
+            },
+            'casualty_stats': {'count': len(casualties), 'sum': casualties.sum(), 'positive': (casualties > 0).sum()},
+        }
+
+
+class PolarsAggregates:
+    """Lazy engine: the same aggregates as one Polars query plan.
+
+    Only the columns the aggregates use are handed to Polars (categoricals as
+    their integer codes, so no strings are copied). Each aggregate is a lazy
+    query over that frame; ``collect_all`` optimizes them together, pushing
+    filters and projections down and sharing common subplans, and runs them
+    on Polars' thread pool. Results are converted back to exactly the
+    pandas objects ``PandasAggregates`` returns.
+    """
+
+    def __init__(self, df):
+        if pl is None:
+            raise ImportError("The polars engine needs the 'polars' package (pip install polars)")
+        self.df = df
+        self.dtypes = {col: df[col].astype('category').dtype for col in CODE_COLUMNS}
+        columns = {col: df[col].astype(self.dtypes[col]).cat.codes.to_numpy() for col in CODE_COLUMNS}
+        columns.update({col: pd.to_numeric(df[col], errors='coerce') for col in VALUE_COLUMNS})
+        columns['alarm_datetime'] = df['alarm_datetime'].dt.tz_convert(None)
+        self.frame = pl.from_pandas(pd.DataFrame(columns)).lazy()
+
+    def _counts(self, col):
+        return self.frame.filter(pl.col(col) >= 0).group_by(col).agg(pl.len().alias('count'))
+
+    def _mean_by(self, key, value, drop_missing=True):
+        rows = self.frame.filter(pl.col(key) >= 0)
+        if drop_missing:
+            rows = rows.filter(pl.col(value).is_not_null())
+        return rows.group_by(key).agg(pl.col(value).mean()).sort(key)
+
+    def _category_counts(self, frame, col, observed=True):
+        counts = np.zeros(len(self.dtypes[col].categories), dtype=np.int64)
+        counts[frame[col].to_numpy()] = frame['count'].to_numpy()
+        index = pd.CategoricalIndex(pd.Categorical.from_codes(np.arange(len(counts)), dtype=self.dtypes[col]), name=col)
+        result = rank_counts(pd.Series(counts, index=index, name='count'))
+        return result[result > 0] if observed else result
+
+    def _category_means(self, frame, key, value):
+        index = pd.CategoricalIndex(pd.Categorical.from_codes(frame[key].to_numpy(), dtype=self.dtypes[key]), name=key)
+        return pd.Series(frame[value].to_numpy().astype(float), index=index, name=value)
+
+    def _value_counts(self, frame, col, name):
+        index = pd.Index(frame[col].to_numpy(), dtype=self.df[col].dtype, name=col)
+        return pd.Series(frame['count'].to_numpy().astype(np.int64), index=index, name=name)
+
+    def compute(self):
+        response = pl.col('response_time_minutes')
+        casualties = pl.col('total_casualties')
+        queries = {
+            **{name: self._counts(col) for name, col in [
+                ('incident_counts', 'incident_main_type'), ('city_counts', 'city'), ('place_counts', 'place_type'),
+                ('transport_counts', 'transport_disposition'), ('day_counts', 'day_of_week')]},
+            'hourly_counts': self.frame.filter(pl.col('alarm_hour').is_not_null())
+                .group_by('alarm_hour').agg(pl.len().alias('count')).sort('alarm_hour'),
+            'daily_counts': self.frame.filter(pl.col('alarm_datetime').is_not_null())
+                .group_by(pl.col('alarm_datetime').dt.date().alias('date')).agg(pl.len().alias('count')).sort('date'),
+            'units_counts': self.frame.filter(pl.col('units_responded').is_not_null())
+                .group_by('units_responded').agg(pl.len().alias('count')).sort('units_responded'),
+            'response_by_type': self._mean_by('incident_main_type', 'response_time_minutes'),
+            'response_by_city': self._mean_by('city', 'response_time_minutes'),
+            'time_by_category': self._mean_by('incident_category', 'total_time_minutes', drop_missing=False),
+            'response_stats': self.frame.select(
+                response.count().alias('count'), response.mean().alias('mean'), response.median().alias('median'),
+                response.quantile(0.9, interpolation='linear').alias('p90'), response.max().alias('max')),
+            'casualty_stats': self.frame.select(
+                casualties.count().alias('count'), casualties.sum().alias('sum'),
+                (casualties > 0).sum().alias('positive')),
+        }
+        frames = dict(zip(queries, pl.collect_all(list(queries.values()))))
+
+        results = {name: self._category_counts(frames[name], col, observed=name != 'day_counts')
+                   for name, col in [('incident_counts', 'incident_main_type'), ('city_counts', 'city'),
+                                     ('place_counts', 'place_type'), ('transport_counts', 'transport_disposition'),
+                                     ('day_counts', 'day_of_week')]}
+        results['hourly_counts'] = self._value_counts(frames['hourly_counts'], 'alarm_hour', None)
+        results['units_counts'] = self._value_counts(frames['units_counts'], 'units_responded', 'count')
+        daily = frames['daily_counts']
+        results['daily_counts'] = pd.Series(daily['count'].to_numpy().astype(np.int64),
+                                            index=pd.Index(daily['date'].to_list(), dtype=object, name='alarm_datetime'))
+        results['response_by_type'] = self._category_means(frames['response_by_type'], 'incident_main_type',
+                                                           'response_time_minutes')
+        results['response_by_city'] = self._category_means(frames['response_by_city'], 'city', 'response_time_minutes')
+        results['time_by_category'] = self._category_means(frames['time_by_category'], 'incident_category',
+                                                           'total_time_minutes')
+        stats = frames['response_stats'].row(0, named=True)
+        results['response_stats'] = {key: np.nan if value is None else value for key, value in stats.items()}
+        results['casualty_stats'] = frames['casualty_stats'].row(0, named=True)
+        return results
+
+
+def compute_aggregates(df, engine='pandas'):
+    """Compute the analyzer's aggregates with the chosen engine ('pandas' or 'polars')."""
+    if engine not in ENGINES:
+        raise ValueError(f"engine must be one of {ENGINES}")
+    return (PolarsAggregates if engine == 'polars' else PandasAggregates)(df).compute()
@@ -0,0 +1,232 @@
+"""
+Cardinality Sketches
+Mergeable HyperLogLog distinct-count estimates with a fixed memory footprint
+"""
+
+import numpy as np
+import pandas as pd
+
+
+def hash_values(values):
+    """Return 64-bit hashes of a column's non-null values."""
+    values = pd.Series(values)
+    values = values[values.notna()]
+    if isinstance(values.dtype, pd.CategoricalDtype):
+        values = values.astype(object)
+    return pd.util.hash_pandas_object(values, index=False).to_numpy(dtype=np.uint64)
+
+
+def _bit_length(x):
+    """Vectorized int.bit_length() for uint64 arrays."""
+    x = x.copy()
+    length = np.zeros(len(x), dtype=np.uint8)
+    for shift in (32, 16, 8, 4, 2, 1):
+        wide = x >= np.uint64(1 << shift)
+        length[wide] += shift
+        x[wide] >>= np.uint64(shift)
+    length += (x > 0).astype(np.uint8)
+    return length
+
+
+class HyperLogLog:
+    """HyperLogLog sketch with 2**precision one-byte registers.
+
+    Relative standard error is about 1.04 / sqrt(2**precision), i.e. ~0.8% at
+    the default precision of 14 (16 KB per sketch).
+    """
+
+    def __init__(self, precision=14):
+        if not 4 <= precision <= 18:
+            raise ValueError(f"Precision must be between 4 and 18, got {precision}")
+        self.precision = precision
+        self.registers = np.zeros(1 << precision, dtype=np.uint8)
+
+    @property
+    def nbytes(self):
+        return self.registers.nbytes
+
+    def update(self, values):
+        """Add a column (any iterable of hashable values) to the sketch."""
+        self.update_hashes(hash_values(values))
+        return self
+
+    def update_hashes(self, hashes):
+        """Add pre-computed 64-bit hashes to the sketch."""
+        if len(hashes) == 0:
+            return self
+        p = self.precision
+        index = (hashes >> np.uint64(64 - p)).astype(np.int64)
+        remainder = hashes & np.uint64((1 << (64 - p)) - 1)
+        rank = (64 - p) - _bit_length(remainder) + 1
+        np.maximum.at(self.registers, index, rank.astype(np.uint8))
+        return self
+
+    def merge(self, other):
+        """Merge another sketch of the same precision into this one."""
+        if other.precision != self.precision:
+            raise ValueError("Cannot merge sketches with different precision")
+        np.maximum(self.registers, other.registers, out=self.registers)
+        return self
+
+    def copy(self):
+        sketch = HyperLogLog(self.precision)
+        sketch.registers = self.registers.copy()
+        return sketch
+
+    def estimate(self):
+        """Return the estimated number of distinct values."""
+        m = len(self.registers)
+        alpha = 0.7213 / (1 + 1.079 / m)
+        raw = alpha * m * m / np.sum(np.ldexp(1.0, -self.registers.astype(np.int64)))
+        zeros = int(np.count_nonzero(self.registers == 0))
+        # Small-range correction: linear counting while many registers are still empty
+        if raw <= 2.5 * m and zeros > 0:
+            return int(round(m * np.log(m / zeros)))
+        return int(round(raw))
+
+    def __len__(self):
+        return self.estimate()
+
+
+def distinct_count(values, exact=False, precision=14):
+    """Count distinct non-null values exactly (nunique) or with a HyperLogLog sketch."""
+    if exact:
+        return int(pd.Series(values).nunique())
+    return HyperLogLog(precision).update(values).estimate()
+
+
+class PartitionedCardinality:
+    """Mergeable distinct-count sketches per column and per partition.
+
+    Partitions are (day, city, incident type, response-time bucket) and are
+    looked up through a MultiIndex, so updates stay vectorized. Each
+    partition keeps a sparse HyperLogLog (only its non-zero registers), so a
+    filtered distinct count is the max-merge of the selected partitions'
+    registers and memory is bounded by partitions x 2**precision bytes.
+    The response-time bucket is ceil(minutes), which makes "response time <= N"
+    filters exact for whole minutes.
+    """
+
+    PARTITION_COLUMNS = ['day', 'city', 'incident_main_type', 'response_bucket']
+
+    def __init__(self, columns, precision=12):
+        # Register indices are packed into 16 bits beside the partition id
+        if not 4 <= precision <= 16:
+            raise ValueError(f"Precision must be between 4 and 16, got {precision}")
+        self.columns = list(columns)
+        self.precision = precision
+        self._partition_index = None
+        self._entries = {col: [] for col in self.columns}
+        self._compacted = {col: None for col in self.columns}
+
+    @classmethod
+    def from_frame(cls, df, columns, precision=12):
+        """Build the partitioned sketches for a frame."""
+        return cls(columns, precision=precision).update(df)
+
+    @property
+    def partitions(self):
+        """Return the partition keys as a frame indexed by partition id."""
+        if self._partition_index is None:
+            return pd.DataFrame(columns=self.PARTITION_COLUMNS)
+        return self._partition_index.to_frame(index=False)
+
+    @property
+    def nbytes(self):
+        """Approximate memory held by the compacted sketch entries."""
+        total = 0
+        for col in self.columns:
+            partitions, registers, ranks = self._compact(col)
+            total += partitions.nbytes + registers.nbytes + ranks.nbytes
+        return total
+
+    def _partition_keys(self, df):
+        """Return the partition key columns for a frame (days since epoch, -1 if unknown)."""
+        alarm = pd.to_datetime(df['alarm_datetime'], errors='coerce', utc=True)
+        day = alarm.to_numpy(dtype='datetime64[D]').astype(np.int64)
+        day[alarm.isna().to_numpy()] = -1
+        response = pd.to_numeric(df['response_time_minutes'], errors='coerce')
+        return pd.DataFrame({
+            'day': day,
+            'city': df['city'].astype(object).fillna('Unknown').to_numpy(),
+            'incident_main_type': df['incident_main_type'].astype(object).fillna('Unknown').to_numpy(),
+            'response_bucket': np.ceil(response).fillna(-1).astype(np.int64).to_numpy(),
+        })
+
+    def update(self, df):
+        """Add a batch of incidents to every column's sketches."""
+        keys = pd.MultiIndex.from_frame(self._partition_keys(df))
+        if self._partition_index is None:
+            self._partition_index = keys.unique()
+        else:
+            new_keys = keys[self._partition_index.get_indexer(keys) < 0].unique()
+            if len(new_keys):
+                self._partition_index = self._partition_index.append(new_keys)
+        row_partitions = self._partition_index.get_indexer(keys).astype(np.int32)
+
+        p = self.precision
+        for col in self.columns:
+            values = df[col]
+            present = values.notna().to_numpy()
+            hashes = hash_values(values)
+            registers = (hashes >> np.uint64(64 - p)).astype(np.uint16)
+            remainder = hashes & np.uint64((1 << (64 - p)) - 1)
+            ranks = ((64 - p) - _bit_length(remainder) + 1).astype(np.uint8)
+            self._entries[col].append((row_partitions[present], registers, ranks))
+            self._compacted[col] = None
+        return self
+
+    def _compact(self, col):
+        """Reduce pending entries to one (partition, register, max rank) triple per register."""
+        if self._compacted[col] is None:
+            if self._entries[col]:
+                partitions = np.concatenate([entry[0] for entry in self._entries[col]])
+                registers = np.concatenate([entry[1] for entry in self._entries[col]])
+                ranks = np.concatenate([entry[2] for entry in self._entries[col]])
+            else:
+                partitions = np.array([], dtype=np.int32)
+                registers = np.array([], dtype=np.uint16)
+                ranks = np.array([], dtype=np.uint8)
+            slot = partitions.astype(np.int64) << 16 | registers
+            order = np.lexsort((ranks, slot))
+            slot, ranks = slot[order], ranks[order]
+            last = np.ones(len(slot), dtype=bool)
+            last[:-1] = slot[1:] != slot[:-1]
+            slot, ranks = slot[last], ranks[last]
+            compacted = ((slot >> 16).astype(np.int32), (slot & 0xFFFF).astype(np.uint16), ranks)
+            self._compacted[col] = compacted
+            self._entries[col] = [compacted]
+        return self._compacted[col]
+
+    def select_partitions(self, start_date=None, end_date=None, city=None, incident_type=None,
+                          max_response_time=None):
+        """Return a boolean mask over partition ids matching the filters."""
+        if self._partition_index is None:
+            return np.array([], dtype=bool)
+        index = self._partition_index
+        mask = np.ones(len(index), dtype=bool)
+        day = index.get_level_values('day').to_numpy()
+        if start_date is not None:
+            mask &= day >= np.datetime64(pd.Timestamp(start_date).date(), 'D').astype(np.int64)
+        if end_date is not None:
+            mask &= (day >= 0) & (day <= np.datetime64(pd.Timestamp(end_date).date(), 'D').astype(np.int64))
+        if city is not None:
+            mask &= index.get_level_values('city').to_numpy() == city
+        if incident_type is not None:
+            mask &= index.get_level_values('incident_main_type').to_numpy() == incident_type
+        if max_response_time is not None:
+            buckets = index.get_level_values('response_bucket').to_numpy()
+            mask &= (buckets >= 0) & (buckets <= max_response_time)
+        return mask
+
+    def sketch(self, col, **filters):
+        """Return a HyperLogLog merged over the partitions matching the filters."""
+        partitions, registers, ranks = self._compact(col)
+        selected = self.select_partitions(**filters)[partitions] if len(partitions) else np.array([], dtype=bool)
+        merged = HyperLogLog(self.precision)
+        np.maximum.at(merged.registers, registers[selected].astype(np.int64), ranks[selected])
+        return merged
+
+    def distinct(self, col, **filters):
+        """Return the estimated distinct count of a column under the filters."""
+        return self.sketch(col, **filters).estimate()
@@ -0,0 +1,200 @@
+"""
+Shared-Memory Column Transport
+Publish a typed incidents frame once and attach to it zero-copy from worker processes
+"""
+
+import pickle
+from multiprocessing import resource_tracker, shared_memory
+
+import numpy as np
+import pandas as pd
+
+ALIGNMENT = 64
+# String columns with at most this many distinct values per row attach as categoricals
+DICTIONARY_RATIO = 0.5
+
+
+def _align(offset):
+    return (offset + ALIGNMENT - 1) // ALIGNMENT * ALIGNMENT
+
+
+def _code_dtype(categories):
+    """Smallest signed integer type pandas uses for codes over this many categories."""
+    for dtype in (np.int8, np.int16, np.int32):
+        if categories < np.iinfo(dtype).max:
+            return dtype
+    return np.int64
+
+
+def _untrack(shm):
+    """Stop this process's resource tracker from unlinking the block when the process exits.
+
+    Blocks outlive the worker that created them and are unlinked explicitly
+    by the owner with ``release``.
+    """
+    try:
+        resource_tracker.unregister(shm._name, 'shared_memory')
+    except Exception:
+        pass
+
+
+def _column_buffers(series):
+    """Split a column into (kind, metadata, [arrays]) with fixed-width arrays only."""
+    dtype = series.dtype
+    if isinstance(dtype, pd.CategoricalDtype):
+        categories = pickle.dumps(dtype.categories, protocol=pickle.HIGHEST_PROTOCOL)
+        return 'categorical', {'ordered': dtype.ordered}, [series.cat.codes.to_numpy(), np.frombuffer(categories, np.uint8)]
+    if isinstance(dtype, pd.DatetimeTZDtype) or np.issubdtype(getattr(dtype, 'type', object), np.datetime64):
+        tz = str(dtype.tz) if isinstance(dtype, pd.DatetimeTZDtype) else None
+        unit = np.datetime_data(series.dt.tz_localize(None).dtype if tz else dtype)[0]
+        values = series.to_numpy(dtype=f'datetime64[{unit}]') if tz is None else \
+            series.dt.tz_convert('UTC').dt.tz_localize(None).to_numpy(dtype=f'datetime64[{unit}]')
+        return 'datetime', {'tz': tz, 'unit': unit}, [values.view(np.int64)]
+    if isinstance(dtype, np.dtype) and dtype.kind in 'biuf':
+        return 'numeric', {}, [series.to_numpy()]
+    if isinstance(series.array, (pd.arrays.IntegerArray, pd.arrays.FloatingArray, pd.arrays.BooleanArray)):
+        # Nullable numerics: values plus a validity mask, both fixed width
+        values = series.to_numpy(dtype=dtype.numpy_dtype, na_value=0)
+        return 'masked', {'dtype': str(dtype)}, [values, series.isna().to_numpy()]
+    # Strings, mixed objects and nullable extension types: dictionary encode
+    codes, uniques = pd.factorize(series, use_na_sentinel=True)
+    codes = codes.astype(_code_dtype(len(uniques)))
+    uniques = pickle.dumps(pd.Index(uniques, dtype=object), protocol=pickle.HIGHEST_PROTOCOL)
+    return 'dictionary', {'dtype': str(dtype)}, [codes, np.frombuffer(uniques, np.uint8)]
+
+
+def _copy_into(shm, buffers, arrays):
+    for spec, array in zip(buffers, arrays):
+        target = np.ndarray(len(array), dtype=np.dtype(spec['dtype']), buffer=shm.buf, offset=spec['offset'])
+        target[:] = array
+
+
+def publish(df, attachments=None):
+    """Copy a frame's columns into one shared-memory block and return its descriptor.
+
+    The descriptor is a small picklable dict; pass it to workers and open a
+    ``SharedFrame`` there. ``attachments`` maps names to picklable objects that
+    belong with the frame (e.g. the tables its codes index); workers read them
+    back with ``SharedFrame.attachment``. The caller owns the block and must
+    ``release`` it.
+    """
+    layout = []
+    offset = 0
+
+    def place(arrays):
+        nonlocal offset
+        buffers = []
+        for array in arrays:
+            array = np.ascontiguousarray(array)
+            offset = _align(offset)
+            buffers.append({'offset': offset, 'dtype': array.dtype.str, 'length': len(array)})
+            offset += array.nbytes
+        return buffers
+
+    for name in df.columns:
+        kind, meta, arrays = _column_buffers(df[name])
+        layout.append((name, kind, meta, place(arrays), arrays))
+    extras = []
+    for name, obj in (attachments or {}).items():
+        payload = [np.frombuffer(pickle.dumps(obj, protocol=pickle.HIGHEST_PROTOCOL), np.uint8)]
+        extras.append((name, place(payload), payload))
+
+    shm = shared_memory.SharedMemory(create=True, size=max(offset, 1))
+    _untrack(shm)
+    columns = []
+    for name, kind, meta, buffers, arrays in layout:
+        _copy_into(shm, buffers, arrays)
+        columns.append({'name': name, 'kind': kind, 'meta': meta, 'buffers': buffers})
+    for name, buffers, payload in extras:
+        _copy_into(shm, buffers, payload)
+    descriptor = {'shm_name': shm.name, 'nbytes': offset, 'rows': len(df), 'columns': columns,
+                  'attachments': {name: buffers[0] for name, buffers, _ in extras}}
+    shm.close()
+    return descriptor
+
+
+def _datetime_array(values, unit, tz):
+    """Wrap UTC datetime64 values (zero-copy where pandas allows) in the column's timezone."""
+    if tz is None:
+        return values
+    try:
+        # tz-aware arrays store UTC values, so the shared buffer can be used as is
+        return pd.arrays.DatetimeArray._simple_new(values, dtype=pd.DatetimeTZDtype(unit, tz))
+    except (AttributeError, TypeError):
+        return pd.DatetimeIndex(values).tz_localize('UTC').tz_convert(tz).array
+
+
+def _decode(codes, uniques):
+    """Materialize dictionary codes, with -1 (missing) decoded as NaN rather than the last value."""
+    if len(uniques) == 0:
+        return np.full(len(codes), np.nan, dtype=object)
+    return np.where(codes >= 0, uniques.take(np.maximum(codes, 0)).to_numpy(), np.nan)
+
+
+class SharedFrame:
+    """A DataFrame whose fixed-width columns are read-only views into shared memory.
+
+    Keep the object alive while the frame is in use: the views point into
+    its mapping.
+    """
+
+    def __init__(self, descriptor):
+        self.descriptor = descriptor
+        self.shm = shared_memory.SharedMemory(name=descriptor['shm_name'])
+        _untrack(self.shm)
+        self.frame = self._build_frame()
+
+    def _view(self, spec):
+        array = np.ndarray(spec['length'], dtype=np.dtype(spec['dtype']), buffer=self.shm.buf, offset=spec['offset'])
+        array.flags.writeable = False
+        return array
+
+    def _build_frame(self):
+        data = {}
+        for column in self.descriptor['columns']:
+            kind, meta = column['kind'], column['meta']
+            views = [self._view(spec) for spec in column['buffers']]
+            if kind == 'numeric':
+                data[column['name']] = views[0]
+            elif kind == 'datetime':
+                values = views[0].view(f"datetime64[{meta['unit']}]")
+                data[column['name']] = _datetime_array(values, meta['unit'], meta['tz'])
+            elif kind == 'masked':
+                array_type = pd.api.types.pandas_dtype(meta['dtype']).construct_array_type()
+                data[column['name']] = array_type(views[0], views[1])
+            elif kind == 'categorical':
+                categories = pickle.loads(views[1].tobytes())
+                data[column['name']] = pd.Categorical.from_codes(views[0], categories=categories, ordered=meta['ordered'])
+            else:
+                uniques = pickle.loads(views[1].tobytes())
+                if uniques.inferred_type == 'string' and len(uniques) <= DICTIONARY_RATIO * self.descriptor['rows']:
+                    # Repetitive strings: categorical over the shared codes
+                    data[column['name']] = pd.Categorical.from_codes(views[0], categories=uniques)
+                else:
+                    # Near-unique strings (ids): decoded once per worker
+                    values = _decode(views[0], uniques)
+                    data[column['name']] = values if meta['dtype'] == 'object' else pd.array(values, dtype=meta['dtype'])
+        return pd.DataFrame(data, copy=False)
+
+    def attachment(self, name):
+        """Unpickle an object published alongside the frame."""
+        return pickle.loads(self._view(self.descriptor['attachments'][name]).tobytes())
+
+    def close(self):
+        """Drop this process's views and unmap the block."""
+        self.frame = None
+        try:
+            self.shm.close()
+        except BufferError:
+            # Views are still referenced elsewhere; the mapping goes away with the process
+            pass
+
+
+def release(descriptor):
+    """Unlink a published block (call once, from the owner, when all workers are done)."""
+    try:
+        shm = shared_memory.SharedMemory(name=descriptor['shm_name'])
+    except FileNotFoundError:
+        return
+    shm.close()
+    shm.unlink()
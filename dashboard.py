@@ -14,7 +14,24 @@ from plotly.subplots import make_subplots
 import folium
 from streamlit_folium import st_folium
 from datetime import datetime, timedelta
+from urllib.parse import urlencode
 import altair as alt
+from rolling_analytics import RollingIncidentMonitor
+from spatial_index import IncidentSpatialIndex
+from location_encoding import LocationEncoder
+from cardinality_sketch import PartitionedCardinality
+from live_aggregates import LiveFeed
+from result_cache import ResultCache
+from figure_cache import FigureCache
+from binning import grid_counts, histogram
+from incident_schema import MARYLAND_BOUNDS, CategoryTables, observed_counts
+from sampling import SampleTiers
+from incident_dataset import IncidentDataset
+from data_export import EXPORT_FORMATS, estimate_export_bytes, export_file_name, iter_export
+from table_view import PAGE_SIZES, SORT_COLUMNS, SortedTableView
+from temporal_cube import TemporalCube
+from memory_budget import MB, MemoryBudget, budget_from_env, read_within_budget
+from geo_validation import UNMAPPABLE, BoundaryIndex, add_geo_flags, mappable
 
 # Page configuration
 st.set_page_config(
@@ -48,9 +65,12 @@ st.markdown("""
 </style>
 """, unsafe_allow_html=True)
 
-@st.cache_data
+@st.cache_resource
 def load_data():
-    """Load and preprocess the emergency incidents data."""
+    """Load and preprocess the emergency incidents data once per process, shared by every session.
+    
+    A CSV that does not fit the memory budget is loaded as a streamed sample.
+    """
     # Try multiple possible file locations
     possible_paths = [
         'NERIS_COMPLETE_INCIDENTS.csv',  # Same directory
@@ -63,7 +83,14 @@ def load_data():
     for file_path in possible_paths:
         try:
             if os.path.exists(file_path):
-                df = pd.read_csv(file_path)
+                budget = get_memory_budget()
+                with budget.stage('read csv', lambda: df):
+                    df = read_within_budget(budget, file_path)
+                data_path = file_path
+                stat = os.stat(file_path)
+                df.attrs['dataset_version'] = f"{os.path.abspath(file_path)}:{stat.st_mtime_ns}:{stat.st_size}"
+                if 'sampled_from' in df.attrs:
+                    df.attrs['dataset_version'] += f":sample{len(df)}"
                 st.success(f"✅ Data loaded successfully from: {file_path}")
                 break
         except Exception as e:
@@ -85,22 +112,63 @@ def load_data():
         """)
         st.stop()
     
-    # Convert datetime columns
-    datetime_cols = ['alarm_datetime', 'arrival_datetime', 'controlled_datetime', 
-                    'last_unit_cleared_datetime', 'incident_created_at']
+    with get_memory_budget().stage('prepare', lambda: df):
+        df = prepare_data(df, data_path)
+    return get_memory_budget().hold('frames', df.attrs['dataset_version'], df)
+
+# Date-range/department slices of a partitioned dataset kept loaded at once
+DATASET_SLICES = 4
+# Larger selections are streamed from the query API instead of built in the dashboard process
+DOWNLOAD_MAX_ROWS = 250_000
+QUERY_SERVICE_URL = os.environ.get('INCIDENTS_QUERY_URL', 'http://127.0.0.1:8765')
+
+def find_dataset():
+    """Return the partitioned Parquet dataset if one exists, else None (the CSV is used)."""
+    possible_roots = [
+        'incidents_dataset',
+        '/Users/test/emergency-incidents-analysis/incidents_dataset',
+        '../incidents_dataset'
+    ]
+    for root in possible_roots:
+        if IncidentDataset.is_dataset(root):
+            return IncidentDataset(root)
+    return None
+
+@st.cache_resource(max_entries=DATASET_SLICES)
+def load_dataset(root, start_date, end_date, departments):
+    """Load only the partitions of the dataset that match the date range and departments.
     
-    for col in datetime_cols:
-        if col in df.columns:
-            df[col] = pd.to_datetime(df[col], errors='coerce', utc=True)
+    Slices are shared by every session; one that does not fit the memory
+    budget is loaded as a sample streamed file by file.
+    """
+    dataset = IncidentDataset(root)
+    budget = get_memory_budget()
+    with budget.stage('read partitions', lambda: df):
+        df = read_within_budget(budget, root, start_date, end_date, list(departments) if departments else None)
+    if len(df) == 0:
+        return df
+    partitions = dataset.prune(start_date, end_date, departments or None)
+    files = [path for partition in partitions for path in partition['files']]
+    newest = max(os.stat(path).st_mtime_ns for path in files)
+    df.attrs['dataset_version'] = f"{os.path.abspath(root)}:{newest}:{len(files)}:{start_date}:{end_date}:{departments}"
+    if 'sampled_from' in df.attrs:
+        df.attrs['dataset_version'] += f":sample{len(df)}"
+    df.attrs['partitions_read'] = {'partitions': len(partitions), 'total_partitions': len(dataset.partitions()),
+                                   'files': len(files)}
+    with budget.stage('prepare', lambda: df):
+        df = prepare_data(df, root)
+    return budget.hold('frames', df.attrs['dataset_version'], df)
+
+def prepare_data(df, data_path):
+    """Location encoding and derived columns shared by every data source (read_incidents already typed the columns)."""
+    # Canonicalize addresses/ZIP codes into compact dictionary-encoded columns
+    LocationEncoder().encode(df)
     
-    # Convert boolean columns
-    bool_cols = ['people_present', 'fire_suppression_present']
-    for col in bool_cols:
-        if col in df.columns:
-            df[col] = df[col].map({'t': True, 'f': False})
+    # Flag missing, zero, swapped and out-of-area coordinates (and city mismatches, given boundaries)
+    add_geo_flags(df, BoundaryIndex.for_data(data_path))
     
     # Extract features - with error handling for datetime operations
-    df['incident_main_type'] = df['incident_type'].str.split('||').str[0]
+    df['incident_main_type'] = df['incident_type'].str.split('||', regex=False).str[0]
     
     # Only extract datetime features if alarm_datetime is properly converted
     if 'alarm_datetime' in df.columns and not df['alarm_datetime'].empty:
@@ -119,11 +187,165 @@ def load_data():
         df['day_of_week'] = 'Unknown' 
         df['date'] = pd.NaT
     
+    # Low-cardinality strings become categoricals over code tables kept beside the data
+    category_tables = CategoryTables.for_data(data_path)
+    category_tables.encode(df)
+    category_tables.save()
+    
     return df
 
-def create_metrics_cards(df, filtered_df):
-    """Create metrics cards for key statistics."""
+@st.cache_resource
+def get_rolling_monitor(_df, dataset_version, window):
+    """Build the rolling-window monitor once per dataset and window size."""
+    monitor = RollingIncidentMonitor.from_frame(_df, window=window)
+    return get_memory_budget().hold('rolling_monitor', (dataset_version, window), monitor)
+
+@st.cache_resource
+def get_spatial_index(_df, dataset_version):
+    """Build the KD-tree over incident locations once per dataset load."""
+    return get_memory_budget().hold('spatial_index', dataset_version, IncidentSpatialIndex(_df))
+
+@st.cache_resource
+def get_location_encoder(_df, dataset_version):
+    """Rebuild the address/ZIP lookup tables for the cached dataset."""
+    return get_memory_budget().hold('location_encoder', dataset_version, LocationEncoder.from_frame(_df))
+
+@st.cache_resource
+def get_sample_tiers(_df, dataset_version):
+    """Precompute the stratified 1K/10K/100K sample tiers once per dataset version."""
+    return get_memory_budget().hold('sample_tiers', dataset_version, SampleTiers(_df))
+
+@st.cache_resource
+def get_table_view(_df, dataset_version):
+    """Precompute the data table's sort orders once per dataset version."""
+    return get_memory_budget().hold('table_view', dataset_version, SortedTableView(_df))
+
+def create_search_map(latitude, longitude, radius_km, results):
+    """Create a map of incidents found around a search point."""
+    m = folium.Map(location=[latitude, longitude], zoom_start=14, tiles='OpenStreetMap')
+    
+    folium.Circle(
+        location=[latitude, longitude],
+        radius=radius_km * 1000,
+        color='purple',
+        fill=False
+    ).add_to(m)
+    
+    for _, row in results.head(500).iterrows():
+        folium.CircleMarker(
+            location=[row['latitude'], row['longitude']],
+            radius=4,
+            popup=f"{row['incident_description']} ({row['distance_km']:.2f} km)",
+            color='red',
+            fill=True,
+            fillOpacity=0.6
+        ).add_to(m)
+    
+    return m
+
+@st.cache_resource
+def get_live_feed(_df, dataset_version, cache_path):
+    """Create the process-wide live feed once per dataset and ingestion cache."""
+    feed = LiveFeed(_df, cache_path, monitor=RollingIncidentMonitor.from_frame(_df, window='1h'))
+    return get_memory_budget().hold('live_feed', (dataset_version, cache_path), feed)
+
+def get_live_figures(aggregates):
+    """Build the live figures once per session, then patch only their trace data."""
+    figures = st.session_state.get('live_figures')
+    if figures is None:
+        figures = {
+            'timeline': go.Figure(go.Scatter(mode='lines', name='Daily Incidents')),
+            'hourly': go.Figure(go.Bar(name='Incidents')),
+            'types': go.Figure(go.Bar(orientation='h', name='Incidents')),
+        }
+        figures['timeline'].update_layout(height=300, title='Incidents per Day (last 90 days)', title_x=0.5)
+        figures['hourly'].update_layout(height=300, title='Incidents by Hour of Day', title_x=0.5)
+        figures['types'].update_layout(height=300, title='Incident Types', title_x=0.5)
+        st.session_state['live_figures'] = figures
+        st.session_state['live_version'] = None
+    
+    # A reload or another dataset slice brings a new feed whose versions restart
+    live_version = (id(aggregates), aggregates.version)
+    if st.session_state['live_version'] != live_version:
+        recent_days = aggregates.daily_counts.sort_index().tail(90)
+        figures['timeline'].data[0].update(x=list(recent_days.index), y=recent_days.values)
+        hourly_counts = aggregates.temporal.hourly_counts()
+        figures['hourly'].data[0].update(x=hourly_counts.index, y=hourly_counts.values)
+        top_types = aggregates.type_counts.sort_values().tail(8)
+        figures['types'].data[0].update(x=top_types.values, y=top_types.index)
+        st.session_state['live_version'] = live_version
+    
+    return figures
+
+def render_live_panel(df, cache_path):
+    """Render live metrics and charts; runs as a fragment so only this panel refreshes."""
+    feed = get_live_feed(df, df.attrs.get('dataset_version'), cache_path)
+    aggregates = feed.poll()
+    
     col1, col2, col3, col4 = st.columns(4)
+    with col1:
+        st.metric("Total Incidents", f"{aggregates.total_incidents:,}", delta=f"{feed.new_rows:,} live")
+    with col2:
+        st.metric("Avg Response Time", f"{aggregates.average_response_time:.1f} min")
+    with col3:
+        st.metric("Last Batch", f"{aggregates.last_batch_size:,} rows")
+    with col4:
+        st.metric("Last Update", aggregates.last_update.strftime('%H:%M:%S') if aggregates.last_update is not None else "N/A")
+    
+    figures = get_live_figures(aggregates)
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        st.plotly_chart(figures['timeline'], use_container_width=True)
+    with col2:
+        st.plotly_chart(figures['hourly'], use_container_width=True)
+    with col3:
+        st.plotly_chart(figures['types'], use_container_width=True)
+    
+    anomalies = feed.monitor.recent_anomalies(limit=5)
+    if len(anomalies) > 0:
+        latest = anomalies.iloc[0]
+        st.warning(f"Latest anomaly: {latest['group']} {latest['metric'].replace('_', ' ')} at "
+                   f"{latest['hour'].strftime('%Y-%m-%d %H:00')} (z={latest['score']:.1f})")
+
+def create_baseline_chart(monitor, group):
+    """Create hourly incident counts against the hour-of-week baseline."""
+    history = monitor.hourly_history(group)
+    
+    fig = go.Figure()
+    fig.add_trace(go.Scatter(x=history['hour'], y=history['incidents'], mode='lines', name='Incidents'))
+    fig.add_trace(go.Scatter(x=history['hour'], y=history['expected'], mode='lines',
+                             name='Hour-of-Week Baseline', line=dict(dash='dash')))
+    
+    fig.update_layout(
+        height=400,
+        title='Hourly Incidents vs Baseline',
+        title_x=0.5,
+        xaxis_title='Hour',
+        yaxis_title='Number of Incidents'
+    )
+    
+    return fig
+
+DISTINCT_COUNT_COLUMNS = ['city', 'zip_code', 'address_line_1', 'incident_type', 'neris_uid']
+
+@st.cache_resource
+def get_cardinality_sketches(_df, dataset_version):
+    """Build per-partition distinct-count sketches once per dataset load."""
+    sketches = PartitionedCardinality.from_frame(_df, DISTINCT_COUNT_COLUMNS)
+    return get_memory_budget().hold('cardinality_sketches', dataset_version, sketches)
+
+def count_distinct(df, filtered_df, column, filter_state, exact=False):
+    """Return (filtered, overall) distinct counts from sketches, or exactly with nunique."""
+    if exact:
+        return filtered_df[column].nunique(), df[column].nunique()
+    sketches = get_cardinality_sketches(df, df.attrs.get('dataset_version'))
+    # The sketches are built per dataset slice, which already applies the departments
+    filters = {key: value for key, value in filter_state.items() if key != 'departments'}
+    return sketches.distinct(column, **filters), sketches.distinct(column)
+
+def create_metrics_cards(df, filtered_df, filter_state, exact_counts=False):
+    """Create metrics cards for key statistics."""
+    col1, col2, col3, col4, col5 = st.columns(5)
     
     with col1:
         st.metric(
@@ -149,116 +371,283 @@ def create_metrics_cards(df, filtered_df):
         )
     
     with col4:
-        unique_cities = filtered_df['city'].nunique()
+        unique_cities, all_cities = count_distinct(df, filtered_df, 'city', filter_state, exact_counts)
         st.metric(
             label="Cities Affected",
             value=f"{unique_cities}",
-            delta=f"{unique_cities - df['city'].nunique():,} vs All Data"
+            delta=f"{unique_cities - all_cities:,} vs All Data"
+        )
+    
+    with col5:
+        unique_addresses, all_addresses = count_distinct(df, filtered_df, 'address_line_1', filter_state, exact_counts)
+        st.metric(
+            label="Addresses Affected" if exact_counts else "Addresses Affected (est.)",
+            value=f"{unique_addresses:,}",
+            delta=f"{unique_addresses - all_addresses:,} vs All Data"
         )
 
-def create_incident_timeline(df):
+@st.cache_resource
+def get_result_cache():
+    """Process-wide cache of filtered aggregates, shared by every session."""
+    return ResultCache(max_entries=512)
+
+def cached_aggregate(chart_id, dataset_version, filter_state, compute):
+    """Return an aggregate of one dataset version from the shared result cache, computing it on a miss."""
+    if filter_state is None:
+        return compute()
+    return get_result_cache().get_or_compute(chart_id, filter_state, compute, dataset_version=dataset_version)
+
+@st.cache_resource
+def get_figure_cache():
+    """Process-wide cache of serialized chart figures, shared by every session."""
+    return FigureCache(max_entries=512)
+
+def cached_figure(chart_id, dataset_version, filter_state, build, updates):
+    """Return a chart of one dataset version from the figure cache, patching its template's data on a miss."""
+    if filter_state is None:
+        return build()
+    return get_figure_cache().get_figure(chart_id, filter_state, build, updates, dataset_version=dataset_version)
+
+def export_url(filter_state, fmt, columns):
+    """Query API /export URL for the active filters."""
+    params = {
+        'start': filter_state['start_date'], 'end': filter_state['end_date'],
+        'city': filter_state['city'], 'incident_type': filter_state['incident_type'],
+        'max_response_time': filter_state['max_response_time'], 'columns': ','.join(columns), 'format': fmt,
+    }
+    return f"{QUERY_SERVICE_URL}/export?{urlencode({key: value for key, value in params.items() if value is not None})}"
+
+@st.cache_resource
+def get_memory_budget():
+    """Process-wide memory budget (INCIDENTS_MEMORY_BUDGET_MB, unlimited if unset) over every session's data.
+    
+    Caches and indexes are evicted in the order listed, cheapest to rebuild
+    first; the loaded frames and the live feed are only accounted.
+    """
+    budget = MemoryBudget(budget_from_env())
+    evictable = {
+        'figure_cache': (get_figure_cache, lambda: get_figure_cache().invalidate()),
+        'result_cache': (get_result_cache, lambda: get_result_cache().invalidate()),
+        'sample_tiers': (None, get_sample_tiers.clear),
+        'table_view': (None, get_table_view.clear),
+        'spatial_index': (None, get_spatial_index.clear),
+        'cardinality_sketches': (None, get_cardinality_sketches.clear),
+        'location_encoder': (None, get_location_encoder.clear),
+        'rolling_monitor': (None, get_rolling_monitor.clear),
+    }
+    for priority, (name, (get, evict)) in enumerate(evictable.items()):
+        budget.track(name, get, priority, evict)
+    budget.track('live_feed', priority=len(evictable))
+    budget.track('frames', priority=len(evictable) + 1)
+    return budget
+
+def create_incident_timeline(df, filter_state=None):
     """Create timeline visualization of incidents."""
-    daily_counts = df.groupby('date').size().reset_index(name='count')
-    daily_counts['date'] = pd.to_datetime(daily_counts['date'])
-    
-    fig = px.line(
-        daily_counts, 
-        x='date', 
-        y='count',
-        title='Emergency Incidents Over Time',
-        labels={'count': 'Number of Incidents', 'date': 'Date'}
-    )
+    dataset_version = df.attrs.get('dataset_version')
     
-    fig.update_layout(
-        height=400,
-        showlegend=False,
-        title_x=0.5
-    )
+    def compute():
+        daily_counts = df.groupby('date').size().reset_index(name='count')
+        daily_counts['date'] = pd.to_datetime(daily_counts['date'])
+        return daily_counts
     
-    return fig
+    daily_counts = cached_aggregate('incident_timeline', dataset_version, filter_state, compute)
+    
+    def build():
+        fig = px.line(
+            daily_counts, 
+            x='date', 
+            y='count',
+            title='Emergency Incidents Over Time',
+            labels={'count': 'Number of Incidents', 'date': 'Date'}
+        )
+        
+        fig.update_layout(
+            height=400,
+            showlegend=False,
+            title_x=0.5
+        )
+        
+        return fig
+    
+    return cached_figure('incident_timeline', dataset_version, filter_state, build, lambda: {
+        'data.0.x': daily_counts['date'],
+        'data.0.y': daily_counts['count'],
+    })
 
-def create_incident_type_chart(df):
+def create_incident_type_chart(df, filter_state=None):
     """Create incident type distribution chart."""
-    incident_counts = df['incident_main_type'].value_counts().head(8)
-    
-    fig = px.bar(
-        x=incident_counts.values,
-        y=incident_counts.index,
-        orientation='h',
-        title='Most Common Incident Types',
-        labels={'x': 'Number of Incidents', 'y': 'Incident Type'},
-        color=incident_counts.values,
-        color_continuous_scale='viridis'
-    )
+    dataset_version = df.attrs.get('dataset_version')
+    incident_counts = cached_aggregate('incident_types', dataset_version, filter_state,
+                                       lambda: observed_counts(df['incident_main_type']).head(8))
     
-    fig.update_layout(
-        height=400,
-        title_x=0.5,
-        showlegend=False
-    )
+    def build():
+        fig = px.bar(
+            x=incident_counts.values,
+            y=incident_counts.index,
+            orientation='h',
+            title='Most Common Incident Types',
+            labels={'x': 'Number of Incidents', 'y': 'Incident Type'},
+            color=incident_counts.values,
+            color_continuous_scale='viridis'
+        )
+        
+        fig.update_layout(
+            height=400,
+            title_x=0.5,
+            showlegend=False
+        )
+        
+        return fig
     
-    return fig
+    return cached_figure('incident_types', dataset_version, filter_state, build, lambda: {
+        'data.0.x': incident_counts.values,
+        'data.0.y': incident_counts.index,
+        'data.0.marker.color': incident_counts.values,
+    })
 
-def create_response_time_distribution(df):
-    """Create response time distribution chart."""
-    fig = px.histogram(
-        df,
-        x='response_time_minutes',
-        nbins=30,
-        title='Response Time Distribution',
-        labels={'response_time_minutes': 'Response Time (minutes)', 'count': 'Frequency'}
-    )
+def create_response_time_distribution(df, filter_state=None):
+    """Create response time distribution chart from server-side bins."""
+    dataset_version = df.attrs.get('dataset_version')
+    response_bins = cached_aggregate('response_histogram', dataset_version, filter_state,
+                                     lambda: histogram(df['response_time_minutes'], bins=30))
+    avg_response = cached_aggregate('average_response', dataset_version, filter_state, lambda: df['response_time_minutes'].mean())
     
-    # Add average line
-    avg_response = df['response_time_minutes'].mean()
-    fig.add_vline(
-        x=avg_response,
-        line_dash="dash",
-        line_color="red",
-        annotation_text=f"Average: {avg_response:.1f} min"
-    )
+    def build():
+        fig = px.bar(
+            x=response_bins['centers'],
+            y=response_bins['counts'],
+            title='Response Time Distribution',
+            labels={'x': 'Response Time (minutes)', 'y': 'Frequency'}
+        )
+        fig.update_traces(width=response_bins['widths'])
+        
+        # Add average line
+        fig.add_vline(
+            x=avg_response,
+            line_dash="dash",
+            line_color="red",
+            annotation_text=f"Average: {avg_response:.1f} min"
+        )
+        
+        fig.update_layout(
+            height=400,
+            title_x=0.5,
+            showlegend=False,
+            bargap=0
+        )
+        
+        return fig
     
-    fig.update_layout(
-        height=400,
-        title_x=0.5,
-        showlegend=False
+    return cached_figure('response_distribution', dataset_version, filter_state, build, lambda: {
+        'data.0.x': response_bins['centers'],
+        'data.0.y': response_bins['counts'],
+        'data.0.width': response_bins['widths'],
+        'layout.shapes.0.x0': avg_response,
+        'layout.shapes.0.x1': avg_response,
+        'layout.annotations.0.x': avg_response,
+        'layout.annotations.0.text': f"Average: {avg_response:.1f} min",
+    })
+
+def create_response_control_density(df, filter_state=None):
+    """Create a binned density heatmap of response time vs control time."""
+    dataset_version = df.attrs.get('dataset_version')
+    density = cached_aggregate(
+        'response_control_density', dataset_version, filter_state,
+        lambda: grid_counts(df['response_time_minutes'], df['control_time_minutes'], bins=60)
     )
+    x_centers = (density['x_edges'][:-1] + density['x_edges'][1:]) / 2
+    y_centers = (density['y_edges'][:-1] + density['y_edges'][1:]) / 2
+    # Log scale so sparse tails stay visible next to the dense core
+    with np.errstate(divide='ignore'):
+        log_counts = np.where(density['counts'] > 0, np.log10(density['counts']), np.nan).T
     
-    return fig
+    def build():
+        fig = go.Figure(go.Heatmap(
+            x=x_centers,
+            y=y_centers,
+            z=log_counts,
+            colorscale='Viridis',
+            colorbar=dict(title='log10(incidents)'),
+            hovertemplate='Response: %{x:.1f} min<br>Control: %{y:.1f} min<br>log10(incidents): %{z:.2f}<extra></extra>'
+        ))
+        
+        fig.update_layout(
+            height=400,
+            title='Response Time vs Control Time',
+            title_x=0.5,
+            xaxis_title='Response Time (minutes)',
+            yaxis_title='Control Time (minutes)'
+        )
+        
+        return fig
+    
+    return cached_figure('response_control_density', dataset_version, filter_state, build, lambda: {
+        'data.0.x': x_centers,
+        'data.0.y': y_centers,
+        'data.0.z': log_counts,
+    })
 
-def create_hourly_pattern_chart(df):
+def get_temporal_cube(df, filter_state):
+    """Hour-of-week cube of the rows in the date range and under the response cap.
+    
+    City and incident type filters are slices of the cube, so it is only
+    rebuilt when the date range or the response cap changes.
+    """
+    cube_state = {key: value for key, value in filter_state.items() if key not in ('city', 'incident_type')}
+    
+    def build():
+        rows = df
+        if cube_state['start_date'] is not None:
+            alarm_date = rows['alarm_datetime'].dt.date
+            rows = rows[(alarm_date >= cube_state['start_date']) & (alarm_date <= cube_state['end_date'])]
+        rows = rows[rows['response_time_minutes'] <= cube_state['max_response_time']]
+        return TemporalCube.from_frame(rows)
+    
+    return cached_aggregate('temporal_cube', df.attrs.get('dataset_version'), cube_state, build)
+
+def create_hourly_pattern_chart(cube, dataset_version, filter_state):
     """Create hourly incident pattern chart."""
-    hourly_counts = df.groupby('alarm_hour').size()
-    
-    fig = px.bar(
-        x=hourly_counts.index,
-        y=hourly_counts.values,
-        title='Incidents by Hour of Day',
-        labels={'x': 'Hour of Day', 'y': 'Number of Incidents'},
-        color=hourly_counts.values,
-        color_continuous_scale='plasma'
-    )
+    hourly_counts = cube.hourly_counts(filter_state['city'], filter_state['incident_type'])
     
-    fig.update_layout(
-        height=400,
-        title_x=0.5,
-        showlegend=False,
-        xaxis=dict(tickmode='linear', tick0=0, dtick=2)
-    )
+    def build():
+        fig = px.bar(
+            x=hourly_counts.index,
+            y=hourly_counts.values,
+            title='Incidents by Hour of Day',
+            labels={'x': 'Hour of Day', 'y': 'Number of Incidents'},
+            color=hourly_counts.values,
+            color_continuous_scale='plasma'
+        )
+        
+        fig.update_layout(
+            height=400,
+            title_x=0.5,
+            showlegend=False,
+            xaxis=dict(tickmode='linear', tick0=0, dtick=2)
+        )
+        
+        return fig
     
-    return fig
+    return cached_figure('hourly_pattern', dataset_version, filter_state, build, lambda: {
+        'data.0.x': hourly_counts.index,
+        'data.0.y': hourly_counts.values,
+        'data.0.marker.color': hourly_counts.values,
+    })
 
-def create_geographic_map(df):
+def create_geographic_map(df, samples):
     """Create geographic map of incidents."""
-    # Sample data for performance if too many points
-    if len(df) > 1000:
-        df_sample = df.sample(n=1000)
-    else:
-        df_sample = df
+    # Only plausible coordinates are plotted; a few (0, 0) or swapped points would drag the center away
+    located = df[mappable(df)]
+    
+    # Stable stratified sample so rare incident types and small cities stay on the map
+    df_sample = samples.sample(located, n=1000)
     
     # Create base map centered on Maryland
-    center_lat = df['latitude'].mean()
-    center_lon = df['longitude'].mean()
+    if len(located):
+        center_lat, center_lon = located['latitude'].mean(), located['longitude'].mean()
+    else:
+        center_lat = (MARYLAND_BOUNDS['lat_min'] + MARYLAND_BOUNDS['lat_max']) / 2
+        center_lon = (MARYLAND_BOUNDS['lon_min'] + MARYLAND_BOUNDS['lon_max']) / 2
     
     m = folium.Map(
         location=[center_lat, center_lon],
@@ -295,66 +684,156 @@ def create_geographic_map(df):
     
     return m
 
-def create_city_comparison(df):
+def create_city_comparison(df, filter_state=None):
     """Create city comparison chart."""
-    city_stats = df.groupby('city').agg({
-        'incident_number': 'count',
-        'response_time_minutes': 'mean',
-        'total_casualties': 'sum'
-    }).round(2)
-    
-    city_stats = city_stats.sort_values('incident_number', ascending=False).head(10)
-    city_stats.columns = ['Total Incidents', 'Avg Response Time', 'Total Casualties']
-    
-    fig = make_subplots(
-        rows=1, cols=3,
-        subplot_titles=['Total Incidents', 'Avg Response Time (min)', 'Total Casualties'],
-        specs=[[{"secondary_y": False}, {"secondary_y": False}, {"secondary_y": False}]]
-    )
+    dataset_version = df.attrs.get('dataset_version')
     
-    # Total incidents
-    fig.add_trace(
-        go.Bar(
-            x=city_stats.index,
-            y=city_stats['Total Incidents'],
-            name='Total Incidents',
-            marker_color='lightblue'
-        ),
-        row=1, col=1
-    )
+    def compute():
+        city_stats = df.groupby('city', observed=True).agg({
+            'incident_number': 'count',
+            'response_time_minutes': 'mean',
+            'total_casualties': 'sum'
+        }).round(2)
+        
+        city_stats = city_stats.sort_values('incident_number', ascending=False).head(10)
+        city_stats.columns = ['Total Incidents', 'Avg Response Time', 'Total Casualties']
+        return city_stats
     
-    # Average response time
-    fig.add_trace(
-        go.Bar(
-            x=city_stats.index,
-            y=city_stats['Avg Response Time'],
-            name='Avg Response Time',
-            marker_color='lightgreen'
-        ),
-        row=1, col=2
-    )
+    city_stats = cached_aggregate('city_comparison', dataset_version, filter_state, compute)
     
-    # Total casualties
-    fig.add_trace(
-        go.Bar(
-            x=city_stats.index,
-            y=city_stats['Total Casualties'],
-            name='Total Casualties',
-            marker_color='lightcoral'
-        ),
-        row=1, col=3
-    )
+    def build():
+        fig = make_subplots(
+            rows=1, cols=3,
+            subplot_titles=['Total Incidents', 'Avg Response Time (min)', 'Total Casualties'],
+            specs=[[{"secondary_y": False}, {"secondary_y": False}, {"secondary_y": False}]]
+        )
+        
+        # Total incidents
+        fig.add_trace(
+            go.Bar(
+                x=city_stats.index,
+                y=city_stats['Total Incidents'],
+                name='Total Incidents',
+                marker_color='lightblue'
+            ),
+            row=1, col=1
+        )
+        
+        # Average response time
+        fig.add_trace(
+            go.Bar(
+                x=city_stats.index,
+                y=city_stats['Avg Response Time'],
+                name='Avg Response Time',
+                marker_color='lightgreen'
+            ),
+            row=1, col=2
+        )
+        
+        # Total casualties
+        fig.add_trace(
+            go.Bar(
+                x=city_stats.index,
+                y=city_stats['Total Casualties'],
+                name='Total Casualties',
+                marker_color='lightcoral'
+            ),
+            row=1, col=3
+        )
+        
+        fig.update_layout(
+            height=400,
+            title_text="Top 10 Cities Comparison",
+            title_x=0.5,
+            showlegend=False
+        )
+        
+        fig.update_xaxes(tickangle=45)
+        
+        return fig
     
-    fig.update_layout(
-        height=400,
-        title_text="Top 10 Cities Comparison",
-        title_x=0.5,
-        showlegend=False
+    return cached_figure('city_comparison', dataset_version, filter_state, build, lambda: {
+        'data.0.x': city_stats.index,
+        'data.0.y': city_stats['Total Incidents'],
+        'data.1.x': city_stats.index,
+        'data.1.y': city_stats['Avg Response Time'],
+        'data.2.x': city_stats.index,
+        'data.2.y': city_stats['Total Casualties'],
+    })
+
+def create_response_by_type_chart(df, filter_state=None):
+    """Create average response time by incident type chart."""
+    dataset_version = df.attrs.get('dataset_version')
+    response_by_type = cached_aggregate(
+        'response_by_type', dataset_version, filter_state,
+        lambda: df.groupby('incident_main_type', observed=True)['response_time_minutes'].mean().sort_values(ascending=False)
     )
     
-    fig.update_xaxes(tickangle=45)
+    def build():
+        return px.bar(
+            x=response_by_type.values,
+            y=response_by_type.index,
+            orientation='h',
+            title='Average Response Time by Incident Type',
+            labels={'x': 'Average Response Time (minutes)', 'y': 'Incident Type'},
+            color=response_by_type.values,
+            color_continuous_scale='reds'
+        )
     
-    return fig
+    return cached_figure('response_by_type', dataset_version, filter_state, build, lambda: {
+        'data.0.x': response_by_type.values,
+        'data.0.y': response_by_type.index,
+        'data.0.marker.color': response_by_type.values,
+    })
+
+def create_response_by_day_chart(cube, dataset_version, filter_state):
+    """Create average response time by day of week chart."""
+    response_by_day = cube.response_by_day(filter_state['city'], filter_state['incident_type'])
+    
+    def build():
+        return px.bar(
+            x=response_by_day.index,
+            y=response_by_day.values,
+            title='Average Response Time by Day of Week',
+            labels={'x': 'Day of Week', 'y': 'Average Response Time (minutes)'},
+            color=response_by_day.values,
+            color_continuous_scale='blues'
+        )
+    
+    return cached_figure('response_by_day', dataset_version, filter_state, build, lambda: {
+        'data.0.x': response_by_day.index,
+        'data.0.y': response_by_day.values,
+        'data.0.marker.color': response_by_day.values,
+    })
+
+def create_hour_of_week_heatmap(cube, dataset_version, filter_state, metric='count'):
+    """Create a day-of-week x hour-of-day heatmap of incident counts or mean response times."""
+    grid = cube.heatmap(metric, filter_state['city'], filter_state['incident_type'])
+    label = 'Incidents' if metric == 'count' else 'Avg Response (min)'
+    
+    def build():
+        fig = go.Figure(go.Heatmap(
+            z=grid.values,
+            x=grid.columns,
+            y=grid.index,
+            colorscale='YlOrRd',
+            colorbar=dict(title=label),
+            hovertemplate='%{y} %{x}:00<br>' + label + ': %{z:.1f}<extra></extra>'
+        ))
+        
+        fig.update_layout(
+            title='Incidents by Hour of Week' if metric == 'count' else 'Average Response Time by Hour of Week',
+            title_x=0.5,
+            height=350,
+            xaxis=dict(title='Hour of Day', tickmode='linear', tick0=0, dtick=2),
+            yaxis=dict(autorange='reversed')
+        )
+        
+        return fig
+    
+    return cached_figure(f'hour_of_week_{metric}', dataset_version, filter_state, build, lambda: {
+        'data.0.z': grid.values,
+    })
 
 def main():
     """Main Streamlit application."""
@@ -362,17 +841,20 @@ def main():
     st.markdown('<h1 class="main-header">🚨 Emergency Incidents Dashboard</h1>', unsafe_allow_html=True)
     st.markdown("---")
     
-    # Load data
-    with st.spinner('Loading emergency incidents data...'):
-        df = load_data()
+    # A partitioned dataset is read per date range/department; otherwise the whole CSV is loaded once
+    dataset = find_dataset()
+    if dataset is None:
+        with st.spinner('Loading emergency incidents data...'):
+            df = load_data()
+        min_date = df['alarm_datetime'].dt.date.min()
+        max_date = df['alarm_datetime'].dt.date.max()
+    else:
+        min_date, max_date = dataset.date_bounds()
     
     # Sidebar filters
     st.sidebar.header("🔍 Filters")
     
     # Date range filter
-    min_date = df['alarm_datetime'].dt.date.min()
-    max_date = df['alarm_datetime'].dt.date.max()
-    
     date_range = st.sidebar.date_input(
         "Select Date Range",
         value=(min_date, max_date),
@@ -380,6 +862,28 @@ def main():
         max_value=max_date
     )
     
+    selected_departments = []
+    if dataset is not None:
+        # Department filter; only the matching partitions are read
+        selected_departments = st.sidebar.multiselect("Department", dataset.departments())
+        start_date, end_date = (date_range[0], date_range[1]) if len(date_range) == 2 else (min_date, max_date)
+        with st.spinner('Loading emergency incidents data...'):
+            df = load_dataset(dataset.root, start_date, end_date, tuple(selected_departments))
+        if len(df) == 0:
+            st.warning("No incidents for the selected dates and departments.")
+            st.stop()
+        scan = df.attrs['partitions_read']
+        st.sidebar.caption(f"📁 Read {scan['partitions']:,} of {scan['total_partitions']:,} partitions ({scan['files']:,} files)")
+    
+    if 'sampled_from' in df.attrs:
+        st.warning(f"⚠️ Showing a {len(df):,}-incident sample of {df.attrs['sampled_from']:,}: "
+                   "the full data does not fit the memory budget.")
+    
+    # Shared aggregates are keyed on this session's dataset version; other versions age out of the LRU
+    dataset_version = df.attrs.get('dataset_version')
+    result_cache = get_result_cache()
+    figure_cache = get_figure_cache()
+    
     # Incident type filter
     incident_types = ['All'] + list(df['incident_main_type'].unique())
     selected_incident_type = st.sidebar.selectbox("Incident Type", incident_types)
@@ -413,14 +917,70 @@ def main():
     
     filtered_df = filtered_df[filtered_df['response_time_minutes'] <= max_response_time]
     
+    # Canonical description of the active filters (used by the sketch-based counts)
+    filter_state = {
+        'start_date': date_range[0] if len(date_range) == 2 else None,
+        'end_date': date_range[1] if len(date_range) == 2 else None,
+        'incident_type': None if selected_incident_type == 'All' else selected_incident_type,
+        'city': None if selected_city == 'All' else selected_city,
+        'max_response_time': max_response_time,
+        'departments': tuple(sorted(selected_departments)) or None,
+    }
+    
+    # Live mode: only the live panel reruns on each refresh
+    st.sidebar.header("📡 Live Mode")
+    live_mode = st.sidebar.checkbox("Enable live updates", value=False)
+    if live_mode:
+        refresh_seconds = st.sidebar.slider("Refresh interval (seconds)", 2, 60, 5)
+        cache_path = st.sidebar.text_input("Ingestion cache", value='incident_cache.csv')
+    
+    exact_counts = st.sidebar.checkbox("Exact distinct counts", value=False,
+                                       help="Count distinct values exactly instead of from HyperLogLog sketches")
+    
+    # Shared result cache status and manual data refresh
+    with st.sidebar.expander("⚡ Result Cache"):
+        cache_stats = result_cache.stats()
+        st.write(f"**Hit rate:** {cache_stats['hit_rate']:.0%} ({cache_stats['hits']:,} hits / {cache_stats['misses']:,} misses)")
+        st.write(f"**Entries:** {cache_stats['entries']:,} ({cache_stats['nbytes'] / 1024:,.0f} KB), {cache_stats['evictions']:,} evicted")
+        figure_stats = figure_cache.stats()
+        st.write(f"**Figures:** {figure_stats['hit_rate']:.0%} hit rate, {figure_stats['entries']:,} cached, "
+                 f"{figure_stats['template_builds']:,} built / {figure_stats['trace_updates']:,} data-only updates")
+        if st.button("🔄 Reload data"):
+            load_data.clear()
+            load_dataset.clear()
+            get_live_feed.clear()
+            result_cache.invalidate()
+            figure_cache.invalidate()
+            st.rerun()
+    
+    # Process-wide memory: evict caches and indexes (cheapest to rebuild first) while over the budget
+    memory_budget = get_memory_budget()
+    memory_budget.enforce()
+    with st.sidebar.expander("🧠 Memory"):
+        memory = memory_budget.summary()
+        budget_text = "no budget" if memory['budget_mb'] is None else f"budget {memory['budget_mb']:,.0f} MB"
+        st.write(f"**Process:** {memory['rss_mb']:,.0f} MB resident")
+        st.write(f"**Tracked:** {memory['tracked_mb']:,.1f} MB ({budget_text}), "
+                 f"{memory['evictions']:,} evictions freed {memory['evicted_mb']:,.1f} MB")
+        st.dataframe(pd.DataFrame(list(memory['structures'].items()), columns=['Structure', 'MB']).round(2),
+                     hide_index=True)
+        st.dataframe(memory_budget.stage_report(), hide_index=True)
+    
+    if live_mode:
+        st.subheader("📡 Live Feed")
+        st.fragment(run_every=refresh_seconds)(render_live_panel)(df, cache_path)
+        st.markdown("---")
+    
     # Display metrics
     st.subheader("📊 Key Metrics")
-    create_metrics_cards(df, filtered_df)
+    create_metrics_cards(df, filtered_df, filter_state, exact_counts)
     
     st.markdown("---")
     
     # Main content tabs
-    tab1, tab2, tab3, tab4 = st.tabs(["📈 Overview", "🗺️ Geographic Analysis", "⏱️ Response Analysis", "📋 Data Table"])
+    tab1, tab2, tab3, tab4, tab5 = st.tabs(["📈 Overview", "🗺️ Geographic Analysis", "⏱️ Response Analysis", "📋 Data Table", "🚦 Live Monitor"])
+    
+    temporal_cube = get_temporal_cube(df, filter_state)
     
     with tab1:
         st.subheader("📈 Incident Overview")
@@ -428,18 +988,23 @@ def main():
         col1, col2 = st.columns(2)
         
         with col1:
-            timeline_fig = create_incident_timeline(filtered_df)
+            timeline_fig = create_incident_timeline(filtered_df, filter_state)
             st.plotly_chart(timeline_fig, use_container_width=True)
             
-            hourly_fig = create_hourly_pattern_chart(filtered_df)
+            hourly_fig = create_hourly_pattern_chart(temporal_cube, dataset_version, filter_state)
             st.plotly_chart(hourly_fig, use_container_width=True)
         
         with col2:
-            incident_type_fig = create_incident_type_chart(filtered_df)
+            incident_type_fig = create_incident_type_chart(filtered_df, filter_state)
             st.plotly_chart(incident_type_fig, use_container_width=True)
             
-            response_dist_fig = create_response_time_distribution(filtered_df)
+            response_dist_fig = create_response_time_distribution(filtered_df, filter_state)
             st.plotly_chart(response_dist_fig, use_container_width=True)
+        
+        # Weekly rhythm from the precomputed hour-of-week cube
+        heatmap_metric = st.radio("Hour-of-week heatmap:", ['count', 'response'], horizontal=True,
+                                  format_func=lambda metric: {'count': 'Incidents', 'response': 'Avg Response Time'}[metric])
+        st.plotly_chart(create_hour_of_week_heatmap(temporal_cube, dataset_version, filter_state, heatmap_metric), use_container_width=True)
     
     with tab2:
         st.subheader("🗺️ Geographic Distribution")
@@ -448,8 +1013,12 @@ def main():
         
         with col1:
             st.subheader("Incident Locations Map")
-            incident_map = create_geographic_map(filtered_df)
+            samples = get_sample_tiers(df, df.attrs.get('dataset_version'))
+            incident_map = create_geographic_map(filtered_df, samples)
             st_folium(incident_map, width=700, height=500)
+            unmappable = int(np.count_nonzero(filtered_df['geo_flags'].to_numpy() & UNMAPPABLE))
+            if unmappable:
+                st.caption(f"📍 {unmappable:,} incidents with missing, zero, swapped or out-of-area coordinates are not shown")
         
         with col2:
             st.subheader("Legend")
@@ -463,13 +1032,71 @@ def main():
             
             # City breakdown
             st.subheader("Cities Overview")
-            city_counts = filtered_df['city'].value_counts().head(5)
+            city_counts = observed_counts(filtered_df['city']).head(5)
             for city, count in city_counts.items():
                 st.write(f"**{city}**: {count} incidents")
         
         # City comparison chart
-        city_comparison_fig = create_city_comparison(filtered_df)
+        city_comparison_fig = create_city_comparison(filtered_df, filter_state)
         st.plotly_chart(city_comparison_fig, use_container_width=True)
+        
+        # Repeat locations
+        st.subheader("🔁 Repeat Locations")
+        locations = get_location_encoder(df, df.attrs.get('dataset_version'))
+        repeat_locations = locations.top_repeat_locations(filtered_df, n=10)
+        
+        col1, col2 = st.columns(2)
+        with col1:
+            st.dataframe(repeat_locations.drop(columns='location_id'), use_container_width=True)
+        with col2:
+            if len(repeat_locations) > 0:
+                selected_location = st.selectbox(
+                    "Incident history for:",
+                    repeat_locations['location_id'],
+                    format_func=lambda location_id: ', '.join(str(part) for part in locations.location_label(location_id))
+                )
+                history = locations.location_history(df, selected_location)
+                st.dataframe(
+                    history[['incident_number', 'alarm_datetime', 'incident_description', 'response_time_minutes']],
+                    use_container_width=True
+                )
+        
+        # Search around point
+        st.subheader("🔎 Search Around Point")
+        spatial_index = get_spatial_index(df, df.attrs.get('dataset_version'))
+        
+        col1, col2, col3, col4 = st.columns(4)
+        with col1:
+            search_lat = st.number_input("Latitude", value=float(df.loc[mappable(df), 'latitude'].median()), format="%.5f")
+        with col2:
+            search_lon = st.number_input("Longitude", value=float(df.loc[mappable(df), 'longitude'].median()), format="%.5f")
+        with col3:
+            search_mode = st.selectbox("Search", ["Within radius", "Nearest incidents"])
+        with col4:
+            if search_mode == "Within radius":
+                radius_km = st.number_input("Radius (km)", min_value=0.1, max_value=50.0, value=1.0, step=0.1)
+            else:
+                k_nearest = st.number_input("Number of incidents", min_value=1, max_value=500, value=10)
+        
+        days_back = st.slider("Only incidents in the last N days of data (0 = all)", 0, 365, 30)
+        since = df['alarm_datetime'].max() - pd.Timedelta(days=days_back) if days_back else None
+        
+        if search_mode == "Within radius":
+            search_results = spatial_index.radius_search(search_lat, search_lon, radius_km, since=since)
+        else:
+            search_results = spatial_index.nearest(search_lat, search_lon, k=int(k_nearest), since=since)
+            radius_km = search_results['distance_km'].max() if len(search_results) > 0 else 0.1
+        
+        st.write(f"**{len(search_results):,}** incidents found")
+        if len(search_results) > 0:
+            col1, col2 = st.columns([2, 1])
+            with col1:
+                st_folium(create_search_map(search_lat, search_lon, radius_km, search_results), width=700, height=400)
+            with col2:
+                st.dataframe(
+                    search_results[['incident_number', 'alarm_datetime', 'incident_description', 'distance_km']].round(3),
+                    use_container_width=True
+                )
     
     with tab3:
         st.subheader("⏱️ Response Time Analysis")
@@ -478,55 +1105,43 @@ def main():
         
         with col1:
             # Response time by incident type
-            response_by_type = filtered_df.groupby('incident_main_type')['response_time_minutes'].mean().sort_values(ascending=False)
-            
-            fig = px.bar(
-                x=response_by_type.values,
-                y=response_by_type.index,
-                orientation='h',
-                title='Average Response Time by Incident Type',
-                labels={'x': 'Average Response Time (minutes)', 'y': 'Incident Type'},
-                color=response_by_type.values,
-                color_continuous_scale='reds'
-            )
-            
+            fig = create_response_by_type_chart(filtered_df, filter_state)
             st.plotly_chart(fig, use_container_width=True)
         
         with col2:
             # Response time by day of week
-            day_order = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
-            response_by_day = filtered_df.groupby('day_of_week')['response_time_minutes'].mean().reindex(day_order)
-            
-            fig = px.bar(
-                x=response_by_day.index,
-                y=response_by_day.values,
-                title='Average Response Time by Day of Week',
-                labels={'x': 'Day of Week', 'y': 'Average Response Time (minutes)'},
-                color=response_by_day.values,
-                color_continuous_scale='blues'
-            )
-            
+            fig = create_response_by_day_chart(temporal_cube, dataset_version, filter_state)
             st.plotly_chart(fig, use_container_width=True)
         
+        # Response vs control time, binned server-side
+        density_fig = create_response_control_density(filtered_df, filter_state)
+        st.plotly_chart(density_fig, use_container_width=True)
+        
         # Response time statistics
         st.subheader("📊 Response Time Statistics")
         
+        response_time = filtered_df['response_time_minutes']
+        response_stats = cached_aggregate(
+            'response_stats', dataset_version, filter_state,
+            lambda: [response_time.mean(), response_time.median(), response_time.quantile(0.9), response_time.max()]
+        )
+        
         col1, col2, col3, col4 = st.columns(4)
         
         with col1:
-            st.metric("Mean", f"{filtered_df['response_time_minutes'].mean():.1f} min")
+            st.metric("Mean", f"{response_stats[0]:.1f} min")
         with col2:
-            st.metric("Median", f"{filtered_df['response_time_minutes'].median():.1f} min")
+            st.metric("Median", f"{response_stats[1]:.1f} min")
         with col3:
-            st.metric("90th Percentile", f"{filtered_df['response_time_minutes'].quantile(0.9):.1f} min")
+            st.metric("90th Percentile", f"{response_stats[2]:.1f} min")
         with col4:
-            st.metric("Max", f"{filtered_df['response_time_minutes'].max():.1f} min")
+            st.metric("Max", f"{response_stats[3]:.1f} min")
     
     with tab4:
         st.subheader("📋 Filtered Data Table")
         
         # Display options
-        col1, col2 = st.columns(2)
+        col1, col2, col3, col4 = st.columns([3, 1, 1, 1])
         with col1:
             show_columns = st.multiselect(
                 "Select columns to display:",
@@ -535,20 +1150,83 @@ def main():
             )
         
         with col2:
-            rows_to_show = st.selectbox("Rows to display:", [10, 25, 50, 100], index=1)
+            sort_by = st.selectbox("Sort by:", SORT_COLUMNS + ['(none)'])
+        with col3:
+            ascending = st.radio("Order:", ['Ascending', 'Descending'], index=1) == 'Ascending'
+        with col4:
+            page_size = st.selectbox("Rows per page:", PAGE_SIZES, index=2)
         
         if show_columns:
-            display_df = filtered_df[show_columns].head(rows_to_show)
-            st.dataframe(display_df, use_container_width=True)
-            
-            # Download button
-            csv = display_df.to_csv(index=False)
-            st.download_button(
-                label="Download filtered data as CSV",
-                data=csv,
-                file_name=f"emergency_incidents_filtered_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv",
-                mime="text/csv"
+            # Order the filtered rows from the precomputed sort orders; only the visible page is sliced out
+            table_view = get_table_view(df, df.attrs.get('dataset_version'))
+            sort_column = None if sort_by == '(none)' else sort_by
+            positions = cached_aggregate(
+                'table_positions', dataset_version, dict(filter_state, sort_by=sort_column, ascending=ascending),
+                lambda: table_view.positions(table_view.row_positions(filtered_df), sort_column, ascending)
             )
+            pages = SortedTableView.page_count(positions, page_size)
+            page = st.number_input(f"Page (of {pages:,}):", min_value=1, max_value=pages, value=1, step=1)
+            first_row = (page - 1) * page_size
+            st.caption(f"Rows {min(first_row + 1, len(positions)):,}–{min(first_row + page_size, len(positions)):,} "
+                       f"of {len(positions):,}")
+            st.dataframe(table_view.page(positions, page, page_size, show_columns), use_container_width=True,
+                         hide_index=True)
+            
+            # Download the whole filtered selection; the file is only built on click, chunk by chunk
+            export_format = st.radio("Download format:", list(EXPORT_FORMATS), horizontal=True,
+                                      format_func=lambda fmt: {'csv': 'CSV', 'csv.gz': 'CSV (gzip)', 'parquet': 'Parquet'}[fmt])
+            export_mb = cached_aggregate(
+                'export_size', dataset_version, dict(filter_state, columns=tuple(show_columns), format=export_format),
+                lambda: estimate_export_bytes(filtered_df, export_format, show_columns)
+            ) / MB
+            # The file is buffered whole on click (chunks plus the joined bytes), so it must fit twice
+            if len(filtered_df) <= DOWNLOAD_MAX_ROWS and get_memory_budget().fits(2 * export_mb):
+                st.download_button(
+                    label=f"Download all {len(filtered_df):,} filtered rows (~{export_mb:,.1f} MB)",
+                    data=lambda: b''.join(iter_export(filtered_df, export_format, show_columns)),
+                    file_name=export_file_name(export_format),
+                    mime=EXPORT_FORMATS[export_format][0],
+                    on_click='ignore'
+                )
+            else:
+                st.info(f"📡 {len(filtered_df):,} rows (~{export_mb:,.1f} MB) is too large to build in the dashboard. "
+                        f"Stream it from the query API (`python query_service.py serve <source>`):\n\n"
+                        f"`{export_url(filter_state, export_format, show_columns)}`")
+                if selected_departments:
+                    st.caption("The API serves whichever source it was started on; department filters are not applied.")
+    
+    with tab5:
+        st.subheader("🚦 Rolling Window Monitor")
+        
+        col1, col2 = st.columns(2)
+        with col1:
+            window = st.selectbox("Rolling window:", ['1h', '3h', '24h', '7D'], index=2)
+        with col2:
+            group = st.selectbox("Baseline group:", ['All'] + sorted(df['city'].dropna().unique()))
+        
+        monitor = get_rolling_monitor(df, df.attrs.get('dataset_version'), window)
+        
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            st.metric("Incidents in Window", f"{monitor.rolling_count():,}")
+        with col2:
+            st.metric("Window End", monitor.watermark.strftime('%Y-%m-%d %H:%M') if monitor.watermark is not None else "N/A")
+        with col3:
+            st.metric("Anomalies Flagged", f"{len(monitor.anomalies):,}")
+        
+        st.plotly_chart(create_baseline_chart(monitor, group), use_container_width=True)
+        
+        col1, col2 = st.columns(2)
+        with col1:
+            st.subheader("Rolling Counts and P90 Response")
+            st.dataframe(monitor.rolling_stats().round(1), use_container_width=True)
+        with col2:
+            st.subheader("Recent Anomalies")
+            anomalies = monitor.recent_anomalies(limit=20)
+            if len(anomalies) > 0:
+                st.dataframe(anomalies.round(2), use_container_width=True)
+            else:
+                st.info("No anomalies detected")
     
     # Footer
     st.markdown("---")
@@ -7,46 +7,107 @@ Comprehensive analysis and visualization of NERIS emergency incidents data
 import pandas as pd
 import numpy as np
 import matplotlib.pyplot as plt
+from matplotlib.colors import LogNorm
 import seaborn as sns
 from datetime import datetime, timedelta
 import plotly.express as px
 import plotly.graph_objects as go
 from plotly.subplots import make_subplots
+from rolling_analytics import RollingIncidentMonitor
+from spatial_index import IncidentSpatialIndex
+from location_encoding import LocationEncoder
+from binning import DensityRaster, histogram
+from incident_schema import CategoryTables
+from sampling import SampleTiers
+from incident_dataset import read_incidents
+from analysis_engine import ENGINES, compute_aggregates
+from temporal_cube import TemporalCube
+from memory_budget import MemoryBudget, budget_from_env, estimate_load
+from geo_validation import UNMAPPABLE, BoundaryIndex, add_geo_flags, flag_counts, mappable
+import argparse
+import os
+import time
 import warnings
 warnings.filterwarnings('ignore')
 
+DEFAULT_OUTPUT_DIR = '/Users/test/emergency-incidents-analysis'
+
 # Set style for better visualizations
 plt.style.use('seaborn-v0_8')
 sns.set_palette("husl")
 
 class EmergencyIncidentsAnalyzer:
-    def __init__(self, csv_file_path):
-        """Initialize the analyzer with the CSV data."""
+    def __init__(self, csv_file_path, output_dir=DEFAULT_OUTPUT_DIR, start=None, end=None, departments=None,
+                 engine='pandas', memory_budget_mb=None):
+        """Initialize the analyzer with the CSV data or a partitioned dataset directory.
+        
+        start/end (dates) and departments restrict the incidents loaded; on a
+        partitioned dataset only the matching partitions are read. engine
+        selects how the report aggregates are computed ('pandas' or 'polars').
+        memory_budget_mb (default: $INCIDENTS_MEMORY_BUDGET_MB) bounds the
+        lazily built indexes and caches, which are dropped when over it.
+        """
         self.csv_file = csv_file_path
+        self.output_dir = output_dir
+        self.engine = engine
+        self.query = {'start': start, 'end': end, 'departments': departments}
         self.df = None
-        self.load_data()
+        self.rolling_monitor = None
+        self.spatial_index = None
+        self.locations = None
+        self.categories = None
+        self.boundaries = None
+        self.samples = None
+        self.aggregates = None
+        self.temporal_cube = None
+        self.memory = MemoryBudget(budget_from_env() if memory_budget_mb is None else memory_budget_mb)
+        # Rebuildable structures, evicted first to last; the frame and encoders are only accounted
+        for priority, name in enumerate(['samples', 'spatial_index', 'rolling_monitor', 'aggregates', 'temporal_cube']):
+            self.memory.track(name, lambda name=name: getattr(self, name), priority,
+                              lambda name=name: setattr(self, name, None))
+        self.memory.track('locations', lambda: self.locations, priority=10)
+        self.memory.track('categories', lambda: self.categories, priority=10)
+        self.memory.track('df', lambda: self.df, priority=11)
+        if csv_file_path is not None:
+            self.load_data()
+    
+    @classmethod
+    def from_frame(cls, df, output_dir=DEFAULT_OUTPUT_DIR, locations=None, engine='pandas'):
+        """Create an analyzer over an already loaded and preprocessed frame."""
+        analyzer = cls(None, output_dir=output_dir, engine=engine)
+        analyzer.df = df
+        analyzer.locations = locations if locations is not None else LocationEncoder.from_frame(df)
+        analyzer.categories = CategoryTables.from_frame(df)
+        if 'geo_flags' not in df.columns:
+            add_geo_flags(df)
+        return analyzer
+    
+    def output_path(self, filename):
+        """Return the path of a generated file in the output directory."""
+        return os.path.join(self.output_dir, filename)
         
     def load_data(self):
         """Load and preprocess the emergency incidents data."""
         print("Loading emergency incidents data...")
-        self.df = pd.read_csv(self.csv_file)
-        
-        # Convert datetime columns with proper UTC handling
-        datetime_cols = ['alarm_datetime', 'arrival_datetime', 'controlled_datetime', 
-                        'last_unit_cleared_datetime', 'incident_created_at']
-        
-        for col in datetime_cols:
-            if col in self.df.columns:
-                self.df[col] = pd.to_datetime(self.df[col], errors='coerce', utc=True)
-        
-        # Convert boolean columns
-        bool_cols = ['people_present', 'fire_suppression_present']
-        for col in bool_cols:
-            if col in self.df.columns:
-                self.df[col] = self.df[col].map({'t': True, 'f': False})
+        estimate = estimate_load(self.csv_file, **self.query)
+        if not self.memory.fits(estimate['mb']):
+            print(f"⚠️ About {estimate['mb']:,.0f} MB of incidents exceed the {self.memory.limit_mb:,.0f} MB "
+                  "memory budget; narrow the load with --start/--end/--department")
+        with self.memory.stage('read', lambda: self.df):
+            self.df = read_incidents(self.csv_file, **self.query)
+        
+        # Canonicalize addresses/ZIP codes into shared integer codes
+        with self.memory.stage('encode locations', lambda: self.df):
+            self.locations = LocationEncoder()
+            self.locations.encode(self.df)
+        
+        # Flag implausible coordinates once; maps and the report reuse the geo_flags column
+        with self.memory.stage('validate coordinates', lambda: self.df):
+            self.boundaries = BoundaryIndex.for_data(self.csv_file)
+            add_geo_flags(self.df, self.boundaries)
         
         # Extract incident main type
-        incident_types = self.df['incident_type'].str.split('||').str[0]
+        incident_types = self.df['incident_type'].str.split('||', regex=False).str[0]
         self.df['incident_main_type'] = incident_types.fillna('Unknown')
         
         # Extract hour from alarm datetime (only if valid)
@@ -58,12 +119,118 @@ class EmergencyIncidentsAnalyzer:
             self.df['alarm_hour'] = None
             self.df['day_of_week'] = None
         
+        # Low-cardinality strings become categoricals with codes that are stable across runs
+        with self.memory.stage('encode categories', lambda: self.df):
+            self.categories = CategoryTables.for_data(self.csv_file)
+            self.categories.encode(self.df)
+            self.categories.save()
+        
+        # Rolling windows and the spatial index are built lazily from the freshly loaded data
+        self.rolling_monitor = None
+        self.spatial_index = None
+        self.samples = None
+        self.aggregates = None
+        self.temporal_cube = None
+        
         print(f"Data loaded successfully! {len(self.df)} incidents found.")
         if len(valid_alarm_datetime) > 0:
             print(f"Date range: {self.df['alarm_datetime'].min()} to {self.df['alarm_datetime'].max()}")
         else:
             print("No valid datetime data found.")
         
+    def get_rolling_monitor(self, window='1h'):
+        """Build (once) the rolling-window monitor over the time-sorted incidents."""
+        if self.rolling_monitor is None or self.rolling_monitor.window != pd.Timedelta(window):
+            self.memory.enforce()
+            self.rolling_monitor = RollingIncidentMonitor.from_frame(self.df, window=window)
+        return self.rolling_monitor
+    
+    def update_with_new_incidents(self, new_df):
+        """Append preprocessed new incidents and update the rolling windows incrementally."""
+        self.locations.encode(new_df)
+        self.locations.align(self.df)
+        add_geo_flags(new_df, self.boundaries)
+        self.categories.encode(new_df)
+        self.categories.align(self.df)
+        self.df = pd.concat([self.df, new_df], ignore_index=True)
+        self.spatial_index = None
+        self.samples = None
+        self.aggregates = None
+        if self.temporal_cube is not None:
+            self.temporal_cube.update(new_df)
+        if self.rolling_monitor is not None:
+            return self.rolling_monitor.update(new_df)
+        return []
+    
+    def get_aggregates(self):
+        """Compute (once) the counts, group means and statistics behind the reports with the selected engine."""
+        if self.aggregates is None:
+            self.memory.enforce()
+            started = time.perf_counter()
+            self.aggregates = compute_aggregates(self.df, self.engine)
+            print(f"Aggregates computed with the {self.engine} engine in {time.perf_counter() - started:.3f}s")
+        return self.aggregates
+    
+    def get_temporal_cube(self):
+        """Build (once) the hour-of-week x city x type cube; new incidents are folded in incrementally."""
+        if self.temporal_cube is None:
+            self.memory.enforce()
+            self.temporal_cube = TemporalCube.from_frame(self.df)
+        return self.temporal_cube
+    
+    def get_sample_tiers(self):
+        """Build (once) the seeded stratified sample tiers used by maps and previews."""
+        if self.samples is None:
+            self.memory.enforce()
+            self.samples = SampleTiers(self.df)
+        return self.samples
+    
+    def get_spatial_index(self):
+        """Build (once) the KD-tree over incident locations."""
+        if self.spatial_index is None:
+            self.memory.enforce()
+            self.spatial_index = IncidentSpatialIndex(self.df)
+        return self.spatial_index
+    
+    def find_incidents_near(self, latitude, longitude, radius_km=1.0, days=None):
+        """Find incidents within radius_km of a point, optionally in the last N days of data."""
+        since = self.df['alarm_datetime'].max() - pd.Timedelta(days=days) if days else None
+        return self.get_spatial_index().radius_search(latitude, longitude, radius_km, since=since)
+    
+    def find_nearest_incidents(self, latitude, longitude, k=10):
+        """Find the k incidents nearest to a point."""
+        return self.get_spatial_index().nearest(latitude, longitude, k=k)
+    
+    def find_prior_incidents_nearby(self, incident_number, k=10):
+        """Find the k nearest incidents that happened before a given incident."""
+        positions = np.flatnonzero(self.df['incident_number'].to_numpy() == incident_number)
+        if len(positions) == 0:
+            raise KeyError(f"Incident not found: {incident_number}")
+        return self.get_spatial_index().nearest_to_incident(positions[0], k=k)
+    
+    def get_hotspots(self, top=10, cell_km=0.25, bandwidth_km=0.5):
+        """Return the highest-density incident hotspots from a kernel density grid."""
+        return self.get_spatial_index().hotspots(top=top, cell_km=cell_km, bandwidth_km=bandwidth_km)
+    
+    def get_repeat_locations(self, n=10):
+        """Return the addresses with the most repeat incidents."""
+        return self.locations.top_repeat_locations(self.df, n=n)
+    
+    def get_location_history(self, address, zip_code=None):
+        """Return every incident at an address (optionally within one ZIP code), oldest first."""
+        location_ids = self.locations.find_location_ids(address, zip_code)
+        if len(location_ids) == 0:
+            return self.df.iloc[0:0]
+        history = pd.concat([self.locations.location_history(self.df, location_id) for location_id in location_ids])
+        return history.sort_values('alarm_datetime')
+    
+    def find_incidents_near_address(self, address, zip_code=None, radius_km=1.0, days=None):
+        """Find incidents within radius_km of an address, located from its past incidents."""
+        history = self.get_location_history(address, zip_code).dropna(subset=['latitude', 'longitude'])
+        if len(history) == 0:
+            raise KeyError(f"No located incidents at address: {address}")
+        return self.find_incidents_near(history['latitude'].median(), history['longitude'].median(), radius_km, days)
+    
     def get_summary_statistics(self):
         """Generate comprehensive summary statistics."""
         print("\n" + "="*60)
@@ -83,66 +250,68 @@ class EmergencyIncidentsAnalyzer:
         print(f"Unique Cities: {self.df['city'].nunique()}")
         print(f"Unique Incident Types: {self.df['incident_main_type'].nunique()}")
         
+        aggregates = self.get_aggregates()
+        
         # Response time statistics
         print(f"\nResponse Time Statistics:")
-        response_times = pd.to_numeric(self.df['response_time_minutes'], errors='coerce')
-        valid_response_times = response_times.dropna()
+        response_stats = aggregates['response_stats']
         
-        if len(valid_response_times) > 0:
-            print(f"Average Response Time: {valid_response_times.mean():.2f} minutes")
-            print(f"Median Response Time: {valid_response_times.median():.2f} minutes")
-            print(f"Max Response Time: {valid_response_times.max():.2f} minutes")
+        if response_stats['count'] > 0:
+            print(f"Average Response Time: {response_stats['mean']:.2f} minutes")
+            print(f"Median Response Time: {response_stats['median']:.2f} minutes")
+            print(f"Max Response Time: {response_stats['max']:.2f} minutes")
         else:
             print("No valid response time data")
         
         # Incident type breakdown
         print(f"\nIncident Types Breakdown:")
-        incident_counts = self.df['incident_main_type'].value_counts()
+        incident_counts = aggregates['incident_counts']
         for incident_type, count in incident_counts.head(10).items():
             percentage = (count / len(self.df)) * 100
             print(f"  {incident_type}: {count:,} ({percentage:.1f}%)")
         
         # City breakdown
         print(f"\nTop 10 Cities by Incident Count:")
-        city_counts = self.df['city'].value_counts()
+        city_counts = aggregates['city_counts']
         for city, count in city_counts.head(10).items():
             percentage = (count / len(self.df)) * 100
             print(f"  {city}: {count:,} ({percentage:.1f}%)")
         
         # Casualties and transport
         print(f"\nCasualties and Transport:")
-        casualties = pd.to_numeric(self.df['total_casualties'], errors='coerce')
-        valid_casualties = casualties.dropna()
+        casualty_stats = aggregates['casualty_stats']
         
-        if len(valid_casualties) > 0:
-            print(f"Total Casualties: {valid_casualties.sum():,}")
-            print(f"Incidents with Casualties: {(valid_casualties > 0).sum():,}")
+        if casualty_stats['count'] > 0:
+            print(f"Total Casualties: {casualty_stats['sum']:,}")
+            print(f"Incidents with Casualties: {casualty_stats['positive']:,}")
         else:
             print("No valid casualty data")
         
-        transport_counts = self.df['transport_disposition'].value_counts()
+        transport_counts = aggregates['transport_counts']
+        transport_known = transport_counts.sum()
         print(f"\nTransport Disposition:")
         for disposition, count in transport_counts.items():
             if pd.notna(disposition):
-                percentage = (count / len(self.df[self.df['transport_disposition'].notna()])) * 100
+                percentage = (count / transport_known) * 100
                 print(f"  {disposition}: {count:,} ({percentage:.1f}%)")
         
         return {
             'total_incidents': len(self.df),
             'date_range': (self.df['alarm_datetime'].min(), self.df['alarm_datetime'].max()) if len(valid_datetime) > 0 else (None, None),
-            'avg_response_time': valid_response_times.mean() if len(valid_response_times) > 0 else None,
+            'avg_response_time': response_stats['mean'] if response_stats['count'] > 0 else None,
             'incident_types': incident_counts,
             'city_counts': city_counts,
-            'total_casualties': valid_casualties.sum() if len(valid_casualties) > 0 else 0
+            'total_casualties': casualty_stats['sum'] if casualty_stats['count'] > 0 else 0
         }
     
     def create_incident_type_analysis(self):
         """Analyze incident types and their characteristics."""
         fig, axes = plt.subplots(2, 2, figsize=(15, 12))
         fig.suptitle('Emergency Incident Types Analysis', fontsize=16, fontweight='bold')
+        aggregates = self.get_aggregates()
         
         # 1. Incident type distribution
-        incident_counts = self.df['incident_main_type'].value_counts().head(8)
+        incident_counts = aggregates['incident_counts'].head(8)
         if len(incident_counts) > 0:
             axes[0, 0].pie(incident_counts.values, labels=incident_counts.index, autopct='%1.1f%%')
             axes[0, 0].set_title('Incident Type Distribution')
@@ -151,9 +320,9 @@ class EmergencyIncidentsAnalyzer:
             axes[0, 0].set_title('Incident Type Distribution - No Data')
         
         # 2. Response time by incident type
-        response_data = self.df.dropna(subset=['incident_main_type', 'response_time_minutes'])
-        if len(response_data) > 0:
-            response_by_type = response_data.groupby('incident_main_type')['response_time_minutes'].mean().sort_values(ascending=False).head(8)
+        response_by_type = aggregates['response_by_type']
+        if len(response_by_type) > 0:
+            response_by_type = response_by_type.sort_values(ascending=False).head(8)
             axes[0, 1].bar(range(len(response_by_type)), response_by_type.values)
             axes[0, 1].set_xticks(range(len(response_by_type)))
             axes[0, 1].set_xticklabels(response_by_type.index, rotation=45, ha='right')
@@ -164,8 +333,9 @@ class EmergencyIncidentsAnalyzer:
             axes[0, 1].set_title('Response Time by Type - No Data')
         
         # 3. Incidents by hour of day
-        if self.df['alarm_hour'].notna().any():
-            hourly_incidents = self.df.groupby('alarm_hour').size()
+        temporal_cube = self.get_temporal_cube()
+        if temporal_cube.rows > 0:
+            hourly_incidents = temporal_cube.hourly_counts()
             axes[1, 0].plot(hourly_incidents.index, hourly_incidents.values, marker='o')
             axes[1, 0].set_title('Incidents by Hour of Day')
             axes[1, 0].set_xlabel('Hour')
@@ -176,10 +346,8 @@ class EmergencyIncidentsAnalyzer:
             axes[1, 0].set_title('Incidents by Hour - No Data')
         
         # 4. Incidents by day of week
-        if self.df['day_of_week'].notna().any():
-            day_order = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
-            daily_incidents = self.df['day_of_week'].value_counts().reindex(day_order)
-            daily_incidents = daily_incidents.dropna()
+        if temporal_cube.rows > 0:
+            daily_incidents = temporal_cube.day_counts()
             if len(daily_incidents) > 0:
                 axes[1, 1].bar(daily_incidents.index, daily_incidents.values)
                 axes[1, 1].set_title('Incidents by Day of Week')
@@ -193,16 +361,17 @@ class EmergencyIncidentsAnalyzer:
             axes[1, 1].set_title('Incidents by Day - No Data')
         
         plt.tight_layout()
-        plt.savefig('/Users/test/emergency-incidents-analysis/incident_analysis.png', dpi=300, bbox_inches='tight')
+        plt.savefig(self.output_path('incident_analysis.png'), dpi=300, bbox_inches='tight')
         plt.show()
     
     def create_geographic_analysis(self):
         """Analyze geographic distribution of incidents."""
         fig, axes = plt.subplots(1, 2, figsize=(15, 6))
         fig.suptitle('Geographic Distribution of Emergency Incidents', fontsize=16, fontweight='bold')
+        aggregates = self.get_aggregates()
         
         # 1. Incidents by city
-        city_counts = self.df['city'].value_counts().head(10)
+        city_counts = aggregates['city_counts'].head(10)
         axes[0].barh(range(len(city_counts)), city_counts.values)
         axes[0].set_yticks(range(len(city_counts)))
         axes[0].set_yticklabels(city_counts.index)
@@ -210,12 +379,12 @@ class EmergencyIncidentsAnalyzer:
         axes[0].set_xlabel('Number of Incidents')
         
         # 2. Incidents by place type
-        place_counts = self.df['place_type'].value_counts().head(8)
+        place_counts = aggregates['place_counts'].head(8)
         axes[1].pie(place_counts.values, labels=place_counts.index, autopct='%1.1f%%')
         axes[1].set_title('Incidents by Place Type')
         
         plt.tight_layout()
-        plt.savefig('/Users/test/emergency-incidents-analysis/geographic_analysis.png', dpi=300, bbox_inches='tight')
+        plt.savefig(self.output_path('geographic_analysis.png'), dpi=300, bbox_inches='tight')
         plt.show()
     
     def create_response_time_analysis(self):
@@ -223,29 +392,36 @@ class EmergencyIncidentsAnalyzer:
         fig, axes = plt.subplots(2, 2, figsize=(15, 12))
         fig.suptitle('Response Time and Operational Analysis', fontsize=16, fontweight='bold')
         
-        # 1. Response time distribution
-        axes[0, 0].hist(self.df['response_time_minutes'].dropna(), bins=30, edgecolor='black', alpha=0.7)
+        # 1. Response time distribution (binned in NumPy; only bin counts are drawn)
+        response_bins = histogram(self.df['response_time_minutes'], bins=30)
+        axes[0, 0].bar(response_bins['centers'], response_bins['counts'], width=response_bins['widths'],
+                       edgecolor='black', alpha=0.7)
         axes[0, 0].set_title('Response Time Distribution')
         axes[0, 0].set_xlabel('Response Time (minutes)')
         axes[0, 0].set_ylabel('Frequency')
         
-        # 2. Response time vs control time
-        valid_data = self.df.dropna(subset=['response_time_minutes', 'control_time_minutes'])
-        axes[0, 1].scatter(valid_data['response_time_minutes'], valid_data['control_time_minutes'], 
-                          alpha=0.6, s=20)
+        # 2. Response time vs control time, rasterized in row chunks to a fixed pixel grid
+        raster = DensityRaster.from_frame(self.df, 'response_time_minutes', 'control_time_minutes',
+                                          width=200, height=200)
+        if raster.total > 0:
+            image = np.ma.masked_equal(raster.spread(2), 0)
+            im = axes[0, 1].imshow(image, origin='lower', extent=raster.extent, aspect='auto',
+                                   cmap='viridis', norm=LogNorm(vmin=1, vmax=image.max()),
+                                   interpolation='nearest')
+            fig.colorbar(im, ax=axes[0, 1], label='Incidents per pixel')
         axes[0, 1].set_title('Response Time vs Control Time')
         axes[0, 1].set_xlabel('Response Time (minutes)')
         axes[0, 1].set_ylabel('Control Time (minutes)')
         
         # 3. Units responded distribution
-        units_dist = self.df['units_responded'].value_counts().sort_index()
+        units_dist = self.get_aggregates()['units_counts']
         axes[1, 0].bar(units_dist.index, units_dist.values)
         axes[1, 0].set_title('Distribution of Units Responded')
         axes[1, 0].set_xlabel('Number of Units')
         axes[1, 0].set_ylabel('Number of Incidents')
         
         # 4. Total time by incident category
-        time_by_category = self.df.groupby('incident_category')['total_time_minutes'].mean().sort_values(ascending=False)
+        time_by_category = self.get_aggregates()['time_by_category'].sort_values(ascending=False)
         axes[1, 1].barh(range(len(time_by_category)), time_by_category.values)
         axes[1, 1].set_yticks(range(len(time_by_category)))
         axes[1, 1].set_yticklabels(time_by_category.index)
@@ -253,7 +429,7 @@ class EmergencyIncidentsAnalyzer:
         axes[1, 1].set_xlabel('Total Time (minutes)')
         
         plt.tight_layout()
-        plt.savefig('/Users/test/emergency-incidents-analysis/response_time_analysis.png', dpi=300, bbox_inches='tight')
+        plt.savefig(self.output_path('response_time_analysis.png'), dpi=300, bbox_inches='tight')
         plt.show()
     
     def create_interactive_dashboard(self):
@@ -264,13 +440,13 @@ class EmergencyIncidentsAnalyzer:
             subplot_titles=('Incidents Over Time', 'Response Time by City', 
                           'Incident Types Distribution', 'Geographic Distribution'),
             specs=[[{"secondary_y": False}, {"secondary_y": False}],
-                   [{"secondary_y": False}, {"secondary_y": False}]]
+                   [{"type": "domain"}, {"secondary_y": False}]]
         )
+        aggregates = self.get_aggregates()
         
         # 1. Time series of incidents
-        valid_datetime = self.df['alarm_datetime'].dropna()
-        if len(valid_datetime) > 0:
-            daily_incidents = self.df[self.df['alarm_datetime'].notna()].groupby(self.df['alarm_datetime'].dt.date).size()
+        daily_incidents = aggregates['daily_counts']
+        if len(daily_incidents) > 0:
             fig.add_trace(
                 go.Scatter(x=daily_incidents.index, y=daily_incidents.values, 
                           mode='lines+markers', name='Daily Incidents'),
@@ -284,11 +460,11 @@ class EmergencyIncidentsAnalyzer:
             )
         
         # 2. Response time by city (top 10)
-        top_cities = self.df['city'].value_counts().head(10).index
-        response_data = self.df[self.df['city'].isin(top_cities)].dropna(subset=['response_time_minutes'])
+        top_cities = aggregates['city_counts'].head(10).index
+        city_response_times = aggregates['response_by_city']
+        city_response_times = city_response_times[city_response_times.index.isin(top_cities)]
         
-        if len(response_data) > 0:
-            city_response_times = response_data.groupby('city')['response_time_minutes'].mean()
+        if len(city_response_times) > 0:
             fig.add_trace(
                 go.Bar(x=city_response_times.index, y=city_response_times.values, 
                        name='Avg Response Time'),
@@ -302,7 +478,7 @@ class EmergencyIncidentsAnalyzer:
             )
         
         # 3. Incident types pie chart
-        incident_counts = self.df['incident_main_type'].value_counts().head(6)
+        incident_counts = aggregates['incident_counts'].head(6)
         if len(incident_counts) > 0:
             fig.add_trace(
                 go.Pie(labels=incident_counts.index, values=incident_counts.values, 
@@ -317,11 +493,10 @@ class EmergencyIncidentsAnalyzer:
             )
         
         # 4. Geographic scatter
-        geo_data = self.df.dropna(subset=['latitude', 'longitude'])
+        geo_data = self.df[mappable(self.df)]
         if len(geo_data) > 0:
-            # Sample for performance
-            if len(geo_data) > 1000:
-                geo_data = geo_data.sample(n=1000)
+            # Stable stratified sample for performance
+            geo_data = self.get_sample_tiers().sample(geo_data, n=1000)
             
             fig.add_trace(
                 go.Scatter(x=geo_data['longitude'], y=geo_data['latitude'], 
@@ -345,7 +520,7 @@ class EmergencyIncidentsAnalyzer:
         )
         
         # Save interactive dashboard
-        fig.write_html('/Users/test/emergency-incidents-analysis/interactive_dashboard.html')
+        fig.write_html(self.output_path('interactive_dashboard.html'))
         print("Interactive dashboard saved as 'interactive_dashboard.html'")
         
         return fig
@@ -354,8 +529,12 @@ class EmergencyIncidentsAnalyzer:
         """Generate a detailed analysis report."""
         # Get basic statistics
         valid_datetime = self.df['alarm_datetime'].dropna()
-        response_times = pd.to_numeric(self.df['response_time_minutes'], errors='coerce').dropna()
-        casualties = pd.to_numeric(self.df['total_casualties'], errors='coerce').dropna()
+        aggregates = self.get_aggregates()
+        response_stats = aggregates['response_stats']
+        incident_counts = aggregates['incident_counts']
+        city_counts = aggregates['city_counts']
+        place_counts = aggregates['place_counts']
+        transport_counts = aggregates['transport_counts']
         
         # Handle datetime range
         if len(valid_datetime) > 0:
@@ -365,19 +544,28 @@ class EmergencyIncidentsAnalyzer:
         
         # Handle peak hour/day calculations
         if self.df['alarm_hour'].notna().any():
-            peak_hour = self.df.groupby('alarm_hour').size().idxmax()
-            peak_hour_count = self.df.groupby('alarm_hour').size().max()
+            peak_hour = aggregates['hourly_counts'].idxmax()
+            peak_hour_count = aggregates['hourly_counts'].max()
             peak_hour_str = f"{peak_hour}:00 ({peak_hour_count} incidents)"
         else:
             peak_hour_str = "No hourly data available"
         
         if self.df['day_of_week'].notna().any():
-            busiest_day = self.df['day_of_week'].value_counts().index[0]
-            busiest_day_count = self.df['day_of_week'].value_counts().iloc[0]
+            busiest_day = aggregates['day_counts'].index[0]
+            busiest_day_count = aggregates['day_counts'].iloc[0]
             busiest_day_str = f"{busiest_day} ({busiest_day_count} incidents)"
         else:
             busiest_day_str = "No daily data available"
         
+        # Coordinate quality from the load-time geo validation
+        geo_counts = flag_counts(self.df['geo_flags'])
+        unmappable = int(np.count_nonzero(self.df['geo_flags'].to_numpy() & UNMAPPABLE))
+        coordinate_str = (f"{unmappable:,} incidents ({unmappable / max(len(self.df), 1) * 100:.1f}%) not mappable "
+                          f"({geo_counts['coordinates_zero']:,} zero, {geo_counts['coordinates_swapped']:,} swapped, "
+                          f"{geo_counts['location_outside_maryland']:,} outside the service area)")
+        if self.boundaries is not None:
+            coordinate_str += f"; {geo_counts['location_city_mismatch']:,} located in a different {self.boundaries.column.replace('_', ' ')} than reported"
+        
         report_content = f"""
 # Emergency Incidents Analysis Report
 Generated on: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}
@@ -388,23 +576,24 @@ This report analyzes {len(self.df):,} emergency incidents from the NERIS databas
 ## Key Findings
 
 ### Response Performance
-- **Average Response Time**: {response_times.mean():.2f} minutes
-- **Median Response Time**: {response_times.median():.2f} minutes
-- **90th Percentile Response Time**: {response_times.quantile(0.9):.2f} minutes
+- **Average Response Time**: {response_stats['mean']:.2f} minutes
+- **Median Response Time**: {response_stats['median']:.2f} minutes
+- **90th Percentile Response Time**: {response_stats['p90']:.2f} minutes
 
 ### Incident Patterns
-- **Most Common Incident Type**: {self.df['incident_main_type'].value_counts().index[0]} ({self.df['incident_main_type'].value_counts().iloc[0]:,} incidents)
+- **Most Common Incident Type**: {incident_counts.index[0]} ({incident_counts.iloc[0]:,} incidents)
 - **Peak Hour**: {peak_hour_str}
 - **Busiest Day**: {busiest_day_str}
 
 ### Geographic Distribution
-- **Most Active City**: {self.df['city'].value_counts().index[0]} ({self.df['city'].value_counts().iloc[0]:,} incidents)
-- **Most Common Location Type**: {self.df['place_type'].value_counts().index[0]} ({self.df['place_type'].value_counts().iloc[0]:,} incidents)
+- **Most Active City**: {city_counts.index[0]} ({city_counts.iloc[0]:,} incidents)
+- **Most Common Location Type**: {place_counts.index[0]} ({place_counts.iloc[0]:,} incidents)
+- **Coordinate Quality**: {coordinate_str}
 
 ### Medical Outcomes
-- **Total Casualties**: {casualties.sum():,}
-- **Incidents with Transport**: {(self.df['transport_disposition'] == 'TRANSPORT_BY_EMS_UNIT').sum():,}
-- **Patient Refusal Rate**: {((self.df['transport_disposition'] == 'PATIENT_REFUSED_TRANSPORT').sum() / self.df['transport_disposition'].notna().sum() * 100):.1f}%
+- **Total Casualties**: {aggregates['casualty_stats']['sum']:,}
+- **Incidents with Transport**: {transport_counts.get('TRANSPORT_BY_EMS_UNIT', 0):,}
+- **Patient Refusal Rate**: {(transport_counts.get('PATIENT_REFUSED_TRANSPORT', 0) / transport_counts.sum() * 100):.1f}%
 
 ## Detailed Analysis
 
@@ -412,7 +601,6 @@ This report analyzes {len(self.df):,} emergency incidents from the NERIS databas
 """
         
         # Add incident type breakdown
-        incident_counts = self.df['incident_main_type'].value_counts()
         for incident_type, count in incident_counts.items():
             percentage = (count / len(self.df)) * 100
             report_content += f"- **{incident_type}**: {count:,} incidents ({percentage:.1f}%)\n"
@@ -425,18 +613,44 @@ The incidents are distributed across {self.df['city'].nunique()} cities in Maryl
 """
         
         # Add city breakdown
-        city_counts = self.df['city'].value_counts().head(5)
-        for city, count in city_counts.items():
+        response_by_city = aggregates['response_by_city']
+        for city, count in city_counts.head(5).items():
             percentage = (count / len(self.df)) * 100
-            city_response_data = self.df[self.df['city'] == city]['response_time_minutes']
-            city_response_data = pd.to_numeric(city_response_data, errors='coerce').dropna()
             
-            if len(city_response_data) > 0:
-                avg_response = city_response_data.mean()
+            if city in response_by_city.index:
+                avg_response = response_by_city[city]
                 report_content += f"- **{city}**: {count:,} incidents ({percentage:.1f}%) - Avg Response: {avg_response:.1f} min\n"
             else:
                 report_content += f"- **{city}**: {count:,} incidents ({percentage:.1f}%) - No response data\n"
         
+        # Add repeat locations
+        report_content += "\n### Top Repeat Locations\n"
+        for _, location in self.get_repeat_locations(n=5).iterrows():
+            report_content += f"- **{location['address']}, {location['zip_code']}**: {location['incidents']:,} incidents\n"
+        
+        # Add rolling-window status and recent anomalies
+        monitor = self.get_rolling_monitor(window='24h')
+        report_content += f"""
+
+### Recent Activity (last 24 hours of data)
+- **Incidents in Window**: {monitor.rolling_count():,}
+- **Window End**: {monitor.watermark.strftime('%Y-%m-%d %H:%M') if monitor.watermark is not None else 'N/A'}
+
+"""
+        rolling_stats = monitor.rolling_stats().head(5)
+        for (city, incident_type), row in rolling_stats.iterrows():
+            report_content += f"- **{city} / {incident_type}**: {int(row['incidents']):,} incidents - P90 Response: {row['p90_response_time']:.1f} min\n"
+        
+        anomalies = monitor.recent_anomalies(limit=10)
+        report_content += "\n### Anomalies vs Hour-of-Week Baseline\n"
+        if len(anomalies) > 0:
+            for _, anomaly in anomalies.iterrows():
+                report_content += (f"- **{anomaly['hour'].strftime('%Y-%m-%d %H:00')}** {anomaly['group']} - "
+                                   f"{anomaly['metric'].replace('_', ' ')}: {anomaly['value']:.1f} "
+                                   f"(expected {anomaly['expected']:.1f}, z={anomaly['score']:.1f})\n")
+        else:
+            report_content += "- No anomalies detected\n"
+        
         report_content += """
 
 ### Recommendations
@@ -452,7 +666,7 @@ The incidents are distributed across {self.df['city'].nunique()} cities in Maryl
 """
         
         # Save report
-        with open('/Users/test/emergency-incidents-analysis/analysis_report.md', 'w') as f:
+        with open(self.output_path('analysis_report.md'), 'w') as f:
             f.write(report_content)
         
         print("Detailed analysis report saved as 'analysis_report.md'")
@@ -488,10 +702,24 @@ The incidents are distributed across {self.df['city'].nunique()} cities in Maryl
         print("- interactive_dashboard.html")
         print("- analysis_report.md")
         print("\nAll analysis files have been saved to the current directory.")
+        print("\n" + self.memory.report())
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run the emergency incidents analysis.")
+    parser.add_argument('source', nargs='?', default=os.path.join(DEFAULT_OUTPUT_DIR, 'NERIS_COMPLETE_INCIDENTS.csv'),
+                        help="CSV file or partitioned dataset directory")
+    parser.add_argument('--start', help="First alarm date (YYYY-MM-DD)")
+    parser.add_argument('--end', help="Last alarm date (YYYY-MM-DD)")
+    parser.add_argument('--department', action='append', help="Department NERIS id (repeatable)")
+    parser.add_argument('--engine', choices=ENGINES, default='pandas',
+                        help="Aggregation engine; 'polars' runs them as one lazy, multi-threaded plan")
+    parser.add_argument('--memory-budget', type=float, default=None,
+                        help="Memory budget in MB for the indexes and caches (default: $INCIDENTS_MEMORY_BUDGET_MB)")
+    args = parser.parse_args()
+    
     # Initialize analyzer
-    analyzer = EmergencyIncidentsAnalyzer('/Users/test/emergency-incidents-analysis/NERIS_COMPLETE_INCIDENTS.csv')
+    analyzer = EmergencyIncidentsAnalyzer(args.source, start=args.start, end=args.end, departments=args.department,
+                                          engine=args.engine, memory_budget_mb=args.memory_budget)
     
     # Run complete analysis
     analyzer.run_complete_analysis()
@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+"""
+Streaming Data Export
+Chunked CSV, gzip CSV and Parquet exports of incident selections with bounded memory
+"""
+
+import argparse
+import io
+import zlib
+from datetime import datetime
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+EXPORT_FORMATS = {
+    'csv': ('text/csv', '.csv'),
+    'csv.gz': ('application/gzip', '.csv.gz'),
+    'parquet': ('application/vnd.apache.parquet', '.parquet'),
+}
+DEFAULT_CHUNK_ROWS = 50_000
+
+
+def _chunks(df, rows=None, chunk_rows=DEFAULT_CHUNK_ROWS):
+    """Yield consecutive slices of df, or of the given row positions, chunk_rows at a time."""
+    total = len(df) if rows is None else len(rows)
+    for start in range(0, total, chunk_rows):
+        yield df.iloc[start:start + chunk_rows] if rows is None else df.iloc[rows[start:start + chunk_rows]]
+
+
+def iter_csv(df, columns=None, rows=None, chunk_rows=DEFAULT_CHUNK_ROWS, compress=False):
+    """Yield the selection as UTF-8 CSV bytes, one chunk at a time (gzip-compressed if compress)."""
+    df = df if columns is None else df[columns]
+    # wbits=31 writes a gzip header and trailer around the deflate stream
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31) if compress else None
+    header = True
+    for chunk in _chunks(df, rows, chunk_rows):
+        data = chunk.to_csv(index=False, header=header).encode('utf-8')
+        header = False
+        data = compressor.compress(data) if compressor else data
+        if data:
+            yield data
+    if header:
+        data = df.iloc[:0].to_csv(index=False).encode('utf-8')
+        data = compressor.compress(data) if compressor else data
+        if data:
+            yield data
+    if compressor:
+        yield compressor.flush()
+
+
+class _ChunkSink(io.RawIOBase):
+    """Write-only file object that hands the bytes written so far back on drain()."""
+
+    def __init__(self):
+        self.parts = []
+        self.position = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self.parts.append(bytes(data))
+        self.position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self.position
+
+    def drain(self):
+        data = b''.join(self.parts)
+        self.parts = []
+        return data
+
+
+def _arrow_schema(df):
+    """Arrow schema of the frame; columns that are empty at the start get the type of their values."""
+    schema = pa.Schema.from_pandas(df.iloc[:0], preserve_index=False)
+    for i, field in enumerate(schema):
+        if pa.types.is_null(field.type):
+            values = df[field.name].dropna()
+            if len(values):
+                schema = schema.set(i, field.with_type(pa.array(values.iloc[:1000]).type))
+    return schema
+
+
+def iter_parquet(df, columns=None, rows=None, chunk_rows=DEFAULT_CHUNK_ROWS, compression='zstd'):
+    """Yield the selection as a Parquet file, one row group per chunk."""
+    df = df if columns is None else df[columns]
+    schema = _arrow_schema(df)
+    sink = _ChunkSink()
+    with pq.ParquetWriter(sink, schema, compression=compression) as writer:
+        for chunk in _chunks(df, rows, chunk_rows):
+            writer.write_table(pa.Table.from_pandas(chunk, schema=schema, preserve_index=False))
+            data = sink.drain()
+            if data:
+                yield data
+    yield sink.drain()
+
+
+def iter_export(df, fmt='csv', columns=None, rows=None, chunk_rows=DEFAULT_CHUNK_ROWS):
+    """Yield an export of the selection in one of EXPORT_FORMATS."""
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"format must be one of {sorted(EXPORT_FORMATS)}")
+    if fmt == 'parquet':
+        return iter_parquet(df, columns, rows, chunk_rows)
+    return iter_csv(df, columns, rows, chunk_rows, compress=fmt == 'csv.gz')
+
+
+def estimate_export_bytes(df, fmt='csv', columns=None, sample_rows=1000):
+    """Approximate size of an export, scaled up from an export of the first sample_rows rows."""
+    sample = df.iloc[:sample_rows]
+    if len(sample) == 0:
+        return 0
+    size = sum(len(data) for data in iter_export(sample, fmt, columns))
+    return int(size * len(df) / len(sample))
+
+
+def export_file_name(fmt, prefix='emergency_incidents_filtered'):
+    """Timestamped download name with the format's extension."""
+    return f"{prefix}_{datetime.now().strftime('%Y%m%d_%H%M%S')}{EXPORT_FORMATS[fmt][1]}"
+
+
+def write_export(df, path, fmt='csv', columns=None, rows=None, chunk_rows=DEFAULT_CHUNK_ROWS):
+    """Write an export to disk chunk by chunk; returns the number of bytes written."""
+    written = 0
+    with open(path, 'wb') as f:
+        for data in iter_export(df, fmt, columns, rows, chunk_rows):
+            f.write(data)
+            written += len(data)
+    return written
+
+
+def main():
+    from incident_dataset import read_incidents
+
+    parser = argparse.ArgumentParser(description="Export a slice of the incidents data.")
+    parser.add_argument('source', help="CSV file or partitioned dataset directory")
+    parser.add_argument('output')
+    parser.add_argument('--format', choices=sorted(EXPORT_FORMATS), default='csv')
+    parser.add_argument('--start')
+    parser.add_argument('--end')
+    parser.add_argument('--department', action='append')
+    parser.add_argument('--columns', help="Comma-separated columns (default: all)")
+    parser.add_argument('--chunk-rows', type=int, default=DEFAULT_CHUNK_ROWS)
+    args = parser.parse_args()
+
+    columns = args.columns.split(',') if args.columns else None
+    df = read_incidents(args.source, args.start, args.end, args.department, columns)
+    written = write_export(df, args.output, args.format, chunk_rows=args.chunk_rows)
+    print(f"✅ Exported {len(df):,} rows to {args.output} ({written / 1024 ** 2:.2f} MB)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+"""
+Data Quality Profiler
+Single-pass, chunk-at-a-time profiling of the emergency incidents data
+"""
+
+import json
+import sys
+
+import pandas as pd
+
+from cardinality_sketch import HyperLogLog
+from geo_validation import (GEO_CITY_MISMATCH, GEO_FLAG_NAMES, GEO_OUTSIDE_AREA, GEO_OUTSIDE_BOUNDARIES, GEO_SWAPPED,
+                            GEO_ZERO, BoundaryIndex, geo_flags)
+from incident_schema import DATETIME_COLUMNS, convert_types
+
+
+def _rule_violations(df, boundaries=None):
+    """Return a boolean frame with one column per cross-field consistency rule."""
+    rules = {}
+
+    # Timeline order: alarm -> arrival -> controlled -> last unit cleared
+    timeline = [('arrival_before_alarm', 'arrival_datetime', 'alarm_datetime'),
+                ('controlled_before_arrival', 'controlled_datetime', 'arrival_datetime'),
+                ('cleared_before_controlled', 'last_unit_cleared_datetime', 'controlled_datetime')]
+    for rule, later, earlier in timeline:
+        if later in df.columns and earlier in df.columns:
+            rules[rule] = (df[later] < df[earlier]).to_numpy()
+
+    # Coordinate checks share the geo_flags column maps use (computed here for raw chunks)
+    if 'latitude' in df.columns and 'longitude' in df.columns:
+        flags = df['geo_flags'].to_numpy() if 'geo_flags' in df.columns else geo_flags(df, boundaries)
+        checks = [GEO_OUTSIDE_AREA, GEO_ZERO, GEO_SWAPPED]
+        if boundaries is not None:
+            checks += [GEO_OUTSIDE_BOUNDARIES, GEO_CITY_MISMATCH]
+        for flag in checks:
+            rules[GEO_FLAG_NAMES[flag]] = (flags & flag) != 0
+
+    for col in ['response_time_minutes', 'control_time_minutes', 'total_time_minutes', 'total_casualties']:
+        if col in df.columns:
+            rules[f'negative_{col}'] = (df[col] < 0).to_numpy()
+
+    # Reported response time should match arrival - alarm to within a minute
+    if {'response_time_minutes', 'arrival_datetime', 'alarm_datetime'} <= set(df.columns):
+        derived = (df['arrival_datetime'] - df['alarm_datetime']).dt.total_seconds() / 60
+        rules['response_time_mismatch'] = ((df['response_time_minutes'] - derived).abs() > 1).to_numpy()
+
+    return pd.DataFrame(rules, index=df.index)
+
+
+class DataProfiler:
+    """Streaming data-quality profile: feed raw chunks to ``update``, read ``results``.
+
+    Each chunk is profiled with frame-level vectorized operations (no per-column
+    rescans), and every statistic is mergeable across chunks. With city/ZIP
+    boundaries (see geo_validation.py) the coordinate rules also flag points
+    outside every boundary or in another city's.
+    """
+
+    def __init__(self, precision=14, boundaries=None):
+        self.precision = precision
+        self.boundaries = boundaries
+        self.total_rows = 0
+        self.null_counts = None
+        self.invalid_counts = {}
+        self.minimums = {}
+        self.maximums = {}
+        self.rule_counts = {}
+        self.sketches = {}
+
+    def update(self, chunk):
+        """Profile one chunk of raw (unconverted) rows."""
+        chunk = chunk.copy()
+        self.total_rows += len(chunk)
+
+        nulls = chunk.isna().sum()
+        self.null_counts = nulls if self.null_counts is None else self.null_counts.add(nulls, fill_value=0)
+
+        for col in chunk.columns:
+            self.sketches.setdefault(col, HyperLogLog(self.precision)).update(chunk[col])
+
+        for col, count in convert_types(chunk).items():
+            self.invalid_counts[col] = self.invalid_counts.get(col, 0) + count
+
+        ranged = chunk.select_dtypes(include=['number', 'datetime', 'datetimetz'])
+        for col, value in ranged.min().items():
+            if pd.notna(value):
+                self.minimums[col] = value if col not in self.minimums else min(self.minimums[col], value)
+        for col, value in ranged.max().items():
+            if pd.notna(value):
+                self.maximums[col] = value if col not in self.maximums else max(self.maximums[col], value)
+
+        for rule, count in _rule_violations(chunk, self.boundaries).sum().items():
+            self.rule_counts[rule] = self.rule_counts.get(rule, 0) + int(count)
+        return self
+
+    def missing_percentages(self):
+        """Return the percentage of missing values per column, highest first."""
+        if not self.total_rows:
+            return pd.Series(dtype=float)
+        return (self.null_counts / self.total_rows * 100).sort_values(ascending=False)
+
+    def results(self):
+        """Return the profile as the ``data_quality`` section of database_summary.json."""
+        missing = self.missing_percentages().round(1)
+        quality = {
+            "completeness": {},
+            "missing_data_analysis": {},
+            "distinct_estimates": {col: sketch.estimate() for col, sketch in self.sketches.items()},
+            "value_ranges": {},
+            "invalid_parse_counts": {col: count for col, count in self.invalid_counts.items() if count > 0},
+            "rule_violations": dict(self.rule_counts),
+            "rows_profiled": self.total_rows,
+        }
+
+        # Keep the original column order for completeness (no rows, or no chunks at all, leave it empty)
+        columns = self.null_counts.index if self.total_rows else []
+        for col in columns:
+            quality["completeness"][col] = round(100 - missing[col], 1)
+            if missing[col] > 0:
+                quality["missing_data_analysis"][col] = missing[col]
+
+        for col in self.minimums:
+            low, high = self.minimums[col], self.maximums[col]
+            if col in DATETIME_COLUMNS:
+                low, high = low.isoformat(), high.isoformat()
+            else:
+                low, high = round(float(low), 4), round(float(high), 4)
+            quality["value_ranges"][col] = {"min": low, "max": high}
+
+        return quality
+
+
+def profile_csv(csv_path, chunksize=100_000, precision=14, boundaries=None):
+    """Profile a CSV file in streaming mode without loading it whole."""
+    profiler = DataProfiler(precision=precision, boundaries=boundaries)
+    for chunk in pd.read_csv(csv_path, chunksize=chunksize, dtype=str):
+        profiler.update(chunk)
+    return profiler
+
+
+if __name__ == "__main__":
+    csv_path = sys.argv[1] if len(sys.argv) > 1 else 'NERIS_COMPLETE_INCIDENTS.csv'
+    profiler = profile_csv(csv_path, boundaries=BoundaryIndex.for_data(csv_path))
+    print(json.dumps(profiler.results(), indent=2, default=str))
@@ -5,24 +5,85 @@ Creates a formatted summary of the emergency incidents database
 """
 
 import pandas as pd
+import argparse
 import json
 from datetime import datetime
+from location_encoding import LocationEncoder
+from data_profiler import DataProfiler
+from geo_validation import BoundaryIndex
+from cardinality_sketch import distinct_count
+from incident_schema import CategoryTables, observed_counts
+from incident_dataset import iter_incidents, read_incidents
+from memory_budget import MemoryBudget, budget_from_env, estimate_load
 
-def generate_database_summary():
-    """Generate a comprehensive database summary."""
+DEFAULT_SOURCE = '/Users/test/emergency-incidents-analysis/NERIS_COMPLETE_INCIDENTS.csv'
+
+# Columns the summary reads after profiling; over the memory budget only these are loaded
+SUMMARY_COLUMNS = ['alarm_datetime', 'zip_code', 'address_line_1', 'city', 'place_type', 'incident_type',
+                   'incident_category', 'incident_description', 'total_casualties', 'response_time_minutes',
+                   'units_responded', 'transport_disposition', 'patient_care_evaluation']
+
+def generate_database_summary(exact_counts=False, source=DEFAULT_SOURCE, start=None, end=None, departments=None,
+                              memory_budget_mb=None):
+    """Generate a comprehensive database summary.
+    
+    Distinct counts come from HyperLogLog sketches unless exact_counts is set.
+    source is a CSV file or a partitioned dataset directory; on a dataset only
+    the partitions matching start/end and departments are read. When the data
+    would not fit memory_budget_mb (default: $INCIDENTS_MEMORY_BUDGET_MB) it
+    is profiled chunk by chunk and only the summarized columns are loaded.
+    """
+    memory = MemoryBudget(budget_from_env() if memory_budget_mb is None else memory_budget_mb)
+    loaded = {}
+    memory.track('frame', lambda: loaded.get('df'), priority=1)
+    estimate = estimate_load(source, start, end, departments)
+    chunked = not memory.fits(estimate['mb'])
     
-    # Load the data
-    df = pd.read_csv('/Users/test/emergency-incidents-analysis/NERIS_COMPLETE_INCIDENTS.csv')
+    # Profile data quality on the raw values in a single vectorized pass (streamed when over budget)
+    profiler = DataProfiler(boundaries=BoundaryIndex.for_data(source))
+    memory.track('profiler', lambda: profiler)
+    if chunked:
+        print(f"⚠️ About {estimate['mb']:,.0f} MB of data exceed the {memory.limit_mb:,.0f} MB memory budget; "
+              "profiling in chunks and loading only the summarized columns")
+        with memory.stage('profile (chunked)', lambda: profiler):
+            for chunk in iter_incidents(source, start, end, departments, convert=False):
+                profiler.update(chunk)
+        with memory.stage('read columns', lambda: loaded.get('df')):
+            df = loaded['df'] = read_incidents(source, start, end, departments, SUMMARY_COLUMNS, convert=False)
+        total_columns = len(profiler.null_counts) if profiler.null_counts is not None else len(df.columns)
+    else:
+        with memory.stage('read', lambda: loaded.get('df')):
+            df = loaded['df'] = read_incidents(source, start, end, departments, convert=False)
+        with memory.stage('profile', lambda: profiler):
+            profiler.update(df)
+        total_columns = len(df.columns)
     
     # Convert datetime
     df['alarm_datetime'] = pd.to_datetime(df['alarm_datetime'], errors='coerce', utc=True)
     
+    # Canonicalize addresses/ZIP codes before counting them
+    if exact_counts:
+        raw_unique_zip_codes = distinct_count(df['zip_code'], exact=True)
+    else:
+        raw_unique_zip_codes = profiler.sketches['zip_code'].estimate()
+    locations = LocationEncoder()
+    memory.track('locations', lambda: locations)
+    with memory.stage('encode locations', lambda: df):
+        locations.encode(df)
+        repeat_locations = locations.top_repeat_locations(df, n=5)
+    
+    # Count low-cardinality strings on categorical codes with tables kept beside the CSV
+    with memory.stage('encode categories', lambda: df):
+        category_tables = CategoryTables.for_data(source)
+        category_tables.encode(df)
+        category_tables.save()
+    
     # Basic statistics
     summary = {
         "database_info": {
             "total_records": len(df),
-            "total_columns": len(df.columns),
-            "file_size_mb": round(df.memory_usage(deep=True).sum() / 1024**2, 1),
+            "total_columns": total_columns,
+            "file_size_mb": round(estimate['mb'] if chunked else df.memory_usage(deep=True).sum() / 1024**2, 1),
             "date_range": {
                 "start": df['alarm_datetime'].min().strftime('%Y-%m-%d') if df['alarm_datetime'].notna().any() else "N/A",
                 "end": df['alarm_datetime'].max().strftime('%Y-%m-%d') if df['alarm_datetime'].notna().any() else "N/A",
@@ -30,17 +91,21 @@ def generate_database_summary():
             }
         },
         "geographic_coverage": {
-            "unique_cities": df['city'].nunique(),
-            "unique_zip_codes": df['zip_code'].nunique(),
-            "place_types": df['place_type'].nunique(),
-            "top_cities": df['city'].value_counts().head(5).to_dict()
+            "unique_cities": distinct_count(df['city'], exact=exact_counts),
+            "unique_zip_codes": distinct_count(df['zip_code'], exact=exact_counts),
+            "raw_unique_zip_codes": raw_unique_zip_codes,
+            "unique_locations": len(locations.locations),
+            "place_types": distinct_count(df['place_type'], exact=exact_counts),
+            "top_cities": observed_counts(df['city']).head(5).to_dict(),
+            "top_repeat_addresses": {f"{row['address']}, {row['zip_code']}": int(row['incidents'])
+                                     for _, row in repeat_locations.iterrows()}
         },
         "incident_statistics": {
-            "unique_incident_types": df['incident_type'].nunique(),
-            "unique_incident_categories": df['incident_category'].nunique(),
+            "unique_incident_types": distinct_count(df['incident_type'], exact=exact_counts),
+            "unique_incident_categories": distinct_count(df['incident_category'], exact=exact_counts),
             "total_casualties": int(pd.to_numeric(df['total_casualties'], errors='coerce').sum()),
             "incidents_with_casualties": int((pd.to_numeric(df['total_casualties'], errors='coerce') > 0).sum()),
-            "top_incident_descriptions": df['incident_description'].value_counts().head(5).to_dict()
+            "top_incident_descriptions": observed_counts(df['incident_description']).head(5).to_dict()
         },
         "response_metrics": {
             "average_response_time": round(pd.to_numeric(df['response_time_minutes'], errors='coerce').mean(), 2),
@@ -50,21 +115,12 @@ def generate_database_summary():
             "average_units_responded": round(pd.to_numeric(df['units_responded'], errors='coerce').mean(), 1)
         },
         "medical_outcomes": {
-            "transport_disposition": df['transport_disposition'].value_counts().to_dict(),
-            "patient_care_evaluations": df['patient_care_evaluation'].value_counts().to_dict()
+            "transport_disposition": observed_counts(df['transport_disposition']).to_dict(),
+            "patient_care_evaluations": observed_counts(df['patient_care_evaluation']).to_dict()
         },
-        "data_quality": {
-            "completeness": {},
-            "missing_data_analysis": {}
-        }
+        "data_quality": profiler.results()
     }
-    
-    # Data quality analysis
-    for col in df.columns:
-        missing_pct = round((df[col].isnull().sum() / len(df)) * 100, 1)
-        summary["data_quality"]["completeness"][col] = 100 - missing_pct
-        if missing_pct > 0:
-            summary["data_quality"]["missing_data_analysis"][col] = missing_pct
+    summary["memory"] = dict(memory.summary(), chunked=chunked)
     
     # Generate formatted report
     report = f"""
@@ -90,7 +146,8 @@ def generate_database_summary():
 | Coverage | Count |
 |----------|--------|
 | **Cities** | {summary['geographic_coverage']['unique_cities']} |
-| **ZIP Codes** | {summary['geographic_coverage']['unique_zip_codes']} |
+| **ZIP Codes** | {summary['geographic_coverage']['unique_zip_codes']} ({summary['geographic_coverage']['raw_unique_zip_codes']} before normalization) |
+| **Unique Locations** | {summary['geographic_coverage']['unique_locations']:,} |
 | **Place Types** | {summary['geographic_coverage']['place_types']} |
 
 ### Top 5 Cities by Incident Count:
@@ -100,6 +157,13 @@ def generate_database_summary():
         percentage = (count / summary['database_info']['total_records']) * 100
         report += f"{i}. **{city}**: {count:,} incidents ({percentage:.1f}%)\n"
     
+    report += f"""
+### Top 5 Repeat Addresses:
+"""
+    
+    for i, (address, count) in enumerate(summary['geographic_coverage']['top_repeat_addresses'].items(), 1):
+        report += f"{i}. **{address}**: {count:,} incidents\n"
+    
     report += f"""
 ---
 
@@ -172,6 +236,29 @@ def generate_database_summary():
     for field, missing_pct in sorted_missing[:10]:  # Top 10 missing fields
         report += f"- **{field}**: {missing_pct}% missing\n"
     
+    report += f"""
+### Invalid Values (failed type conversion):
+"""
+    
+    invalid_counts = summary['data_quality']['invalid_parse_counts']
+    if invalid_counts:
+        for field, count in sorted(invalid_counts.items(), key=lambda x: x[1], reverse=True):
+            report += f"- **{field}**: {count:,} unparseable values\n"
+    else:
+        report += "- No unparseable values\n"
+    
+    report += f"""
+### Consistency Checks:
+"""
+    
+    for rule, count in summary['data_quality']['rule_violations'].items():
+        status = "✅" if count == 0 else "⚠️"
+        report += f"- {status} **{rule.replace('_', ' ').title()}**: {count:,} records\n"
+    
+    # An empty extract has no top city or transport outcome
+    top_city, top_city_count = next(iter(summary['geographic_coverage']['top_cities'].items()), ('N/A', 0))
+    top_transport = next(iter(summary['medical_outcomes']['transport_disposition']), 'N/A')
+    
     report += f"""
 ---
 
@@ -180,11 +267,11 @@ def generate_database_summary():
 ### Performance Highlights:
 - Emergency response system serves **{summary['geographic_coverage']['unique_cities']} cities** across Maryland
 - Average response time of **{summary['response_metrics']['average_response_time']} minutes** demonstrates efficient emergency services
-- **{summary['incident_statistics']['incidents_with_casualties']:,} incidents** resulted in casualties, representing {(summary['incident_statistics']['incidents_with_casualties']/summary['database_info']['total_records']*100):.1f}% of all calls
+- **{summary['incident_statistics']['incidents_with_casualties']:,} incidents** resulted in casualties, representing {(summary['incident_statistics']['incidents_with_casualties']/max(summary['database_info']['total_records'], 1)*100):.1f}% of all calls
 
 ### Operational Insights:
-- Most incidents occur in **{list(summary['geographic_coverage']['top_cities'].keys())[0]}** with {list(summary['geographic_coverage']['top_cities'].values())[0]:,} incidents
-- **{list(summary['medical_outcomes']['transport_disposition'].keys())[0]}** is the most common transport outcome
+- Most incidents occur in **{top_city}** with {top_city_count:,} incidents
+- **{top_transport}** is the most common transport outcome
 - Database spans **{summary['database_info']['date_range']['span_years']} years** of comprehensive emergency response data
 
 ---
@@ -202,11 +289,24 @@ def generate_database_summary():
     print("📊 Database summary generated!")
     print("   - database_summary.json (structured data)")
     print("   - database_summary.md (formatted report)")
+    print(memory.report())
     
     return summary, report
 
 if __name__ == "__main__":
-    summary, report = generate_database_summary()
+    parser = argparse.ArgumentParser(description="Generate the emergency incidents database summary.")
+    parser.add_argument('--exact', action='store_true', help="Exact distinct counts instead of sketches")
+    parser.add_argument('--source', default=DEFAULT_SOURCE, help="CSV file or partitioned dataset directory")
+    parser.add_argument('--start', help="First alarm date (YYYY-MM-DD)")
+    parser.add_argument('--end', help="Last alarm date (YYYY-MM-DD)")
+    parser.add_argument('--department', action='append', help="Department NERIS id (repeatable)")
+    parser.add_argument('--memory-budget', type=float, default=None,
+                        help="Memory budget in MB; over it the data is profiled in chunks "
+                             "(default: $INCIDENTS_MEMORY_BUDGET_MB)")
+    args = parser.parse_args()
+    summary, report = generate_database_summary(exact_counts=args.exact, source=args.source, start=args.start,
+                                                end=args.end, departments=args.department,
+                                                memory_budget_mb=args.memory_budget)
     print("\n" + "="*60)
     print("DATABASE SUMMARY PREVIEW")
     print("="*60)
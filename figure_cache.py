@@ -0,0 +1,95 @@
+"""
+Figure Cache
+Pre-serialized Plotly figures per chart and filter state, rebuilt by patching trace data
+"""
+
+import json
+import threading
+
+import plotly.graph_objects as go
+import plotly.io as pio
+
+from result_cache import ResultCache
+
+
+def figure_from_json(figure_json):
+    """Rebuild a figure from cached JSON without re-validating it (it was validated when built)."""
+    return go.Figure(json.loads(figure_json), _validate=False)
+
+
+def apply_updates(figure, updates):
+    """Set values in a figure dict by dotted path, e.g. ``{'data.0.x': [...]}``."""
+    for path, value in updates.items():
+        target = figure
+        parts = path.split('.')
+        for part in parts[:-1]:
+            target = target[int(part)] if isinstance(target, list) else target.setdefault(part, {})
+        last = parts[-1]
+        if isinstance(target, list):
+            target[int(last)] = value
+        else:
+            target[last] = value
+    return figure
+
+
+class FigureCache:
+    """LRU cache of finished figure JSON keyed on (chart, dataset version, filters).
+
+    The first build of each chart is kept as a template. Later misses copy the
+    template and replace only the arrays returned by ``updates`` (trace x/y,
+    marker colors, reference lines), so Plotly Express and figure validation
+    run once per chart rather than once per filter change.
+    """
+
+    def __init__(self, max_entries=256, max_bytes=128 * 1024 ** 2):
+        self.figures = ResultCache(max_entries=max_entries, max_bytes=max_bytes)
+        self.templates = {}
+        self.template_builds = 0
+        self.trace_updates = 0
+        self._lock = threading.Lock()
+
+    def set_dataset_version(self, version):
+        """Set the dataset version used when get_figure is not given one (templates are version-independent)."""
+        self.figures.set_dataset_version(version)
+
+    def invalidate(self, chart_id=None):
+        """Drop cached figures and templates (all, or one chart's)."""
+        self.figures.invalidate(chart_id)
+        with self._lock:
+            if chart_id is None:
+                self.templates.clear()
+            else:
+                self.templates.pop(chart_id, None)
+
+    def get_figure(self, chart_id, filter_state, build, updates, dataset_version=None):
+        """Return the figure for the key.
+
+        ``build()`` creates the full figure the first time a chart is drawn;
+        ``updates()`` returns the dotted-path data changes that turn the
+        chart's template into the figure for the current filters.
+        """
+        figure_json = self.figures.get_or_compute(chart_id, filter_state, lambda: self._render(chart_id, build, updates),
+                                                  dataset_version=dataset_version)
+        return figure_from_json(figure_json)
+
+    def _render(self, chart_id, build, updates):
+        with self._lock:
+            template = self.templates.get(chart_id)
+        if template is None:
+            figure_json = build().to_json()
+            with self._lock:
+                self.templates[chart_id] = figure_json
+                self.template_builds += 1
+            return figure_json
+
+        figure = apply_updates(json.loads(template), updates())
+        with self._lock:
+            self.trace_updates += 1
+        return pio.to_json(figure, validate=False)
+
+    def stats(self):
+        """Return the result-cache counters plus template builds and trace-only updates."""
+        stats = self.figures.stats()
+        stats.update(templates=len(self.templates), template_builds=self.template_builds,
+                     trace_updates=self.trace_updates)
+        return stats
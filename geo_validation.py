@@ -0,0 +1,333 @@
+#!/usr/bin/env python3
+"""
+Geographic Validation
+Vectorized coordinate checks: service-area bounds, zero/swapped coordinates and city boundary mismatches
+"""
+
+import argparse
+import json
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+from incident_schema import MARYLAND_BOUNDS
+from location_encoding import normalize_zip_codes
+
+# Bit flags of the uint8 geo_flags column (0 = coordinates look valid)
+GEO_MISSING = 1
+GEO_ZERO = 2
+GEO_SWAPPED = 4
+GEO_OUTSIDE_AREA = 8
+GEO_OUTSIDE_BOUNDARIES = 16
+GEO_CITY_MISMATCH = 32
+# Rule names used in the quality reports
+GEO_FLAG_NAMES = {
+    GEO_MISSING: 'coordinates_missing',
+    GEO_ZERO: 'coordinates_zero',
+    GEO_SWAPPED: 'coordinates_swapped',
+    GEO_OUTSIDE_AREA: 'location_outside_maryland',
+    GEO_OUTSIDE_BOUNDARIES: 'location_outside_boundaries',
+    GEO_CITY_MISMATCH: 'location_city_mismatch',
+}
+# Points with these flags are not plotted or used to center maps (a city mismatch is still a plausible location)
+UNMAPPABLE = GEO_MISSING | GEO_ZERO | GEO_SWAPPED | GEO_OUTSIDE_AREA
+# Feature properties tried, in order, for a boundary's name
+NAME_PROPERTIES = ['city', 'CITY', 'name', 'NAME', 'zip_code', 'ZIP', 'ZCTA5CE20', 'ZCTA5CE10', 'GEOID']
+DEFAULT_CELLS = 256
+_BLOCK = 4_000_000  # point x edge comparisons per ray-casting block
+
+
+def boundaries_path(data_path):
+    """Return the boundary GeoJSON kept beside a data file or dataset directory."""
+    return os.path.splitext(os.path.normpath(data_path))[0] + '.boundaries.geojson'
+
+
+def _in_bounds(lat, lon, bounds):
+    return ((lat >= bounds['lat_min']) & (lat <= bounds['lat_max']) &
+            (lon >= bounds['lon_min']) & (lon <= bounds['lon_max']))
+
+
+def _normalize(values, column):
+    """Comparable boundary names: 5-digit ZIP codes, or trimmed upper-case names."""
+    if column == 'zip_code':
+        return normalize_zip_codes(values)
+    return pd.Series(values, dtype=object).astype(str).str.strip().str.upper()
+
+
+class BoundaryIndex:
+    """Point-in-polygon lookups against named city or ZIP boundaries.
+
+    Preparation lays a uniform grid over the boundaries. Cells that no edge
+    of a boundary passes through are classified once as inside or outside it,
+    so most points are resolved by a cell lookup; only points in cells a
+    boundary edge crosses are ray-cast, and only against the edges that span
+    their grid row. Polygons may have holes and features may be
+    MultiPolygons (rings are combined with the even-odd rule).
+    """
+
+    def __init__(self, features, names, column='city', cells=DEFAULT_CELLS):
+        self.column = column
+        self.names = list(names)
+        self.name_ids, keys = pd.factorize(_normalize(self.names, column))
+        self.keys = list(keys)
+        x1, y1, x2, y2, feature_of = [], [], [], [], []
+        for i, rings in enumerate(features):
+            for ring in rings:
+                ring = np.asarray(ring, dtype=float)[:, :2]
+                x1.append(ring[:, 0])
+                y1.append(ring[:, 1])
+                x2.append(np.roll(ring[:, 0], -1))
+                y2.append(np.roll(ring[:, 1], -1))
+                feature_of.append(np.full(len(ring), i, dtype=np.int64))
+        self.x1, self.y1, self.x2, self.y2 = (np.concatenate(part) for part in (x1, y1, x2, y2))
+        self.edge_feature = np.concatenate(feature_of)
+        self.n_features = len(self.names)
+
+        self.nx = self.ny = cells
+        self.x_min, self.x_max = min(self.x1.min(), self.x2.min()), max(self.x1.max(), self.x2.max())
+        self.y_min, self.y_max = min(self.y1.min(), self.y2.min()), max(self.y1.max(), self.y2.max())
+        self.dx = (self.x_max - self.x_min) / self.nx or 1.0
+        self.dy = (self.y_max - self.y_min) / self.ny or 1.0
+        self._bucket_edges()
+        self._boundary_cells()
+        self._classify_cells()
+
+    @classmethod
+    def from_geojson(cls, path, name_property=None, column='city', cells=DEFAULT_CELLS):
+        """Load the Polygon and MultiPolygon features of a GeoJSON FeatureCollection."""
+        with open(path) as f:
+            collection = json.load(f)
+        features, names = [], []
+        for feature in collection.get('features', []):
+            geometry = feature.get('geometry') or {}
+            if geometry.get('type') == 'Polygon':
+                rings = geometry['coordinates']
+            elif geometry.get('type') == 'MultiPolygon':
+                rings = [ring for polygon in geometry['coordinates'] for ring in polygon]
+            else:
+                continue
+            properties = feature.get('properties') or {}
+            key = name_property or next((key for key in NAME_PROPERTIES if key in properties), None)
+            if key is None or properties.get(key) is None:
+                continue
+            features.append(rings)
+            names.append(properties[key])
+        if not features:
+            raise ValueError(f"No named Polygon/MultiPolygon features in {path}")
+        return cls(features, names, column, cells)
+
+    @classmethod
+    def for_data(cls, data_path, **kwargs):
+        """Load the boundaries kept beside a data file, or None if there are none."""
+        path = boundaries_path(data_path)
+        return cls.from_geojson(path, **kwargs) if os.path.exists(path) else None
+
+    def _col(self, x):
+        return np.clip(((x - self.x_min) / self.dx).astype(np.int64), 0, self.nx - 1)
+
+    def _row(self, y):
+        return np.clip(((y - self.y_min) / self.dy).astype(np.int64), 0, self.ny - 1)
+
+    def _bucket_edges(self):
+        """Index every edge under (feature, grid row) for each row its y-range spans."""
+        first, last = self._row(np.minimum(self.y1, self.y2)), self._row(np.maximum(self.y1, self.y2))
+        spans = last - first + 1
+        edges = np.repeat(np.arange(len(spans)), spans)
+        rows = np.repeat(first, spans) + np.arange(len(edges)) - np.repeat(np.cumsum(spans) - spans, spans)
+        keys = self.edge_feature[edges] * self.ny + rows
+        order = np.argsort(keys, kind='stable')
+        self.bucket = edges[order]
+        self.bucket_start = np.searchsorted(keys[order], np.arange(self.n_features * self.ny + 1))
+
+    def _boundary_cells(self):
+        """(feature, cell) pairs an edge passes through, as cell -> features lists."""
+        # Split edges into pieces no longer than a cell so each piece touches at most 2x2 cells
+        pieces = np.maximum(1, np.ceil(np.maximum(np.abs(self.x2 - self.x1) / self.dx,
+                                                  np.abs(self.y2 - self.y1) / self.dy))).astype(np.int64)
+        edges = np.repeat(np.arange(len(pieces)), pieces)
+        step = np.arange(len(edges)) - np.repeat(np.cumsum(pieces) - pieces, pieces)
+        t0, t1 = step / pieces[edges], (step + 1) / pieces[edges]
+        px0 = self.x1[edges] + (self.x2[edges] - self.x1[edges]) * t0
+        px1 = self.x1[edges] + (self.x2[edges] - self.x1[edges]) * t1
+        py0 = self.y1[edges] + (self.y2[edges] - self.y1[edges]) * t0
+        py1 = self.y1[edges] + (self.y2[edges] - self.y1[edges]) * t1
+        c0, c1 = self._col(np.minimum(px0, px1)), self._col(np.maximum(px0, px1))
+        r0, r1 = self._row(np.minimum(py0, py1)), self._row(np.maximum(py0, py1))
+        features = self.edge_feature[edges]
+        pairs = []
+        for dr in (0, 1):
+            for dc in (0, 1):
+                keep = (r0 + dr <= r1) & (c0 + dc <= c1)
+                pairs.append(((r0[keep] + dr) * self.nx + c0[keep] + dc) * self.n_features + features[keep])
+        pairs = np.unique(np.concatenate(pairs))
+        cells, self.cell_features = pairs // self.n_features, pairs % self.n_features
+        self.cell_start = np.searchsorted(cells, np.arange(self.nx * self.ny + 1))
+
+    def _classify_cells(self):
+        """Owner feature of every cell lying wholly inside one boundary (-1 elsewhere)."""
+        self.owner = np.full(self.nx * self.ny, -1, dtype=np.int64)
+        # Edges are stored feature by feature, so each feature's extent is one reduction
+        starts = np.searchsorted(self.edge_feature, np.arange(self.n_features))
+        col_min = self._col(np.minimum.reduceat(np.minimum(self.x1, self.x2), starts))
+        col_max = self._col(np.maximum.reduceat(np.maximum(self.x1, self.x2), starts))
+        row_min = self._row(np.minimum.reduceat(np.minimum(self.y1, self.y2), starts))
+        row_max = self._row(np.maximum.reduceat(np.maximum(self.y1, self.y2), starts))
+        candidate_cells, candidate_features = [], []
+        for feature in range(self.n_features):
+            rows = np.arange(row_min[feature], row_max[feature] + 1)
+            cols = np.arange(col_min[feature], col_max[feature] + 1)
+            cells = (rows[:, None] * self.nx + cols[None, :]).ravel()
+            candidate_cells.append(cells)
+            candidate_features.append(np.full(len(cells), feature, dtype=np.int64))
+        cells, features = np.concatenate(candidate_cells), np.concatenate(candidate_features)
+        crossed = np.isin(cells * self.n_features + features, self._cell_pairs())
+        cells, features = cells[~crossed], features[~crossed]
+        x = self.x_min + (cells % self.nx + 0.5) * self.dx
+        y = self.y_min + (cells // self.nx + 0.5) * self.dy
+        inside = self._inside(features, x, y)
+        self.owner[cells[inside]] = features[inside]
+
+    def _cell_pairs(self):
+        counts = np.diff(self.cell_start)
+        return np.repeat(np.arange(len(counts)), counts) * self.n_features + self.cell_features
+
+    def _inside(self, features, x, y):
+        """Even-odd ray casting of each point against one feature's edges in the point's grid row."""
+        result = np.zeros(len(x), dtype=bool)
+        if not len(x):
+            return result
+        keys = features * self.ny + self._row(y)
+        order = np.argsort(keys, kind='stable')
+        keys = keys[order]
+        bounds = np.flatnonzero(np.diff(keys)) + 1
+        for start, end in zip(np.r_[0, bounds], np.r_[bounds, len(keys)]):
+            key = keys[start]
+            edges = self.bucket[self.bucket_start[key]:self.bucket_start[key + 1]]
+            if not len(edges):
+                continue
+            x1, y1, x2, y2 = self.x1[edges], self.y1[edges], self.x2[edges], self.y2[edges]
+            block = max(1, _BLOCK // len(edges))
+            for lo in range(start, end, block):
+                points = order[lo:min(end, lo + block)]
+                px, py = x[points, None], y[points, None]
+                with np.errstate(divide='ignore', invalid='ignore'):
+                    crossing = ((y1 > py) != (y2 > py)) & (px < x1 + (py - y1) * (x2 - x1) / (y2 - y1))
+                result[points] = crossing.sum(axis=1) % 2 == 1
+        return result
+
+    def locate(self, lon, lat):
+        """Index of the boundary feature containing each point (-1 if none)."""
+        lon, lat = np.asarray(lon, dtype=float), np.asarray(lat, dtype=float)
+        found = np.full(len(lon), -1, dtype=np.int64)
+        within = ((lon >= self.x_min) & (lon <= self.x_max) & (lat >= self.y_min) & (lat <= self.y_max))
+        points = np.flatnonzero(within)
+        cells = self._row(lat[points]) * self.nx + self._col(lon[points])
+        found[points] = self.owner[cells]
+
+        # Points in cells an edge crosses are ray-cast against each boundary crossing their cell
+        starts, counts = self.cell_start[cells], np.diff(self.cell_start)[cells]
+        pair_points = np.repeat(points, counts)
+        offsets = np.arange(len(pair_points)) - np.repeat(np.cumsum(counts) - counts, counts)
+        pair_features = self.cell_features[np.repeat(starts, counts) + offsets]
+        inside = self._inside(pair_features, lon[pair_points], lat[pair_points])
+        found[pair_points[inside]] = pair_features[inside]
+        return found
+
+    def locate_names(self, lon, lat):
+        """Index into ``keys`` of the boundary name containing each point (-1 if none)."""
+        found = self.locate(lon, lat)
+        return np.where(found >= 0, self.name_ids[np.maximum(found, 0)], -1)
+
+    def name_codes(self, values):
+        """Index into ``keys`` of each stated city/ZIP (-1 if it has no boundary, -2 if missing)."""
+        codes, uniques = pd.factorize(values)
+        known = {key: i for i, key in enumerate(self.keys)}
+        ids = np.array([known.get(key, -1) for key in _normalize(uniques, self.column)], dtype=np.int64)
+        return np.where(codes >= 0, ids[np.maximum(codes, 0)] if len(ids) else -1, -2)
+
+
+def geo_flags(df, boundaries=None, bounds=MARYLAND_BOUNDS):
+    """Return the uint8 GEO_* flags of every row.
+
+    Located points outside the service-area box get GEO_OUTSIDE_AREA, plus
+    GEO_SWAPPED when swapping latitude/longitude or restoring a dropped sign
+    puts them inside it. With boundaries, points inside the box but in no
+    boundary get GEO_OUTSIDE_BOUNDARIES and points in a boundary other than
+    their stated city (or ZIP) get GEO_CITY_MISMATCH.
+    """
+    flags = np.zeros(len(df), dtype=np.uint8)
+    if 'latitude' not in df.columns or 'longitude' not in df.columns:
+        return flags | GEO_MISSING
+    lat = pd.to_numeric(df['latitude'], errors='coerce').to_numpy(dtype=float)
+    lon = pd.to_numeric(df['longitude'], errors='coerce').to_numpy(dtype=float)
+    missing = np.isnan(lat) | np.isnan(lon)
+    flags[missing] |= GEO_MISSING
+    flags[~missing & ((lat == 0) | (lon == 0))] |= GEO_ZERO
+
+    outside = ~missing & ~_in_bounds(lat, lon, bounds)
+    flags[outside] |= GEO_OUTSIDE_AREA
+    swapped = np.zeros(len(df), dtype=bool)
+    for fixed_lat, fixed_lon in [(lon, lat), (lat, -lon), (-lat, lon), (lon, -lat)]:
+        swapped |= outside & _in_bounds(fixed_lat, fixed_lon, bounds)
+    flags[swapped] |= GEO_SWAPPED
+
+    if boundaries is not None:
+        located = np.flatnonzero(~missing & ~outside)
+        names = boundaries.locate_names(lon[located], lat[located])
+        flags[located[names < 0]] |= GEO_OUTSIDE_BOUNDARIES
+        if boundaries.column in df.columns:
+            stated = boundaries.name_codes(df[boundaries.column])[located]
+            flags[located[(names >= 0) & (stated != -2) & (stated != names)]] |= GEO_CITY_MISMATCH
+    return flags
+
+
+def add_geo_flags(df, boundaries=None, bounds=MARYLAND_BOUNDS):
+    """Store the flags in place as the compact ``geo_flags`` column."""
+    df['geo_flags'] = geo_flags(df, boundaries, bounds)
+    return df
+
+
+def mappable(df):
+    """Boolean mask of rows whose coordinates can be plotted (uses geo_flags when present)."""
+    flags = df['geo_flags'].to_numpy() if 'geo_flags' in df.columns else geo_flags(df)
+    return (flags & UNMAPPABLE) == 0
+
+
+def flag_counts(flags):
+    """Rows carrying each flag, by rule name."""
+    flags = np.asarray(flags, dtype=np.uint8)
+    return {name: int(np.count_nonzero(flags & flag)) for flag, name in GEO_FLAG_NAMES.items()}
+
+
+def main():
+    from incident_dataset import read_incidents
+
+    parser = argparse.ArgumentParser(description="Validate incident coordinates against the service area and "
+                                                 "city/ZIP boundaries.")
+    parser.add_argument('source', help="CSV file or partitioned dataset directory")
+    parser.add_argument('--boundaries', help="City/ZIP boundary GeoJSON (default: <source>.boundaries.geojson)")
+    parser.add_argument('--name-property', help="Feature property holding the boundary name")
+    parser.add_argument('--column', choices=['city', 'zip_code'], default='city',
+                        help="Column the boundary names are compared with")
+    args = parser.parse_args()
+
+    df = read_incidents(args.source, columns=['latitude', 'longitude', args.column])
+    path = args.boundaries or boundaries_path(args.source)
+    started = time.perf_counter()
+    boundaries = None
+    if os.path.exists(path):
+        boundaries = BoundaryIndex.from_geojson(path, args.name_property, args.column)
+        print(f"🗺️ {boundaries.n_features} boundaries from {path} prepared in {time.perf_counter() - started:.2f}s")
+    started = time.perf_counter()
+    flags = geo_flags(df, boundaries)
+    print(f"📍 Validated {len(df):,} coordinates in {time.perf_counter() - started:.2f}s")
+    for name, count in flag_counts(flags).items():
+        status = "✅" if count == 0 else "⚠️"
+        print(f"   {status} {name}: {count:,}")
+    print(f"   {int(np.count_nonzero((flags & UNMAPPABLE) == 0)):,} mappable rows")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,312 @@
+#!/usr/bin/env python3
+"""
+Partitioned Incident Dataset
+Hive-style Parquet partitions by year/month/department with partition pruning on read
+"""
+
+import argparse
+import calendar
+import glob
+import json
+import os
+from datetime import date
+from urllib.parse import quote, unquote
+
+import pandas as pd
+
+from csv_reader import read_incidents_csv
+from incident_schema import BOOL_COLUMNS, BOOL_VALUES, DATETIME_COLUMNS, NUMERIC_COLUMNS, convert_types
+
+PARTITION_COLUMNS = ['year', 'month', 'department_neris_id']
+UNKNOWN_PARTITION = '__unknown__'
+
+# Parquet write options; override per dataset in <root>/_storage.json (see storage_benchmark.py)
+DEFAULT_STORAGE = {'compression': 'zstd', 'compression_level': 3, 'use_dictionary': True, 'row_group_size': 131072}
+STORAGE_CONFIG = '_storage.json'
+
+
+def _as_date(value):
+    return None if value is None else pd.Timestamp(value).date()
+
+
+def partition_dir(root, year, month, department):
+    """Return the directory of one partition (values are URL-quoted like Hive's escaping)."""
+    return os.path.join(root, f"year={year}", f"month={month}",
+                        f"department_neris_id={quote(str(department), safe='')}")
+
+
+def _partition_keys(df):
+    """Return the (year, month, department) partition values of every row as strings."""
+    alarm = df['alarm_datetime']
+    year = alarm.dt.year.astype('Int64').astype(str).where(alarm.notna(), UNKNOWN_PARTITION)
+    month = alarm.dt.month.astype('Int64').astype(str).where(alarm.notna(), UNKNOWN_PARTITION)
+    department = df['department_neris_id'].astype(object).where(df['department_neris_id'].notna(), UNKNOWN_PARTITION)
+    return pd.DataFrame({'year': year, 'month': month, 'department_neris_id': department.astype(str)})
+
+
+def storage_frame(df):
+    """Return a copy of a raw frame with the datetime and numeric columns typed for Parquet."""
+    df = df.copy()
+    for col in DATETIME_COLUMNS:
+        if col in df.columns:
+            df[col] = pd.to_datetime(df[col], errors='coerce', utc=True)
+    for col in NUMERIC_COLUMNS:
+        if col in df.columns:
+            df[col] = pd.to_numeric(df[col], errors='coerce')
+    return df
+
+
+def write_parquet(df, path, storage=None):
+    """Write a frame to one Parquet file with the given storage options (defaults if None)."""
+    storage = dict(DEFAULT_STORAGE, **(storage or {}))
+    if storage.get('compression') in (None, 'none'):
+        storage['compression'] = None
+        storage.pop('compression_level', None)
+    df.to_parquet(path, index=False, engine='pyarrow', **storage)
+
+
+def filter_rows(df, start=None, end=None, departments=None):
+    """Keep rows whose alarm date is in [start, end] and whose department is listed."""
+    start, end = _as_date(start), _as_date(end)
+    keep = pd.Series(True, index=df.index)
+    if start is not None or end is not None:
+        alarm = pd.to_datetime(df['alarm_datetime'], errors='coerce', utc=True)
+        keep &= alarm.notna()
+        if start is not None:
+            keep &= alarm.dt.date >= start
+        if end is not None:
+            keep &= alarm.dt.date <= end
+    if departments is not None:
+        keep &= df['department_neris_id'].astype(str).isin([str(d) for d in departments])
+    return df if keep.all() else df[keep].reset_index(drop=True)
+
+
+def _convert_flags(df):
+    """Map flag columns that are not already boolean to True/False/NaN, as the CSV reader does (in place).
+
+    ``from_csv`` stores typed flags, but partitions written from raw frames
+    hold them as 't'/'f' text, and flags with missing values read back as objects.
+    """
+    for col in BOOL_COLUMNS:
+        if col in df.columns and df[col].dtype != bool:
+            df[col] = df[col].map(BOOL_VALUES)
+    return df
+
+
+def _with_filter_columns(columns, start=None, end=None, departments=None):
+    """Add the columns filter_rows needs to a column selection."""
+    needed = (['alarm_datetime'] if start is not None or end is not None else []) + \
+        (['department_neris_id'] if departments is not None else [])
+    return list(columns) + [col for col in needed if col not in columns]
+
+
+class IncidentDataset:
+    """A directory of incident Parquet files partitioned as
+    ``year=YYYY/month=M/department_neris_id=ID/<extract>.parquet``.
+
+    Queries list the partition directories, keep the ones that can hold
+    rows in the requested date range and departments, and read only their
+    files. Rows without an alarm time or department go to ``__unknown__``
+    partitions, which are skipped whenever a date range is given.
+    """
+
+    def __init__(self, root):
+        self.root = root
+        self.last_scan = None
+
+    @staticmethod
+    def is_dataset(path):
+        """True if path is a directory holding year= partitions."""
+        return os.path.isdir(path) and bool(glob.glob(os.path.join(path, 'year=*')))
+
+    def partitions(self):
+        """List partitions as dicts of year, month (ints or None), department and files."""
+        partitions = []
+        pattern = os.path.join(self.root, 'year=*', 'month=*', 'department_neris_id=*')
+        for path in sorted(glob.glob(pattern)):
+            year_dir, month_dir, department_dir = path.split(os.sep)[-3:]
+            year, month = year_dir.split('=', 1)[1], month_dir.split('=', 1)[1]
+            files = sorted(glob.glob(os.path.join(path, '*.parquet')))
+            if files:
+                partitions.append({
+                    'year': None if year == UNKNOWN_PARTITION else int(year),
+                    'month': None if month == UNKNOWN_PARTITION else int(month),
+                    'department': unquote(department_dir.split('=', 1)[1]),
+                    'files': files,
+                })
+        return partitions
+
+    def date_bounds(self):
+        """Return (first day, last day) covered by the dated partitions, or (None, None)."""
+        months = [(p['year'], p['month']) for p in self.partitions() if p['year'] is not None]
+        if not months:
+            return None, None
+        (first_year, first_month), (last_year, last_month) = min(months), max(months)
+        return (date(first_year, first_month, 1),
+                date(last_year, last_month, calendar.monthrange(last_year, last_month)[1]))
+
+    def departments(self):
+        """Return the department ids present in the dataset."""
+        return sorted({p['department'] for p in self.partitions() if p['department'] != UNKNOWN_PARTITION})
+
+    def prune(self, start=None, end=None, departments=None):
+        """Return the partitions that can contain rows for the date range and departments."""
+        start, end = _as_date(start), _as_date(end)
+        departments = None if departments is None else {str(d) for d in departments}
+        selected = []
+        for partition in self.partitions():
+            if departments is not None and partition['department'] not in departments:
+                continue
+            if start is not None or end is not None:
+                if partition['year'] is None:
+                    continue
+                month = (partition['year'], partition['month'])
+                if start is not None and month < (start.year, start.month):
+                    continue
+                if end is not None and month > (end.year, end.month):
+                    continue
+            selected.append(partition)
+        return selected
+
+    def read(self, start=None, end=None, departments=None, columns=None):
+        """Read the incidents in [start, end] (dates, inclusive) for the given departments."""
+        partitions = self.prune(start, end, departments)
+        file_columns = None
+        if columns is not None:
+            # The department lives in the path; the alarm time is needed to trim the range
+            file_columns = [col for col in _with_filter_columns(columns, start, end) if col != 'department_neris_id']
+        frames = [self._read_file(path, partition, file_columns, columns)
+                  for partition in partitions for path in partition['files']]
+        self.last_scan = {
+            'partitions': len(partitions),
+            'total_partitions': len(self.partitions()),
+            'files': sum(len(p['files']) for p in partitions),
+        }
+        if not frames:
+            return pd.DataFrame(columns=columns or [])
+        # Partitions are whole months; trim to the exact days
+        df = filter_rows(pd.concat(frames, ignore_index=True), start, end)
+        return df if columns is None else df[columns]
+
+    def iter_read(self, start=None, end=None, departments=None, columns=None):
+        """Yield the incidents read() returns one partition file at a time."""
+        file_columns = None
+        if columns is not None:
+            file_columns = [col for col in _with_filter_columns(columns, start, end) if col != 'department_neris_id']
+        for partition in self.prune(start, end, departments):
+            for path in partition['files']:
+                frame = filter_rows(self._read_file(path, partition, file_columns, columns), start, end)
+                yield frame if columns is None else frame[columns]
+
+    @staticmethod
+    def _read_file(path, partition, file_columns=None, columns=None):
+        frame = pd.read_parquet(path, columns=file_columns)
+        if columns is None or 'department_neris_id' in columns:
+            frame['department_neris_id'] = None if partition['department'] == UNKNOWN_PARTITION \
+                else partition['department']
+        return frame
+
+    @property
+    def storage(self):
+        """Parquet write options: the defaults, overridden by the dataset's _storage.json."""
+        path = os.path.join(self.root, STORAGE_CONFIG)
+        if os.path.exists(path):
+            with open(path) as f:
+                return dict(DEFAULT_STORAGE, **json.load(f))
+        return dict(DEFAULT_STORAGE)
+
+    def set_storage(self, options):
+        """Persist the write options used for files written from now on."""
+        os.makedirs(self.root, exist_ok=True)
+        with open(os.path.join(self.root, STORAGE_CONFIG), 'w') as f:
+            json.dump(options, f, indent=2)
+
+    def write(self, df, name='part'):
+        """Write a frame into its partitions as ``<name>.parquet`` (re-writing an extract replaces it)."""
+        df = storage_frame(df)
+        storage = self.storage
+        keys = _partition_keys(df)
+        written = 0
+        for (year, month, department), rows in df.groupby([keys['year'], keys['month'], keys['department_neris_id']],
+                                                          sort=False):
+            directory = partition_dir(self.root, year, month, department)
+            os.makedirs(directory, exist_ok=True)
+            write_parquet(rows.drop(columns='department_neris_id'), os.path.join(directory, f"{name}.parquet"), storage)
+            written += 1
+        return written
+
+    @classmethod
+    def from_csv(cls, csv_paths, root):
+        """Import CSV extracts (e.g. monthly per-department files) into a dataset."""
+        dataset = cls(root)
+        for csv_path in csv_paths:
+            name = os.path.splitext(os.path.basename(csv_path))[0]
+            dataset.write(read_incidents_csv(csv_path), name=name)
+        return dataset
+
+
+def read_incidents(source, start=None, end=None, departments=None, columns=None, convert=True):
+    """Read incidents from a partitioned dataset directory (pruned by date/department) or a CSV file.
+
+    Columns come back typed: CSVs through csv_reader.py, datasets from their
+    Parquet types with any flags still stored as text mapped to booleans.
+    convert=False keeps CSV columns as raw strings and dataset columns as
+    stored, e.g. to count values that fail to parse.
+    """
+    if IncidentDataset.is_dataset(source):
+        df = IncidentDataset(source).read(start, end, departments, columns)
+        return _convert_flags(df) if convert else df
+    # A single CSV cannot be pruned: read it and filter the rows
+    usecols = None if columns is None else _with_filter_columns(columns, start, end, departments)
+    df = read_incidents_csv(source, usecols) if convert else pd.read_csv(source, usecols=usecols)
+    df = filter_rows(df, start, end, departments)
+    return df if columns is None else df[columns]
+
+
+def iter_incidents(source, start=None, end=None, departments=None, columns=None, convert=True, chunk_rows=100_000):
+    """Yield the incidents read_incidents would return, one dataset file or CSV chunk at a time.
+
+    Only one chunk is held in memory, so callers that fold chunks into
+    streaming structures (profiles, reservoir samples) never load the whole
+    selection.
+    """
+    if IncidentDataset.is_dataset(source):
+        for frame in IncidentDataset(source).iter_read(start, end, departments, columns):
+            yield _convert_flags(frame) if convert else frame
+        return
+    usecols = None if columns is None else _with_filter_columns(columns, start, end, departments)
+    for chunk in pd.read_csv(source, usecols=usecols, chunksize=chunk_rows):
+        if convert:
+            convert_types(chunk)
+        chunk = filter_rows(chunk, start, end, departments)
+        yield chunk if columns is None else chunk[columns]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build and inspect the partitioned incident dataset.")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    import_parser = subparsers.add_parser('import', help="Import CSV extracts into the dataset")
+    import_parser.add_argument('csv_files', nargs='+')
+    import_parser.add_argument('--root', default='incidents_dataset')
+    info_parser = subparsers.add_parser('info', help="Show partitions and what a query would read")
+    info_parser.add_argument('--root', default='incidents_dataset')
+    info_parser.add_argument('--start')
+    info_parser.add_argument('--end')
+    info_parser.add_argument('--department', action='append')
+    args = parser.parse_args()
+
+    if args.command == 'import':
+        dataset = IncidentDataset.from_csv(args.csv_files, args.root)
+        print(f"✅ Imported {len(args.csv_files)} file(s) into {args.root} ({len(dataset.partitions())} partitions)")
+        return
+
+    dataset = IncidentDataset(args.root)
+    first, last = dataset.date_bounds()
+    print(f"📁 {args.root}: {len(dataset.partitions())} partitions, {first} to {last}, "
+          f"{len(dataset.departments())} departments")
+    selected = dataset.prune(args.start, args.end, args.department)
+    print(f"🔍 Query reads {len(selected)} partitions ({sum(len(p['files']) for p in selected)} files)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,157 @@
+"""
+Incident Schema
+Column types of the NERIS incidents extract and the shared type conversions
+"""
+
+import json
+import os
+
+import pandas as pd
+
+from location_encoding import LookupTable
+
+DATETIME_COLUMNS = ['alarm_datetime', 'arrival_datetime', 'controlled_datetime',
+                    'last_unit_cleared_datetime', 'incident_created_at']
+
+BOOL_COLUMNS = ['people_present', 'fire_suppression_present']
+# Already-converted values map to themselves, so converting twice is harmless
+BOOL_VALUES = {'t': True, 'f': False, True: True, False: False}
+
+NUMERIC_COLUMNS = ['animals_rescued', 'displacement_count', 'latitude', 'longitude',
+                   'response_time_minutes', 'control_time_minutes', 'total_time_minutes',
+                   'units_responded', 'total_casualties']
+
+# Low-cardinality strings stored as categoricals over persisted code tables
+CATEGORICAL_COLUMNS = ['department_neris_id', 'neris_id_format', 'incident_type', 'incident_description',
+                       'incident_category', 'incident_main_type', 'city', 'state', 'place_type',
+                       'patient_care_evaluation', 'patient_status', 'transport_disposition',
+                       'fire_suppression_operation', 'fire_suppression_effectiveness', 'sprinklers_activated',
+                       'has_smoke_alarm', 'has_fire_alarm', 'has_other_alarm', 'day_of_week']
+
+# Service-area bounding box (State of Maryland)
+MARYLAND_BOUNDS = {
+    'lat_min': 37.88, 'lat_max': 39.73,
+    'lon_min': -79.49, 'lon_max': -75.04,
+}
+
+
+def convert_types(df):
+    """Convert datetime, boolean and numeric columns in place.
+
+    Returns a dict of invalid-parse counts per column: values that were present
+    in the raw data but could not be converted (coerced to NaN/NaT).
+    """
+    invalid_counts = {}
+
+    for col in DATETIME_COLUMNS:
+        if col in df.columns:
+            was_present = df[col].notna()
+            df[col] = pd.to_datetime(df[col], errors='coerce', utc=True)
+            invalid_counts[col] = int((was_present & df[col].isna()).sum())
+
+    for col in BOOL_COLUMNS:
+        if col in df.columns and df[col].dtype != bool:
+            was_present = df[col].notna()
+            df[col] = df[col].map(BOOL_VALUES)
+            invalid_counts[col] = int((was_present & df[col].isna()).sum())
+
+    for col in NUMERIC_COLUMNS:
+        if col in df.columns:
+            was_present = df[col].notna()
+            df[col] = pd.to_numeric(df[col], errors='coerce')
+            invalid_counts[col] = int((was_present & df[col].isna()).sum())
+
+    return invalid_counts
+
+
+def add_derived_columns(df):
+    """Add the incident_main_type and alarm time features used by the analyses."""
+    df['incident_main_type'] = df['incident_type'].str.split('||', regex=False).str[0].fillna('Unknown')
+    df['alarm_hour'] = df['alarm_datetime'].dt.hour
+    df['day_of_week'] = df['alarm_datetime'].dt.day_name()
+    df['date'] = df['alarm_datetime'].dt.date
+    return df
+
+
+def observed_counts(values):
+    """value_counts without the zero rows a categorical adds for unused categories."""
+    counts = values.value_counts()
+    return counts[counts > 0]
+
+
+def category_tables_path(data_path):
+    """Return the code-table file kept beside a data or cache file."""
+    return os.path.splitext(data_path)[0] + '.categories.json'
+
+
+class CategoryTables:
+    """Stable value <-> code tables for the categorical columns, persisted as JSON.
+
+    Tables are append-only, so a value keeps its code across loads, live
+    batches and processes that share the tables file.
+    """
+
+    def __init__(self, path=None, columns=CATEGORICAL_COLUMNS):
+        self.path = path
+        self.tables = {col: LookupTable() for col in columns}
+        self.changed = False
+
+    @classmethod
+    def load(cls, path):
+        """Load the tables stored at path (empty tables if the file does not exist yet)."""
+        tables = cls(path)
+        if os.path.exists(path):
+            with open(path) as f:
+                for col, values in json.load(f).items():
+                    tables.tables[col] = LookupTable(values)
+        return tables
+
+    @classmethod
+    def for_data(cls, data_path):
+        """Load the tables persisted beside a data file."""
+        return cls.load(category_tables_path(data_path))
+
+    @classmethod
+    def from_frame(cls, df, path=None):
+        """Recover the tables of a frame whose columns were already encoded."""
+        tables = cls(path)
+        for col in tables.tables:
+            if col in df.columns and isinstance(df[col].dtype, pd.CategoricalDtype):
+                tables.tables[col] = LookupTable(df[col].cat.categories)
+        return tables
+
+    def encode(self, df):
+        """Store the categorical columns of a frame in place as codes over the shared tables."""
+        for col, table in self.tables.items():
+            if col in df.columns:
+                size = len(table)
+                codes = table.encode(df[col])
+                self.changed |= len(table) != size
+                df[col] = pd.Categorical.from_codes(codes, categories=table.values)
+        return df
+
+    def align(self, df):
+        """Widen encoded columns to the current tables so frames encoded earlier concatenate as categoricals.
+
+        Tables only grow at the end, so existing codes stay valid.
+        """
+        for col, table in self.tables.items():
+            if col in df.columns and isinstance(df[col].dtype, pd.CategoricalDtype) \
+                    and len(df[col].cat.categories) != len(table):
+                df[col] = df[col].cat.set_categories(table.values)
+        return df
+
+    def save(self, path=None):
+        """Write the tables if they gained values; returns False if the file cannot be written."""
+        path = path or self.path
+        if path is None or not (self.changed or not os.path.exists(path)):
+            return True
+        tables = {col: table.values.tolist() for col, table in self.tables.items() if len(table)}
+        try:
+            with open(path + '.tmp', 'w') as f:
+                json.dump(tables, f)
+            os.replace(path + '.tmp', path)
+        except OSError:
+            return False
+        self.changed = False
+        return True
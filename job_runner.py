@@ -0,0 +1,318 @@
+#!/usr/bin/env python3
+"""
+Analysis Job Runner
+Run the analysis suite over many datasets and partitions as a DAG on a process pool
+"""
+
+import argparse
+import copy
+import json
+import os
+import resource
+import sys
+import time
+import traceback
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from datetime import datetime, timezone
+
+import numpy as np
+import pandas as pd
+
+from column_transport import SharedFrame, publish, release
+from incident_dataset import read_incidents
+
+ANALYSES = {
+    # name: (node stage, analyzer method, generated file)
+    'summary': ('aggregate', 'get_summary_statistics', 'summary.json'),
+    'incident_types': ('figure', 'create_incident_type_analysis', 'incident_analysis.png'),
+    'geographic': ('figure', 'create_geographic_analysis', 'geographic_analysis.png'),
+    'response_times': ('figure', 'create_response_time_analysis', 'response_time_analysis.png'),
+    'interactive': ('figure', 'create_interactive_dashboard', 'interactive_dashboard.html'),
+    'report': ('report', 'create_detailed_report', 'analysis_report.md'),
+}
+PARTITION_COLUMNS = {'city': 'city', 'month': 'alarm_datetime'}
+ALL_PARTITION = 'all'
+
+
+def load_manifest(path):
+    """Read and validate a job manifest.
+
+    Example::
+
+        {"inputs": ["howard.csv", "baltimore.csv"],
+         "analyses": ["summary", "response_times", "report"],
+         "output_dir": "runs/nightly",
+         "partitions": "city",
+         "workers": 4}
+    """
+    with open(path) as f:
+        manifest = json.load(f)
+    if not manifest.get('inputs'):
+        raise ValueError("Manifest must list at least one input CSV")
+    manifest.setdefault('analyses', list(ANALYSES))
+    manifest.setdefault('output_dir', 'analysis_runs')
+    manifest.setdefault('partitions', None)
+    manifest.setdefault('workers', os.cpu_count())
+    unknown = set(manifest['analyses']) - set(ANALYSES)
+    if unknown:
+        raise ValueError(f"Unknown analyses: {', '.join(sorted(unknown))}")
+    if manifest['partitions'] not in (None, *PARTITION_COLUMNS):
+        raise ValueError(f"Partitions must be one of {', '.join(PARTITION_COLUMNS)} or null")
+    return manifest
+
+
+def input_name(csv_path):
+    return os.path.splitext(os.path.basename(csv_path))[0]
+
+
+def partition_keys(values, partitions):
+    """Return the partition key of each row (city name or YYYY-MM)."""
+    if partitions == 'month':
+        alarm = pd.to_datetime(values, errors='coerce', utc=True)
+        return alarm.dt.strftime('%Y-%m').fillna('unknown')
+    return values.astype(object).fillna('Unknown').astype(str)
+
+
+def list_partitions(csv_path, partitions):
+    """Read only the partition column to enumerate a dataset's partitions."""
+    if partitions is None:
+        return [ALL_PARTITION]
+    column = PARTITION_COLUMNS[partitions]
+    values = read_incidents(csv_path, columns=[column])[column]
+    return sorted(partition_keys(values, partitions).unique())
+
+
+def partition_dir(value):
+    """Filesystem-safe directory name for a partition value."""
+    return ''.join(c if c.isalnum() or c in '-_' else '_' for c in value)
+
+
+def plan_jobs(manifest):
+    """Expand a manifest into DAG nodes: load -> aggregates -> figures and reports."""
+    nodes = []
+    for csv_path in manifest['inputs']:
+        name = input_name(csv_path)
+        load_id = f"{name}/load"
+        nodes.append({
+            'id': load_id, 'stage': 'load', 'input': csv_path, 'partition': None,
+            'partitions': manifest['partitions'], 'deps': [],
+        })
+        for partition in list_partitions(csv_path, manifest['partitions']):
+            out_dir = os.path.join(manifest['output_dir'], name, partition_dir(partition))
+            summary_id = f"{name}/{partition}/summary"
+            for analysis in manifest['analyses']:
+                stage, _, _ = ANALYSES[analysis]
+                deps = [load_id]
+                # Figures and reports run after the partition's aggregates
+                if stage != 'aggregate' and 'summary' in manifest['analyses']:
+                    deps.append(summary_id)
+                nodes.append({
+                    'id': f"{name}/{partition}/{analysis}", 'stage': stage, 'analysis': analysis,
+                    'input': csv_path, 'partition': partition, 'partitions': manifest['partitions'],
+                    'deps': deps, 'load_id': load_id, 'output_dir': out_dir,
+                })
+    return nodes
+
+
+# Worker-process state: each loaded dataset is attached once per worker
+_FRAMES = {}
+_LOCATIONS = {}
+
+
+def _worker_frame(shared):
+    """Attach (once per worker) to a dataset published in shared memory."""
+    name = shared['shm_name']
+    if name not in _FRAMES:
+        _FRAMES[name] = SharedFrame(shared)
+    return _FRAMES[name].frame
+
+
+def _worker_locations(shared):
+    """The loader's location encoder, whose tables the shared location_id codes index."""
+    name = shared['shm_name']
+    if name not in _LOCATIONS:
+        _worker_frame(shared)
+        _LOCATIONS[name] = _FRAMES[name].attachment('locations')
+    encoder = copy.copy(_LOCATIONS[name])
+    # The history index caches row positions of one frame; each partition gets its own
+    encoder._location_order = None
+    return encoder
+
+
+def _max_rss_mb():
+    # ru_maxrss is KB on Linux (bytes on macOS)
+    scale = 1024 * 1024 if sys.platform == 'darwin' else 1024
+    return round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / scale, 1)
+
+
+def _to_json(value):
+    if isinstance(value, pd.Series):
+        return {str(k): _to_json(v) for k, v in value.items()}
+    if isinstance(value, (tuple, list)):
+        return [_to_json(v) for v in value]
+    if isinstance(value, pd.Timestamp):
+        return value.isoformat()
+    if hasattr(value, 'item'):
+        return value.item()
+    return value
+
+
+def run_node(node):
+    """Execute one DAG node in a worker process and return its timing record."""
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+    from data_analyzer import EmergencyIncidentsAnalyzer
+
+    started = time.time()
+    outputs = []
+    extra = {}
+    if node['stage'] == 'load':
+        analyzer = EmergencyIncidentsAnalyzer(node['input'], output_dir=None)
+        df = analyzer.df
+        # Rows are grouped by partition so each partition is a contiguous, zero-copy slice
+        if node['partitions'] is None:
+            ranges = {ALL_PARTITION: (0, len(df))}
+        else:
+            keys = partition_keys(df[PARTITION_COLUMNS[node['partitions']]], node['partitions'])
+            order = keys.to_numpy().argsort(kind='stable')
+            df, keys = df.iloc[order].reset_index(drop=True), keys.iloc[order].to_numpy()
+            values, starts, counts = np.unique(keys.astype(str), return_index=True, return_counts=True)
+            ranges = {key: (int(start), int(start + count)) for key, start, count in zip(values, starts, counts)}
+        # Workers get the loader's tables: rebuilding them from reordered rows would renumber location_id
+        extra = {'shared': publish(df, attachments={'locations': analyzer.locations}), 'ranges': ranges}
+        rows = len(df)
+    else:
+        df = _worker_frame(node['shared'])
+        start, stop = node['rows_range']
+        df = df.iloc[start:stop].reset_index(drop=True)
+        if node['partition'] != ALL_PARTITION:
+            for col in df.select_dtypes('category').columns:
+                df[col] = df[col].cat.remove_unused_categories()
+        os.makedirs(node['output_dir'], exist_ok=True)
+        analyzer = EmergencyIncidentsAnalyzer.from_frame(df, output_dir=node['output_dir'],
+                                                         locations=_worker_locations(node['shared']))
+        _, method, filename = ANALYSES[node['analysis']]
+        result = getattr(analyzer, method)()
+        plt.close('all')
+        if node['analysis'] == 'summary':
+            with open(analyzer.output_path(filename), 'w') as f:
+                json.dump({key: _to_json(value) for key, value in result.items()}, f, indent=2, default=str)
+        outputs.append(analyzer.output_path(filename))
+        rows = len(df)
+
+    finished = time.time()
+    return {'started': started, 'finished': finished, 'seconds': round(finished - started, 3),
+            'pid': os.getpid(), 'max_rss_mb': _max_rss_mb(), 'rows': rows, 'outputs': outputs, **extra}
+
+
+class JobRunner:
+    """Schedule DAG nodes on a process pool as soon as their dependencies finish."""
+
+    def __init__(self, manifest, workers=None):
+        self.manifest = manifest
+        self.workers = workers or manifest['workers']
+        self.nodes = {node['id']: node for node in plan_jobs(manifest)}
+        self.records = {node_id: {'status': 'pending'} for node_id in self.nodes}
+        self.shared = {}
+        self.ranges = {}
+
+    def _ready(self, node_id):
+        return all(self.records[dep]['status'] == 'done' for dep in self.nodes[node_id]['deps'])
+
+    def _skip_dependents(self, failed_id):
+        for node_id, node in self.nodes.items():
+            if failed_id in node['deps'] and self.records[node_id]['status'] == 'pending':
+                self.records[node_id] = {'status': 'skipped', 'error': f"dependency failed: {failed_id}"}
+                self._skip_dependents(node_id)
+
+    def _submit(self, pool, node_id):
+        node = self.nodes[node_id]
+        if node['stage'] != 'load':
+            # Workers get the small shared-memory descriptor, never the frame itself
+            rows_range = self.ranges[node['load_id']].get(node['partition'], (0, 0))
+            node = {**node, 'shared': self.shared[node['load_id']], 'rows_range': rows_range}
+        return pool.submit(run_node, node)
+
+    def run(self):
+        """Run every node, then write and return the run log."""
+        run_started = time.time()
+        print(f"🚀 Running {len(self.nodes)} jobs on {self.workers} workers...")
+        running = {}
+        try:
+            with ProcessPoolExecutor(max_workers=self.workers) as pool:
+                while True:
+                    for node_id, record in self.records.items():
+                        if record['status'] == 'pending' and self._ready(node_id):
+                            record['status'] = 'running'
+                            running[self._submit(pool, node_id)] = node_id
+                    if not running:
+                        break
+                    done, _ = wait(running, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        node_id = running.pop(future)
+                        try:
+                            result = future.result()
+                            if 'shared' in result:
+                                self.shared[node_id] = result.pop('shared')
+                                self.ranges[node_id] = result.pop('ranges')
+                            self.records[node_id] = {'status': 'done', **result}
+                            print(f"✅ {node_id} ({self.records[node_id]['seconds']:.1f}s)")
+                        except Exception as e:
+                            self.records[node_id] = {'status': 'failed', 'error': ''.join(
+                                traceback.format_exception_only(type(e), e)).strip()}
+                            print(f"❌ {node_id}: {self.records[node_id]['error']}")
+                            self._skip_dependents(node_id)
+        finally:
+            for shared in self.shared.values():
+                release(shared)
+
+        run_log = self.run_log(run_started, time.time())
+        log_path = os.path.join(self.manifest['output_dir'], 'run_log.json')
+        os.makedirs(self.manifest['output_dir'], exist_ok=True)
+        with open(log_path, 'w') as f:
+            json.dump(run_log, f, indent=2)
+        print(f"📄 Run log saved to {log_path}")
+        return run_log
+
+    def run_log(self, started, finished):
+        """Machine-readable record of the run with per-node timings."""
+        statuses = [record['status'] for record in self.records.values()]
+        nodes = []
+        for node_id, node in self.nodes.items():
+            record = dict(self.records[node_id])
+            for key in ('started', 'finished'):
+                if key in record:
+                    record[key] = datetime.fromtimestamp(record[key], timezone.utc).isoformat()
+            nodes.append({'id': node_id, 'stage': node['stage'], 'input': node['input'],
+                          'partition': node['partition'], 'deps': node['deps'], **record})
+        return {
+            'manifest': self.manifest,
+            'workers': self.workers,
+            'started': datetime.fromtimestamp(started, timezone.utc).isoformat(),
+            'finished': datetime.fromtimestamp(finished, timezone.utc).isoformat(),
+            'seconds': round(finished - started, 3),
+            'counts': {status: statuses.count(status) for status in sorted(set(statuses))},
+            'nodes': nodes,
+        }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run the incidents analysis suite from a job manifest")
+    parser.add_argument('manifest', help="JSON manifest (inputs, analyses, output_dir, partitions, workers)")
+    parser.add_argument('--workers', type=int, help="Override the manifest's worker count")
+    parser.add_argument('--dry-run', action='store_true', help="Print the planned DAG without running it")
+    args = parser.parse_args(argv)
+
+    manifest = load_manifest(args.manifest)
+    runner = JobRunner(manifest, workers=args.workers)
+    if args.dry_run:
+        for node in runner.nodes.values():
+            print(f"{node['id']}  <-  {', '.join(node['deps']) or '-'}")
+        return 0
+    run_log = runner.run()
+    return 0 if run_log['counts'].get('failed', 0) == 0 else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
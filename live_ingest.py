@@ -0,0 +1,453 @@
+#!/usr/bin/env python3
+"""
+Live Incident Ingestion
+Asyncio service that micro-batches NERIS incident records into the in-memory store and on-disk cache
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import time
+from collections import deque
+
+import numpy as np
+import pandas as pd
+
+from incident_schema import CategoryTables, add_derived_columns, convert_types
+
+REQUIRED_FIELDS = ['incident_number', 'alarm_datetime']
+
+
+class IncidentStore:
+    """Append-only in-memory incident store, mirrored to an on-disk CSV cache."""
+
+    def __init__(self, cache_path=None):
+        self.cache_path = cache_path
+        self.version = 0
+        self._batches = []
+        self._frame = None
+        self._listeners = []
+        self._cache_columns = None
+        # Code tables for the categorical columns, persisted beside the cache
+        self.categories = CategoryTables.for_data(cache_path) if cache_path else CategoryTables()
+
+    def __len__(self):
+        return sum(len(batch) for batch in self._batches)
+
+    def subscribe(self, callback):
+        """Call callback(batch) for every batch appended from now on."""
+        self._listeners.append(callback)
+
+    def append(self, batch):
+        """Add a converted batch to the store and notify subscribers."""
+        self.categories.encode(batch)
+        self._batches.append(batch)
+        self._frame = None
+        self.version += 1
+        for callback in self._listeners:
+            callback(batch)
+
+    def write_cache(self, batch, columns=None):
+        """Append a batch to the on-disk cache under the file's header.
+
+        The header is fixed when the file is created (or read back from an
+        existing file); later batches are written in its column order, with
+        missing fields left empty and extra ones dropped.
+        """
+        if self.cache_path is None:
+            return
+        write_header = False
+        if self._cache_columns is None:
+            if os.path.exists(self.cache_path) and os.path.getsize(self.cache_path) > 0:
+                self._cache_columns = list(pd.read_csv(self.cache_path, nrows=0).columns)
+            else:
+                self._cache_columns = list(batch.columns if columns is None else columns)
+                write_header = True
+        batch.reindex(columns=self._cache_columns).to_csv(self.cache_path, mode='a', header=write_header, index=False)
+        self.categories.save()
+
+    def frame(self):
+        """Return every stored incident as one frame."""
+        if self._frame is None:
+            # Earlier batches were encoded against smaller tables
+            for batch in self._batches:
+                self.categories.align(batch)
+            self._frame = pd.concat(self._batches, ignore_index=True) if self._batches else pd.DataFrame()
+            self._batches = [self._frame] if self._batches else []
+        return self._frame
+
+
+class FileTailSource:
+    """Yield NDJSON lines appended to a file (for testing without a CAD feed)."""
+
+    def __init__(self, path, poll_interval=0.2, from_start=True):
+        self.path = path
+        self.poll_interval = poll_interval
+        self.from_start = from_start
+
+    async def lines(self):
+        while not os.path.exists(self.path):
+            await asyncio.sleep(self.poll_interval)
+        with open(self.path, 'r') as f:
+            if not self.from_start:
+                f.seek(0, os.SEEK_END)
+            partial = ''
+            while True:
+                line = f.readline()
+                if not line:
+                    await asyncio.sleep(self.poll_interval)
+                    continue
+                partial += line
+                # Only hand over complete lines; a writer may be mid-record
+                if partial.endswith('\n'):
+                    yield partial
+                    partial = ''
+
+
+class NamedPipeSource:
+    """Yield NDJSON lines written to a named pipe, reopening it when writers disconnect."""
+
+    def __init__(self, path, poll_interval=0.2):
+        self.path = path
+        self.poll_interval = poll_interval
+
+    async def lines(self):
+        if not os.path.exists(self.path):
+            os.mkfifo(self.path)
+        loop = asyncio.get_running_loop()
+        while True:
+            pipe = os.fdopen(os.open(self.path, os.O_RDONLY | os.O_NONBLOCK), 'rb', buffering=0)
+            reader = asyncio.StreamReader()
+            transport, _ = await loop.connect_read_pipe(lambda: asyncio.StreamReaderProtocol(reader), pipe)
+            try:
+                while True:
+                    line = await reader.readline()
+                    if not line:
+                        break
+                    yield line.decode()
+            finally:
+                transport.close()
+            await asyncio.sleep(self.poll_interval)
+
+
+class SocketSource:
+    """Accept TCP connections and yield the NDJSON lines they send.
+
+    Lines pass through a bounded queue, so a slow consumer stops the server
+    reading from its sockets and TCP flow control pushes back on producers.
+    """
+
+    def __init__(self, host='127.0.0.1', port=9009, buffer_size=1000):
+        self.host = host
+        self.port = port
+        self.buffer_size = buffer_size
+        self.server = None
+
+    async def lines(self):
+        queue = asyncio.Queue(maxsize=self.buffer_size)
+
+        async def handle(reader, writer):
+            try:
+                while True:
+                    line = await reader.readline()
+                    if not line:
+                        break
+                    await queue.put(line.decode())
+            finally:
+                writer.close()
+
+        self.server = await asyncio.start_server(handle, self.host, self.port)
+        self.port = self.server.sockets[0].getsockname()[1]
+        async with self.server:
+            while True:
+                yield await queue.get()
+
+
+class IngestService:
+    """Read records from a source, validate and convert them in micro-batches, and store them.
+
+    A bounded queue between reader and converter provides backpressure: when
+    conversion falls behind, the reader stops pulling from the source.
+    """
+
+    def __init__(self, source, store, batch_size=500, max_batch_delay=0.5, queue_size=10_000):
+        self.source = source
+        self.store = store
+        self.batch_size = batch_size
+        self.max_batch_delay = max_batch_delay
+        self.queue_size = queue_size
+        self.queue = None
+
+        self.received = 0
+        self.ingested = 0
+        self.rejected = 0
+        self.batches = 0
+        self.backpressure_waits = 0
+        self.started_at = None
+        self.latencies = deque(maxlen=100_000)
+
+    async def _read(self):
+        """Move raw lines from the source into the bounded queue."""
+        async for line in self.source.lines():
+            line = line.strip()
+            if not line:
+                continue
+            self.received += 1
+            if self.queue.full():
+                self.backpressure_waits += 1
+            await self.queue.put((time.perf_counter(), line))
+
+    async def _next_batch(self):
+        """Wait for one record, then collect up to batch_size within max_batch_delay."""
+        batch = [await self.queue.get()]
+        deadline = time.perf_counter() + self.max_batch_delay
+        while len(batch) < self.batch_size:
+            try:
+                batch.append(self.queue.get_nowait())
+                continue
+            except asyncio.QueueEmpty:
+                pass
+            timeout = deadline - time.perf_counter()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self.queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    def convert_batch(self, lines):
+        """Parse NDJSON lines into a typed frame; returns (frame, rejected count)."""
+        records = []
+        rejected = 0
+        for line in lines:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                rejected += 1
+                continue
+            if isinstance(record, dict):
+                records.append(record)
+            else:
+                rejected += 1
+
+        batch = pd.DataFrame.from_records(records)
+        for col in REQUIRED_FIELDS:
+            if col not in batch.columns:
+                batch[col] = None
+        convert_types(batch)
+        valid = batch[REQUIRED_FIELDS].notna().all(axis=1)
+        rejected += int((~valid).sum())
+        return batch[valid].reset_index(drop=True), rejected
+
+    async def _consume(self):
+        """Convert and store micro-batches until cancelled."""
+        while True:
+            items = await self._next_batch()
+            enqueued_at = np.array([item[0] for item in items])
+            batch, rejected = self.convert_batch([item[1] for item in items])
+            self.rejected += rejected
+
+            if len(batch):
+                source_columns = list(batch.columns)
+                add_derived_columns(batch)
+                self.store.append(batch)
+                await asyncio.to_thread(self.store.write_cache, batch, source_columns)
+                self.ingested += len(batch)
+                self.batches += 1
+            self.latencies.extend(time.perf_counter() - enqueued_at)
+
+    def stats(self):
+        """Return ingest counters, latency percentiles (ms) and throughput (rows/s)."""
+        elapsed = time.perf_counter() - self.started_at if self.started_at else 0
+        latencies = np.array(self.latencies) * 1000
+        return {
+            'received': self.received,
+            'ingested': self.ingested,
+            'rejected': self.rejected,
+            'batches': self.batches,
+            'queue_depth': self.queue.qsize() if self.queue else 0,
+            'backpressure_waits': self.backpressure_waits,
+            'latency_p50_ms': round(float(np.percentile(latencies, 50)), 2) if len(latencies) else None,
+            'latency_p99_ms': round(float(np.percentile(latencies, 99)), 2) if len(latencies) else None,
+            'throughput_rows_per_s': round(self.ingested / elapsed, 1) if elapsed else 0.0,
+        }
+
+    async def run(self, duration=None, report_interval=None):
+        """Run the service (forever, or for duration seconds) and return final stats.
+
+        If the reader or consumer fails, the service stops and the error is
+        re-raised here.
+        """
+        self.queue = asyncio.Queue(maxsize=self.queue_size)
+        self.started_at = time.perf_counter()
+        tasks = [asyncio.create_task(self._read()), asyncio.create_task(self._consume())]
+        if report_interval:
+            tasks.append(asyncio.create_task(self._report(report_interval)))
+        try:
+            done, _ = await asyncio.wait(tasks, timeout=duration, return_when=asyncio.FIRST_EXCEPTION)
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+        for task in done:
+            if not task.cancelled() and task.exception() is not None:
+                raise task.exception()
+        return self.stats()
+
+    async def _report(self, interval):
+        while True:
+            await asyncio.sleep(interval)
+            print(f"📡 {self.stats()}")
+
+
+class _FileWriter:
+    """Minimal async writer for files and named pipes (blocking I/O runs in a thread)."""
+
+    def __init__(self, f):
+        self.f = f
+        self._pending = []
+
+    @classmethod
+    async def open(cls, path):
+        return cls(await asyncio.to_thread(open, path, 'a'))
+
+    def write(self, data):
+        self._pending.append(data.decode())
+
+    async def drain(self):
+        data, self._pending = ''.join(self._pending), []
+        await asyncio.to_thread(self._write, data)
+
+    def _write(self, data):
+        self.f.write(data)
+        self.f.flush()
+
+    def close(self):
+        self.f.close()
+
+
+async def replay_csv(csv_path, target, host='127.0.0.1', port=9009, path=None, speedup=60.0, limit=None):
+    """Stream a NERIS CSV as NDJSON records in alarm-time order.
+
+    speedup=60 plays one hour of incidents per minute; speedup=0 sends as fast
+    as the receiver accepts. target is 'socket', 'pipe' or 'file'.
+    Returns the number of records sent.
+    """
+    df = pd.read_csv(csv_path, dtype=str, keep_default_na=False)
+    alarm = pd.to_datetime(df['alarm_datetime'], errors='coerce', utc=True)
+    order = np.argsort(alarm.to_numpy(dtype='datetime64[ns]'), kind='stable')
+    df, alarm = df.iloc[order].reset_index(drop=True), alarm.iloc[order].reset_index(drop=True)
+    if limit:
+        df, alarm = df.head(limit), alarm.head(limit)
+
+    if target == 'socket':
+        _, writer = await asyncio.open_connection(host, port)
+    else:
+        writer = await _FileWriter.open(path)
+
+    offsets = (alarm - alarm.min()).dt.total_seconds().fillna(0).to_numpy()
+    columns = list(df.columns)
+    started = time.perf_counter()
+    try:
+        for i, values in enumerate(df.itertuples(index=False, name=None)):
+            if speedup:
+                delay = offsets[i] / speedup - (time.perf_counter() - started)
+                if delay > 0:
+                    await asyncio.sleep(delay)
+            record = {col: (value if value != '' else None) for col, value in zip(columns, values)}
+            writer.write((json.dumps(record) + '\n').encode())
+            if i % 100 == 0:
+                await writer.drain()
+        await writer.drain()
+    finally:
+        writer.close()
+    return len(df)
+
+
+async def load_test(csv_path, speedup=0, limit=None, batch_size=500, cache_path=None):
+    """Replay a CSV through a local socket into the ingest service and report stats."""
+    source = SocketSource(port=0)
+    service = IngestService(source, IncidentStore(cache_path), batch_size=batch_size)
+    service_task = asyncio.create_task(service.run())
+
+    def check_service():
+        # A crashed service never catches up; surface its error instead of waiting forever
+        if service_task.done():
+            service_task.result()
+            raise RuntimeError("Ingest service stopped before every record was processed")
+
+    while source.server is None:
+        check_service()
+        await asyncio.sleep(0.01)
+
+    sent = await replay_csv(csv_path, 'socket', port=source.port, speedup=speedup, limit=limit)
+    while service.ingested + service.rejected < sent:
+        check_service()
+        await asyncio.sleep(0.05)
+    stats = service.stats()
+    service_task.cancel()
+    await asyncio.gather(service_task, return_exceptions=True)
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Live NERIS incident ingestion")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    serve = subparsers.add_parser('serve', help="Run the ingestion service")
+    serve.add_argument('--source', choices=['socket', 'pipe', 'file'], default='socket')
+    serve.add_argument('--host', default='127.0.0.1')
+    serve.add_argument('--port', type=int, default=9009)
+    serve.add_argument('--path', help="Named pipe or file to read for the pipe/file sources")
+    serve.add_argument('--cache', default='incident_cache.csv', help="On-disk cache to append to")
+    serve.add_argument('--batch-size', type=int, default=500)
+    serve.add_argument('--report-interval', type=float, default=10.0)
+
+    replay = subparsers.add_parser('replay', help="Replay a CSV into a running service")
+    replay.add_argument('csv_path')
+    replay.add_argument('--target', choices=['socket', 'pipe', 'file'], default='socket')
+    replay.add_argument('--host', default='127.0.0.1')
+    replay.add_argument('--port', type=int, default=9009)
+    replay.add_argument('--path', help="Named pipe or file to write for the pipe/file targets")
+    replay.add_argument('--speedup', type=float, default=60.0)
+    replay.add_argument('--limit', type=int)
+
+    loadtest = subparsers.add_parser('loadtest', help="Replay a CSV through a local service and report throughput")
+    loadtest.add_argument('csv_path')
+    loadtest.add_argument('--speedup', type=float, default=0)
+    loadtest.add_argument('--limit', type=int)
+    loadtest.add_argument('--batch-size', type=int, default=500)
+
+    args = parser.parse_args()
+
+    if args.command == 'serve':
+        if args.source == 'socket':
+            source = SocketSource(args.host, args.port)
+        elif args.source == 'pipe':
+            source = NamedPipeSource(args.path)
+        else:
+            source = FileTailSource(args.path)
+        service = IngestService(source, IncidentStore(args.cache), batch_size=args.batch_size)
+        print(f"🚨 Ingesting from {args.source} into {args.cache}...")
+        try:
+            asyncio.run(service.run(report_interval=args.report_interval))
+        except KeyboardInterrupt:
+            print(f"\n📊 Final stats: {service.stats()}")
+
+    elif args.command == 'replay':
+        sent = asyncio.run(replay_csv(args.csv_path, args.target, args.host, args.port, args.path,
+                                      speedup=args.speedup, limit=args.limit))
+        print(f"✅ Replayed {sent:,} incidents")
+
+    else:
+        stats = asyncio.run(load_test(args.csv_path, speedup=args.speedup, limit=args.limit,
+                                      batch_size=args.batch_size))
+        print("📊 Load test results:")
+        for key, value in stats.items():
+            print(f"   {key}: {value}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,191 @@
+"""
+Location Encoding
+Canonicalize addresses and ZIP codes and dictionary-encode them into integer location codes
+"""
+
+import numpy as np
+import pandas as pd
+
+# USPS standard suffix and directional abbreviations
+ADDRESS_ABBREVIATIONS = {
+    'STREET': 'ST', 'AVENUE': 'AVE', 'AV': 'AVE', 'ROAD': 'RD', 'DRIVE': 'DR',
+    'BOULEVARD': 'BLVD', 'LANE': 'LN', 'COURT': 'CT', 'PLACE': 'PL',
+    'TERRACE': 'TER', 'CIRCLE': 'CIR', 'PARKWAY': 'PKWY', 'HIGHWAY': 'HWY',
+    'PIKE': 'PIKE', 'SQUARE': 'SQ', 'TRAIL': 'TRL', 'WAY': 'WAY',
+    'NORTH': 'N', 'SOUTH': 'S', 'EAST': 'E', 'WEST': 'W',
+    'NORTHEAST': 'NE', 'NORTHWEST': 'NW', 'SOUTHEAST': 'SE', 'SOUTHWEST': 'SW',
+    'APARTMENT': 'APT', 'SUITE': 'STE', 'UNIT': 'UNIT',
+}
+_ABBREVIATION_PATTERN = r'\b(' + '|'.join(sorted(ADDRESS_ABBREVIATIONS, key=len, reverse=True)) + r')\b'
+
+
+def normalize_addresses(addresses):
+    """Canonicalize free-text street addresses (case, punctuation, whitespace, abbreviations)."""
+    # Normalize each distinct raw value once, then broadcast back through the codes
+    codes, uniques = pd.factorize(addresses)
+    canonical = (pd.Series(uniques, dtype=object).astype(str)
+                 .str.upper()
+                 .str.replace(r'[.,#]', ' ', regex=True)
+                 .str.replace(r'\s+', ' ', regex=True)
+                 .str.strip()
+                 .str.replace(_ABBREVIATION_PATTERN, lambda m: ADDRESS_ABBREVIATIONS[m.group(1)], regex=True))
+    canonical[canonical == ''] = np.nan
+    values = canonical.to_numpy(dtype=object)
+    return pd.Series(np.where(codes >= 0, values[np.maximum(codes, 0)], np.nan),
+                     index=getattr(addresses, 'index', None), dtype=object)
+
+
+def normalize_zip_codes(zip_codes):
+    """Canonicalize ZIP codes to 5-digit strings (ZIP+4 and float artifacts removed)."""
+    codes, uniques = pd.factorize(zip_codes)
+    digits = (pd.Series(uniques, dtype=object).astype(str)
+              .str.strip()
+              .str.replace(r'\.0+$', '', regex=True)
+              .str.extract(r'^(\d{3,5})(?:-?\d{4})?$')[0])
+    canonical = digits.str.zfill(5).to_numpy(dtype=object)
+    return pd.Series(np.where(codes >= 0, canonical[np.maximum(codes, 0)], np.nan),
+                     index=getattr(zip_codes, 'index', None), dtype=object)
+
+
+class LookupTable:
+    """Append-only value <-> integer code table shared by every encode call."""
+
+    def __init__(self, values=()):
+        self.values = pd.Index([], dtype=object)
+        self.add(values)
+
+    def __len__(self):
+        return len(self.values)
+
+    def add(self, values):
+        """Append unseen values, keeping existing codes stable."""
+        values = pd.Index(pd.unique(pd.Series(values, dtype=object).dropna()), dtype=object)
+        new_values = values[self.values.get_indexer(values) < 0]
+        if len(new_values):
+            self.values = self.values.append(new_values)
+
+    def encode(self, values):
+        """Return int32 codes for values (-1 for missing), extending the table as needed."""
+        self.add(values)
+        return self.values.get_indexer(pd.Index(values, dtype=object)).astype(np.int32)
+
+    def code_of(self, value):
+        """Return the code of a single value, or -1 if it is not in the table."""
+        return int(self.values.get_indexer([value])[0])
+
+    def decode(self, codes):
+        """Return the values for an array of codes (NaN for -1)."""
+        codes = np.asarray(codes)
+        decoded = self.values.to_numpy()[np.maximum(codes, 0)]
+        return np.where(codes >= 0, decoded, np.nan)
+
+
+class LocationEncoder:
+    """Dictionary encoding of canonical addresses, ZIP codes and their combination."""
+
+    def __init__(self):
+        self.addresses = LookupTable()
+        self.zip_codes = LookupTable()
+        self.locations = LookupTable()
+        self._location_order = None
+        self._location_offsets = None
+
+    @classmethod
+    def from_frame(cls, df, **kwargs):
+        """Build the lookup tables for a frame without modifying it.
+
+        Normalization is idempotent and codes follow first appearance, so this
+        reproduces the tables of a frame that was already encoded in place.
+        """
+        encoder = cls()
+        encoder.encode(df[[kwargs.get('address_col', 'address_line_1'), kwargs.get('zip_col', 'zip_code')]].copy(), **kwargs)
+        return encoder
+
+    def encode(self, df, address_col='address_line_1', zip_col='zip_code'):
+        """Canonicalize and encode a frame in place.
+
+        address_line_1 and zip_code become categoricals over the shared lookup
+        tables and an int32 location_id column identifies (address, zip) pairs.
+        """
+        address_codes = self.addresses.encode(normalize_addresses(df[address_col]))
+        zip_codes = self.zip_codes.encode(normalize_zip_codes(df[zip_col]))
+
+        # A location is an (address, zip) pair, packed into one int64 key
+        pair_keys = address_codes.astype(np.int64) << 32 | (zip_codes.astype(np.int64) & 0xFFFFFFFF)
+        has_address = address_codes >= 0
+        location_ids = np.full(len(df), -1, dtype=np.int32)
+        location_ids[has_address] = self.locations.encode(pair_keys[has_address])
+
+        df[address_col] = pd.Categorical.from_codes(address_codes, categories=self.addresses.values)
+        df[zip_col] = pd.Categorical.from_codes(zip_codes, categories=self.zip_codes.values)
+        df['location_id'] = location_ids
+        self._location_order = None
+        return df
+
+    def align(self, df, address_col='address_line_1', zip_col='zip_code'):
+        """Widen encoded columns to the current tables so frames encoded earlier concatenate as categoricals.
+
+        Tables only grow at the end, so existing codes stay valid.
+        """
+        for col, table in ((address_col, self.addresses), (zip_col, self.zip_codes)):
+            if col in df.columns and isinstance(df[col].dtype, pd.CategoricalDtype) \
+                    and len(df[col].cat.categories) != len(table):
+                df[col] = df[col].cat.set_categories(table.values)
+        return df
+
+    def location_label(self, location_id):
+        """Return (address, zip_code) for a location code."""
+        key = int(self.locations.values[location_id])
+        zip_code = key & 0xFFFFFFFF
+        return (self.addresses.values[key >> 32],
+                self.zip_codes.values[zip_code] if zip_code != 0xFFFFFFFF else None)
+
+    def find_location_ids(self, address, zip_code=None):
+        """Return location codes matching an address (and optionally a ZIP code)."""
+        address_code = self.addresses.code_of(normalize_addresses(pd.Series([address])).iloc[0])
+        if address_code < 0:
+            return np.array([], dtype=np.int32)
+        keys = self.locations.values.to_numpy(dtype=np.int64)
+        matches = (keys >> 32) == address_code
+        if zip_code is not None:
+            zip_code = self.zip_codes.code_of(normalize_zip_codes(pd.Series([zip_code])).iloc[0])
+            matches &= (keys & 0xFFFFFFFF) == zip_code
+        return np.flatnonzero(matches).astype(np.int32)
+
+    def top_repeat_locations(self, df, n=10):
+        """Return the n locations with the most incidents using an integer bincount."""
+        location_ids = df['location_id'].to_numpy()
+        counts = np.bincount(location_ids[location_ids >= 0], minlength=len(self.locations))
+        top = np.argsort(counts)[::-1][:n]
+        top = top[counts[top] > 1]
+        labels = [self.location_label(location_id) for location_id in top]
+
+        result = pd.DataFrame({
+            'location_id': top,
+            'address': [label[0] for label in labels],
+            'zip_code': [label[1] for label in labels],
+            'incidents': counts[top],
+        })
+        if 'alarm_datetime' in df.columns and len(top):
+            times = df.loc[df['location_id'].isin(top)].groupby('location_id')['alarm_datetime'].agg(['min', 'max'])
+            result['first_incident'] = result['location_id'].map(times['min'])
+            result['last_incident'] = result['location_id'].map(times['max'])
+        return result
+
+    def location_history(self, df, location_id):
+        """Return every incident at a location, oldest first.
+
+        Row positions are grouped by location once (CSR-style), so each lookup
+        only touches that location's rows.
+        """
+        if self._location_order is None or len(self._location_order) != len(df):
+            location_ids = df['location_id'].to_numpy()
+            self._location_order = np.argsort(location_ids, kind='stable')
+            counts = np.bincount(location_ids[location_ids >= 0], minlength=len(self.locations))
+            missing = int((location_ids < 0).sum())
+            self._location_offsets = missing + np.concatenate([[0], np.cumsum(counts)])
+        start, end = self._location_offsets[location_id], self._location_offsets[location_id + 1]
+        history = df.iloc[self._location_order[start:end]]
+        if 'alarm_datetime' in history.columns:
+            history = history.sort_values('alarm_datetime')
+        return history
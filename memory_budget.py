@@ -0,0 +1,294 @@
+#!/usr/bin/env python3
+"""
+Memory Budget
+Per-stage and per-structure memory accounting with eviction and sampled loads under a configurable budget
+"""
+
+import argparse
+import io
+import os
+import sys
+import threading
+import time
+import types
+import weakref
+from collections import deque
+from contextlib import contextmanager
+
+import numpy as np
+import pandas as pd
+import pyarrow.parquet as pq
+from scipy.spatial import cKDTree
+
+from incident_dataset import IncidentDataset, iter_incidents, read_incidents
+from incident_schema import convert_types
+from result_cache import estimate_size
+from sampling import DEFAULT_SEED, SAMPLE_TIERS, ReservoirSampler
+
+BUDGET_ENV = 'INCIDENTS_MEMORY_BUDGET_MB'
+MB = 1024 ** 2
+SAMPLE_ROWS = 10_000
+SAMPLE_BYTES = 4 * MB
+# Share of the room left under the budget a sampled frame may take; the rest is for the indexes built on it
+FRAME_SHARE = 0.5
+# Structures smaller than this are not worth evicting
+MIN_EVICT_MB = 0.1
+STAGE_COLUMNS = ['stage', 'seconds', 'rss_mb', 'rss_delta_mb', 'footprint_mb']
+_OPAQUE = (type, types.ModuleType, types.FunctionType, types.BuiltinFunctionType, types.MethodType,
+           threading.Thread)
+
+
+def budget_from_env(default=None):
+    """Memory budget in MB from INCIDENTS_MEMORY_BUDGET_MB (default if unset, None means unlimited)."""
+    value = os.environ.get(BUDGET_ENV)
+    return float(value) if value else default
+
+
+def process_memory_mb():
+    """Resident memory of this process in MB (peak resident memory where /proc is unavailable)."""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / MB
+    except (OSError, ValueError, IndexError):
+        try:
+            import resource
+        except ImportError:
+            return float('nan')
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak / (MB if sys.platform == 'darwin' else 1024)
+
+
+def footprint(obj, seen=None):
+    """Approximate bytes held by an object and everything it references.
+
+    pandas, numpy and Arrow objects (and caches exposing ``nbytes``) report
+    their own size; other objects are walked through their containers and
+    attributes. Objects whose ids are in seen are not counted again, so a
+    frame shared by several indexes is only counted once.
+    """
+    seen = set() if seen is None else seen
+    if obj is None or id(obj) in seen or isinstance(obj, _OPAQUE):
+        return 0
+    seen.add(id(obj))
+    if isinstance(obj, (pd.DataFrame, pd.Series, np.ndarray)):
+        return estimate_size(obj)
+    if isinstance(obj, pd.Index):
+        return int(obj.memory_usage(deep=True))
+    if isinstance(obj, cKDTree):
+        # The tree's nodes live in C; its point copy and index permutation dominate
+        return obj.data.nbytes + obj.indices.nbytes
+    if isinstance(getattr(obj, 'nbytes', None), int):
+        return obj.nbytes
+    if isinstance(obj, dict):
+        return sys.getsizeof(obj) + sum(footprint(key, seen) + footprint(value, seen) for key, value in obj.items())
+    if isinstance(obj, (list, tuple, set, frozenset, deque)):
+        return sys.getsizeof(obj) + sum(footprint(item, seen) for item in obj)
+    if hasattr(obj, '__dict__'):
+        return sys.getsizeof(obj) + footprint(vars(obj), seen)
+    return sys.getsizeof(obj)
+
+
+def estimate_load(source, start=None, end=None, departments=None):
+    """Estimate the rows and in-memory MB of what read_incidents would load, without loading it.
+
+    A dataset's rows come from the Parquet footers of the pruned partitions
+    and its size from the memory per row of the first file's leading rows. A
+    CSV is extrapolated from its first few MB (ignoring the date filter, so
+    the estimate is an upper bound).
+    """
+    if IncidentDataset.is_dataset(source):
+        files = [path for partition in IncidentDataset(source).prune(start, end, departments)
+                 for path in partition['files']]
+        if not files:
+            return {'rows': 0, 'mb': 0.0}
+        rows = sum(pq.ParquetFile(path).metadata.num_rows for path in files)
+        sample = next(pq.ParquetFile(files[0]).iter_batches(batch_size=SAMPLE_ROWS)).to_pandas()
+        return {'rows': rows, 'mb': rows * footprint(sample) / max(len(sample), 1) / MB}
+
+    size = os.path.getsize(source)
+    with open(source, 'rb') as f:
+        head = f.read(SAMPLE_BYTES)
+    if len(head) < size:
+        head = head[:head.rfind(b'\n') + 1]
+    sample = pd.read_csv(io.BytesIO(head))
+    convert_types(sample)
+    scale = size / max(len(head), 1)
+    return {'rows': int(len(sample) * scale), 'mb': footprint(sample) * scale / MB}
+
+
+class MemoryBudget:
+    """Memory accounting for one process: load stages and named structures against an optional budget.
+
+    Structures are registered with ``track`` under a priority and an evict
+    callback (structures without one, like the incident frame, are never
+    evicted). Their size is measured from a getter and from the objects
+    handed to ``hold``, which are referenced weakly so that accounting
+    never keeps an evicted structure alive. ``enforce`` evicts the
+    lowest-priority structures until the tracked footprint fits the budget.
+    """
+
+    def __init__(self, limit_mb=None, max_stages=100):
+        self.limit_mb = limit_mb
+        self.stages = deque(maxlen=max_stages)
+        self.evictions = 0
+        self.evicted_mb = 0.0
+        self._structures = {}
+        self._lock = threading.RLock()
+
+    def track(self, name, get=None, priority=0, evict=None):
+        """Register a structure; get() returns it (or None if not built) and evict() frees it."""
+        with self._lock:
+            self._structures[name] = {'get': get, 'priority': priority, 'evict': evict,
+                                      'held': weakref.WeakValueDictionary()}
+
+    def hold(self, name, key, obj):
+        """Account an object built for a tracked structure (e.g. one cached entry per dataset version)."""
+        with self._lock:
+            self._structures[name]['held'][key] = obj
+        return obj
+
+    @contextmanager
+    def stage(self, name, get=None):
+        """Record the wall time and resident-memory change of a block, and the footprint of get() after it."""
+        before, started = process_memory_mb(), time.perf_counter()
+        yield
+        after = process_memory_mb()
+        self.stages.append({
+            'stage': name,
+            'seconds': round(time.perf_counter() - started, 3),
+            'rss_mb': round(after, 1),
+            'rss_delta_mb': round(after - before, 1),
+            'footprint_mb': None if get is None else round(footprint(get()) / MB, 1),
+        })
+
+    def _objects(self, structure):
+        objects = list(structure['held'].values())
+        if structure['get'] is not None:
+            objects.append(structure['get']())
+        return objects
+
+    def usage(self):
+        """Footprint in MB of every tracked structure, highest priority first.
+
+        An object reachable from several structures counts toward the
+        highest-priority one only.
+        """
+        with self._lock:
+            structures = sorted(self._structures.items(), key=lambda item: -item[1]['priority'])
+        seen = set()
+        rows = [{'structure': name, 'priority': structure['priority'],
+                 'mb': sum(footprint(obj, seen) for obj in self._objects(structure)) / MB,
+                 'evictable': structure['evict'] is not None}
+                for name, structure in structures]
+        return pd.DataFrame(rows, columns=['structure', 'priority', 'mb', 'evictable'])
+
+    def total_mb(self):
+        return float(self.usage()['mb'].sum())
+
+    def fits(self, mb=0):
+        """True if the tracked footprint plus mb is within the budget (always, without one)."""
+        return self.limit_mb is None or self.total_mb() + mb <= self.limit_mb
+
+    def enforce(self, reserve_mb=0):
+        """Evict structures, lowest priority first, until the tracked footprint plus reserve_mb fits.
+
+        Returns the names of the structures evicted.
+        """
+        if self.limit_mb is None:
+            return []
+        evicted = []
+        with self._lock:
+            usage = self.usage()
+            total = usage['mb'].sum() + reserve_mb
+            candidates = usage[usage['evictable'] & (usage['mb'] >= MIN_EVICT_MB)].sort_values('priority', kind='stable')
+            for row in candidates.itertuples(index=False):
+                if total <= self.limit_mb:
+                    break
+                structure = self._structures[row.structure]
+                structure['evict']()
+                structure['held'].clear()
+                total -= row.mb
+                self.evictions += 1
+                self.evicted_mb += row.mb
+                evicted.append(row.structure)
+        return evicted
+
+    def stage_report(self):
+        return pd.DataFrame(list(self.stages), columns=STAGE_COLUMNS)
+
+    def summary(self):
+        """Budget, process memory, structure footprints and stages as plain values (e.g. for JSON)."""
+        usage = self.usage()
+        return {
+            'budget_mb': self.limit_mb,
+            'rss_mb': round(process_memory_mb(), 1),
+            'tracked_mb': round(float(usage['mb'].sum()), 1),
+            'structures': {row.structure: round(row.mb, 2) for row in usage.itertuples(index=False)},
+            'stages': list(self.stages),
+            'evictions': self.evictions,
+            'evicted_mb': round(self.evicted_mb, 1),
+        }
+
+    def report(self):
+        """Printable report of the stages and structures."""
+        summary = self.summary()
+        budget = 'unlimited' if self.limit_mb is None else f"{self.limit_mb:,.0f} MB"
+        lines = [f"🧠 Memory: {summary['rss_mb']:,.1f} MB resident, {summary['tracked_mb']:,.1f} MB tracked "
+                 f"(budget {budget}, {self.evictions} evictions)"]
+        for stage in summary['stages']:
+            size = '' if stage['footprint_mb'] is None else f", {stage['footprint_mb']:,.1f} MB held"
+            lines.append(f"   stage {stage['stage']:<24} {stage['seconds']:>7.2f}s  {stage['rss_delta_mb']:+9.1f} MB{size}")
+        for name, mb in summary['structures'].items():
+            lines.append(f"   {name:<30} {mb:>10,.2f} MB")
+        return '\n'.join(lines)
+
+
+def read_within_budget(budget, source, start=None, end=None, departments=None, seed=DEFAULT_SEED):
+    """Read the incidents whole if they fit the budget, otherwise a uniform sample that does.
+
+    Lower-priority structures are evicted first to make room. If the
+    selection still does not fit, it is streamed file by file or chunk by
+    chunk through a reservoir sampler sized to the room left, so it is never
+    resident in full; the sample records how many rows it stands for in
+    ``attrs['sampled_from']``.
+    """
+    estimate = estimate_load(source, start, end, departments)
+    if estimate['rows'] == 0:
+        return read_incidents(source, start, end, departments)
+    budget.enforce(reserve_mb=estimate['mb'])
+    if budget.fits(estimate['mb']):
+        return read_incidents(source, start, end, departments)
+    room = max(budget.limit_mb - budget.total_mb(), 0) * FRAME_SHARE
+    n = max(SAMPLE_TIERS[0], int(estimate['rows'] * room / estimate['mb']))
+    sampler = ReservoirSampler(n, seed=seed)
+    for chunk in iter_incidents(source, start, end, departments):
+        sampler.update(chunk)
+    df = sampler.sample()
+    df.attrs['sampled_from'] = sampler.seen
+    return df
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Estimate and measure the memory an incidents load takes.")
+    parser.add_argument('source', help="CSV file or partitioned dataset directory")
+    parser.add_argument('--start')
+    parser.add_argument('--end')
+    parser.add_argument('--department', action='append')
+    parser.add_argument('--memory-budget', type=float, default=budget_from_env(),
+                        help=f"Budget in MB (default: ${BUDGET_ENV}, else unlimited)")
+    args = parser.parse_args()
+
+    estimate = estimate_load(args.source, args.start, args.end, args.department)
+    print(f"📐 Estimated {estimate['rows']:,} rows, {estimate['mb']:,.1f} MB in memory")
+    budget = MemoryBudget(args.memory_budget)
+    frame = {}
+    budget.track('frame', lambda: frame.get('df'), priority=100)
+    with budget.stage('read', lambda: frame.get('df')):
+        frame['df'] = read_within_budget(budget, args.source, args.start, args.end, args.department)
+    if 'sampled_from' in frame['df'].attrs:
+        print(f"⚠️ Over budget: sampled {len(frame['df']):,} of {frame['df'].attrs['sampled_from']:,} rows")
+    print(budget.report())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,541 @@
+#!/usr/bin/env python3
+"""
+Incident Query Service
+Local asyncio HTTP/JSON (and Arrow) API over precomputed incident aggregates, with a load generator
+"""
+
+import argparse
+import asyncio
+import json
+import time
+from datetime import date, datetime
+from http import HTTPStatus
+from urllib.parse import parse_qs, urlsplit
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+from data_export import EXPORT_FORMATS, iter_export
+from incident_dataset import read_incidents
+from incident_schema import CategoryTables, add_derived_columns
+from result_cache import ResultCache
+
+# Response times are kept as whole-minute histograms per cell; the last bin holds everything longer
+RESPONSE_BINS = 120
+NO_DAY = np.iinfo(np.int32).min
+DEFAULT_ROW_COLUMNS = ['incident_number', 'alarm_datetime', 'city', 'incident_main_type', 'incident_description',
+                       'response_time_minutes', 'total_casualties']
+ARROW_MEDIA_TYPE = 'application/vnd.apache.arrow.stream'
+DIMENSIONS = {'city': 'city', 'incident_type': 'incident_main_type'}
+
+
+def load_incidents(source):
+    """Load a CSV or partitioned dataset with the types, derived columns and categorical codes of the tools."""
+    df = read_incidents(source)
+    add_derived_columns(df)
+    CategoryTables.for_data(source).encode(df)
+    df.attrs['dataset_version'] = f"{source}:{len(df)}:{df['alarm_datetime'].max()}"
+    return df
+
+
+def _day_numbers(alarm):
+    """Days since the epoch for each alarm time (NO_DAY where missing)."""
+    days = alarm.dt.tz_convert(None).to_numpy(dtype='datetime64[D]').astype(np.int64)
+    return np.where(alarm.notna().to_numpy(), days, NO_DAY).astype(np.int32)
+
+
+def _parse_day(value):
+    return None if value in (None, '') else int(np.datetime64(pd.Timestamp(value).date(), 'D').astype(np.int64))
+
+
+class AggregateCube:
+    """Incident counts, sums and response-time histograms per (day, city, incident type) cell.
+
+    Built once from the frame; every aggregate query masks the cells (a few
+    thousand, not millions of rows) and sums them.
+    """
+
+    def __init__(self, df):
+        self.cities = df['city'].cat.categories
+        self.types = df['incident_main_type'].cat.categories
+        day = _day_numbers(df['alarm_datetime']).astype(np.int64)
+        city = df['city'].cat.codes.to_numpy(dtype=np.int64)
+        incident_type = df['incident_main_type'].cat.codes.to_numpy(dtype=np.int64)
+
+        # One int64 key per (day, city, type) cell
+        n_cities, n_types = len(self.cities) + 1, len(self.types) + 1
+        keys = ((day - NO_DAY) * n_cities + (city + 1)) * n_types + (incident_type + 1)
+        cell_keys, cells = np.unique(keys, return_inverse=True)
+        self.cell_type = (cell_keys % n_types - 1).astype(np.int32)
+        self.cell_city = (cell_keys // n_types % n_cities - 1).astype(np.int32)
+        self.cell_day = (cell_keys // n_types // n_cities + NO_DAY).astype(np.int64)
+        n = len(cell_keys)
+
+        response = pd.to_numeric(df['response_time_minutes'], errors='coerce').to_numpy(dtype=float)
+        valid = np.isfinite(response)
+        casualties = pd.to_numeric(df['total_casualties'], errors='coerce').fillna(0).to_numpy(dtype=float)
+        self.counts = np.bincount(cells, minlength=n)
+        self.casualties = np.bincount(cells, weights=casualties, minlength=n)
+        self.response_sum = np.bincount(cells[valid], weights=response[valid], minlength=n)
+        self.response_max = np.full(n, -np.inf)
+        np.maximum.at(self.response_max, cells[valid], response[valid])
+        # Cells holding fractional minutes; elsewhere each bin is exact
+        self.response_fractional = np.bincount(cells[valid], weights=response[valid] % 1 != 0, minlength=n) > 0
+        bins = np.clip(np.floor(response[valid]), 0, RESPONSE_BINS).astype(np.int64)
+        self.response_hist = np.bincount(cells[valid] * (RESPONSE_BINS + 1) + bins,
+                                         minlength=n * (RESPONSE_BINS + 1)).reshape(n, RESPONSE_BINS + 1)
+
+    def mask(self, start=None, end=None, city=None, incident_type=None):
+        """Boolean mask of the cells matching the filters (unknown values match nothing)."""
+        mask = np.ones(len(self.counts), dtype=bool)
+        start, end = _parse_day(start), _parse_day(end)
+        if start is not None:
+            mask &= (self.cell_day >= start) & (self.cell_day != NO_DAY)
+        if end is not None:
+            mask &= (self.cell_day <= end) & (self.cell_day != NO_DAY)
+        if city is not None:
+            mask &= self.cell_city == self.cities.get_indexer([city])[0] if city in self.cities else False
+        if incident_type is not None:
+            mask &= self.cell_type == self.types.get_indexer([incident_type])[0] if incident_type in self.types else False
+        return mask
+
+    def percentiles(self, mask, quantiles=(50, 90, 99)):
+        """Response-time percentiles from the merged histograms, capped at the largest response.
+
+        When every response under the mask is a whole number of minutes the
+        bins are exact values, so the result matches pandas' (linearly
+        interpolated) quantile on the rows; otherwise it is interpolated
+        within each one-minute bin. The open-ended last bin stands for the
+        largest response.
+        """
+        hist = self.response_hist[mask].sum(axis=0)
+        total = hist.sum()
+        if total == 0:
+            return {f"p{q:g}": None for q in quantiles}
+        cumulative = np.cumsum(hist)
+        largest = float(self.response_max[mask].max())
+        whole_minutes = not self.response_fractional[mask].any()
+
+        def order_statistic(k):
+            i = int(np.searchsorted(cumulative, k, side='right'))
+            return largest if i >= RESPONSE_BINS else float(i)
+
+        result = {}
+        for q in quantiles:
+            if whole_minutes:
+                position = q / 100 * (total - 1)
+                below = int(np.floor(position))
+                low, high = order_statistic(below), order_statistic(min(below + 1, total - 1))
+                value = low + (position - below) * (high - low)
+            else:
+                rank = q / 100 * total
+                i = int(np.searchsorted(cumulative, rank, side='left'))
+                if i >= RESPONSE_BINS:
+                    value = largest
+                else:
+                    below = cumulative[i - 1] if i else 0
+                    value = i + (rank - below) / hist[i] if hist[i] else float(i)
+            result[f"p{q:g}"] = round(min(float(value), largest), 2)
+        return result
+
+    def summary(self, mask):
+        count = int(self.counts[mask].sum())
+        responses = int(self.response_hist[mask].sum())
+        return {
+            'incidents': count,
+            'total_casualties': float(self.casualties[mask].sum()),
+            'average_response_time': round(float(self.response_sum[mask].sum() / responses), 2) if responses else None,
+            'max_response_time': float(self.response_max[mask].max()) if responses else None,
+            **self.percentiles(mask),
+        }
+
+    def top(self, mask, dimension='city', n=5):
+        """The n most frequent cities or incident types under the filters."""
+        codes, labels = (self.cell_city, self.cities) if dimension == 'city' else (self.cell_type, self.types)
+        keep = mask & (codes >= 0)
+        counts = np.bincount(codes[keep], weights=self.counts[keep], minlength=len(labels)).astype(np.int64)
+        order = np.argsort(-counts, kind='stable')[:n]
+        order = order[counts[order] > 0]
+        return pd.DataFrame({dimension: labels[order].astype(str), 'incidents': counts[order]})
+
+    def timeseries(self, mask, freq='day'):
+        """Incident counts per day, week (starting Monday) or month under the filters."""
+        keep = mask & (self.cell_day != NO_DAY)
+        days = self.cell_day[keep].astype('datetime64[D]')
+        if freq == 'month':
+            periods = days.astype('datetime64[M]').astype('datetime64[D]')
+        elif freq == 'week':
+            # 1970-01-01 was a Thursday
+            periods = days - ((days.astype(np.int64) + 3) % 7).astype('timedelta64[D]')
+        elif freq == 'day':
+            periods = days
+        else:
+            raise ValueError(f"Unknown freq: {freq}")
+        series = pd.Series(self.counts[keep]).groupby(periods).sum()
+        return pd.DataFrame({'period': pd.DatetimeIndex(series.index).strftime('%Y-%m-%d'), 'incidents': series.to_numpy()})
+
+
+class IncidentQueryEngine:
+    """Answers the service's queries; results are memoized in a ResultCache per filter set."""
+
+    def __init__(self, df, cache=None):
+        # Rows in alarm-time order so pages are stable
+        self.df = df.sort_values('alarm_datetime', kind='stable', na_position='last').reset_index(drop=True)
+        self.cube = AggregateCube(self.df)
+        self.cache = cache or ResultCache(max_entries=1024)
+        self.cache.set_dataset_version(df.attrs.get('dataset_version'))
+
+    def _cached(self, name, params, compute):
+        return self.cache.get_or_compute(name, params, compute)
+
+    def summary(self, filters):
+        return self._cached('summary', filters, lambda: self.cube.summary(self.cube.mask(**filters)))
+
+    def percentiles(self, filters, quantiles):
+        if not all(0 <= q <= 100 for q in quantiles):
+            raise ValueError("q must be between 0 and 100")
+        return self._cached('percentiles', dict(filters, q=quantiles),
+                            lambda: self.cube.percentiles(self.cube.mask(**filters), quantiles))
+
+    def top(self, filters, dimension, n):
+        if dimension not in DIMENSIONS:
+            raise ValueError(f"dimension must be one of {sorted(DIMENSIONS)}")
+        return self._cached('top', dict(filters, dimension=dimension, n=n),
+                            lambda: self.cube.top(self.cube.mask(**filters), dimension, n))
+
+    def timeseries(self, filters, freq):
+        return self._cached('timeseries', dict(filters, freq=freq),
+                            lambda: self.cube.timeseries(self.cube.mask(**filters), freq))
+
+    def _row_positions(self, filters, max_response_time):
+        """Positions of the rows matching the filters (cached, so paging does not rescan)."""
+        def compute():
+            df = self.df
+            keep = np.ones(len(df), dtype=bool)
+            if filters['start'] or filters['end']:
+                days = _day_numbers(df['alarm_datetime'])
+                keep &= days != NO_DAY
+                if filters['start']:
+                    keep &= days >= _parse_day(filters['start'])
+                if filters['end']:
+                    keep &= days <= _parse_day(filters['end'])
+            if filters['city'] is not None:
+                keep &= (df['city'] == filters['city']).to_numpy()
+            if filters['incident_type'] is not None:
+                keep &= (df['incident_main_type'] == filters['incident_type']).to_numpy()
+            if max_response_time is not None:
+                keep &= (df['response_time_minutes'] <= max_response_time).to_numpy()
+            return np.flatnonzero(keep)
+        return self._cached('row_positions', dict(filters, max_response_time=max_response_time), compute)
+
+    def rows(self, filters, page=1, page_size=100, columns=None, max_response_time=None):
+        """One page of raw rows plus the total number of matching rows."""
+        columns = [col for col in (columns or DEFAULT_ROW_COLUMNS) if col in self.df.columns]
+        positions = self._row_positions(filters, max_response_time)
+        start = (page - 1) * page_size
+        return self.df.iloc[positions[start:start + page_size]][columns], len(positions)
+
+    def export(self, filters, fmt='csv', columns=None, max_response_time=None):
+        """All matching rows as an iterator of export chunks, plus the row count."""
+        columns = [col for col in columns if col in self.df.columns] if columns else list(self.df.columns)
+        positions = self._row_positions(filters, max_response_time)
+        return iter_export(self.df, fmt, columns, positions), len(positions)
+
+
+def _json_default(value):
+    if isinstance(value, (np.integer,)):
+        return int(value)
+    if isinstance(value, (np.floating,)):
+        return None if np.isnan(value) else float(value)
+    if isinstance(value, (pd.Timestamp, datetime, date)):
+        return value.isoformat()
+    if value is pd.NaT or value is None:
+        return None
+    return str(value)
+
+
+def _records(frame):
+    """JSON-ready records (missing values as null)."""
+    frame = frame.astype(object).where(frame.notna(), None)
+    return frame.to_dict(orient='records')
+
+
+def _arrow_bytes(frame):
+    table = pa.Table.from_pandas(frame, preserve_index=False)
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as stream:
+        stream.write_table(table)
+    return sink.getvalue().to_pybytes()
+
+
+class QueryService:
+    """HTTP/1.1 server with keep-alive connections over an IncidentQueryEngine.
+
+    Endpoints (GET, filters ``start``, ``end``, ``city``, ``incident_type``):
+    ``/summary``, ``/percentiles?q=50,90,99``, ``/top?dimension=city&n=5``,
+    ``/timeseries?freq=day|week|month``, ``/rows?page=1&page_size=100`` and
+    ``/export?format=csv|csv.gz|parquet``, which streams every matching row
+    in chunks.
+    Tabular results come back as Arrow IPC with ``format=arrow`` or an
+    ``Accept: application/vnd.apache.arrow.stream`` header.
+    """
+
+    def __init__(self, engine, host='127.0.0.1', port=8765, idle_timeout=30.0, max_page_size=10_000):
+        self.engine = engine
+        self.host = host
+        self.port = port
+        self.idle_timeout = idle_timeout
+        self.max_page_size = max_page_size
+        self.server = None
+        self.requests = 0
+        self.connections = 0
+
+    async def start(self):
+        self.server = await asyncio.start_server(self._handle, self.host, self.port)
+        self.port = self.server.sockets[0].getsockname()[1]
+        return self
+
+    async def serve_forever(self):
+        if self.server is None:
+            await self.start()
+        async with self.server:
+            await self.server.serve_forever()
+
+    async def _handle(self, reader, writer):
+        self.connections += 1
+        try:
+            while True:
+                request_line = await asyncio.wait_for(reader.readline(), self.idle_timeout)
+                if not request_line.strip():
+                    break
+                method, target, version = request_line.decode('latin-1').split()
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b'\r\n', b'\n', b''):
+                        break
+                    name, _, value = line.decode('latin-1').partition(':')
+                    headers[name.strip().lower()] = value.strip()
+                if int(headers.get('content-length', 0)):
+                    await reader.readexactly(int(headers['content-length']))
+
+                connection = headers.get('connection', '').lower()
+                keep_alive = connection != 'close' if version == 'HTTP/1.1' else connection == 'keep-alive'
+                status, content_type, body, extra_headers = self.dispatch(method, target, headers)
+                streamed = not isinstance(body, bytes)
+                head = [f"HTTP/1.1 {status.value} {status.phrase}", f"Content-Type: {content_type}",
+                        'Transfer-Encoding: chunked' if streamed else f"Content-Length: {len(body)}",
+                        f"Connection: {'keep-alive' if keep_alive else 'close'}"]
+                head += [f"{name}: {value}" for name, value in extra_headers.items()]
+                header = ('\r\n'.join(head) + '\r\n\r\n').encode('latin-1')
+                if streamed:
+                    writer.write(header)
+                    await self._stream(writer, body)
+                else:
+                    writer.write(header + body)
+                    await writer.drain()
+                self.requests += 1
+                if not keep_alive:
+                    break
+        except (asyncio.TimeoutError, asyncio.IncompleteReadError, ConnectionError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+    @staticmethod
+    async def _stream(writer, chunks):
+        """Send an iterator of byte chunks with chunked transfer encoding.
+
+        Chunks are produced in a worker thread and each is drained before the
+        next is made, so a slow client holds back the export instead of
+        letting it pile up in memory.
+        """
+        while True:
+            data = await asyncio.to_thread(next, chunks, None)
+            if data is None:
+                break
+            if data:
+                writer.write(f"{len(data):x}\r\n".encode('latin-1') + data + b'\r\n')
+                await writer.drain()
+        writer.write(b'0\r\n\r\n')
+        await writer.drain()
+
+    def dispatch(self, method, target, headers):
+        """Route one request; returns (status, content type, body bytes or chunk iterator, extra headers)."""
+        if method != 'GET':
+            return self._error(HTTPStatus.METHOD_NOT_ALLOWED, "Only GET is supported")
+        url = urlsplit(target)
+        params = {key: values[-1] for key, values in parse_qs(url.query).items()}
+        arrow = params.get('format') == 'arrow' or ARROW_MEDIA_TYPE in headers.get('accept', '')
+        filters = {key: params.get(key) or None for key in ('start', 'end', 'city', 'incident_type')}
+        try:
+            if url.path == '/health':
+                return self._json({'status': 'ok', 'rows': len(self.engine.df)})
+            if url.path == '/summary':
+                return self._json(self.engine.summary(filters))
+            if url.path == '/percentiles':
+                quantiles = tuple(float(q) for q in params.get('q', '50,90,99').split(','))
+                return self._json(self.engine.percentiles(filters, quantiles))
+            if url.path == '/top':
+                frame = self.engine.top(filters, params.get('dimension', 'city'), int(params.get('n', 5)))
+                return self._table(frame, arrow)
+            if url.path == '/timeseries':
+                return self._table(self.engine.timeseries(filters, params.get('freq', 'day')), arrow)
+            if url.path == '/rows':
+                page = max(int(params.get('page', 1)), 1)
+                page_size = min(max(int(params.get('page_size', 100)), 1), self.max_page_size)
+                columns = params['columns'].split(',') if params.get('columns') else None
+                max_response = float(params['max_response_time']) if params.get('max_response_time') else None
+                frame, total = self.engine.rows(filters, page, page_size, columns, max_response)
+                meta = {'page': page, 'page_size': page_size, 'total_rows': total,
+                        'pages': -(-total // page_size)}
+                if arrow:
+                    return self._table(frame, True, {f"X-{key.title().replace('_', '-')}": value
+                                                     for key, value in meta.items()})
+                return self._json(dict(meta, rows=_records(frame)))
+            if url.path == '/export':
+                fmt = params.get('format', 'csv')
+                if fmt not in EXPORT_FORMATS:
+                    raise ValueError(f"format must be one of {sorted(EXPORT_FORMATS)}")
+                columns = params['columns'].split(',') if params.get('columns') else None
+                max_response = float(params['max_response_time']) if params.get('max_response_time') else None
+                chunks, total = self.engine.export(filters, fmt, columns, max_response)
+                media_type, extension = EXPORT_FORMATS[fmt]
+                return HTTPStatus.OK, media_type, chunks, {
+                    'Content-Disposition': f'attachment; filename="incidents{extension}"', 'X-Total-Rows': total}
+        except (ValueError, KeyError) as e:
+            return self._error(HTTPStatus.BAD_REQUEST, str(e))
+        return self._error(HTTPStatus.NOT_FOUND, f"Unknown endpoint: {url.path}")
+
+    @staticmethod
+    def _json(payload, status=HTTPStatus.OK):
+        return status, 'application/json', json.dumps(payload, default=_json_default).encode(), {}
+
+    def _table(self, frame, arrow, extra_headers=None):
+        if arrow:
+            return HTTPStatus.OK, ARROW_MEDIA_TYPE, _arrow_bytes(frame), extra_headers or {}
+        return self._json(_records(frame))
+
+    def _error(self, status, message):
+        return self._json({'error': message}, status)
+
+
+async def _request(reader, writer, path, host):
+    """Send one keep-alive GET and read the response; returns (status, body)."""
+    writer.write(f"GET {path} HTTP/1.1\r\nHost: {host}\r\nConnection: keep-alive\r\n\r\n".encode())
+    await writer.drain()
+    status = int((await reader.readline()).split()[1])
+    length = 0
+    while True:
+        line = await reader.readline()
+        if line in (b'\r\n', b'\n', b''):
+            break
+        name, _, value = line.decode('latin-1').partition(':')
+        if name.strip().lower() == 'content-length':
+            length = int(value)
+    return status, await reader.readexactly(length)
+
+
+DEFAULT_BENCH_PATHS = [
+    '/summary',
+    '/summary?city={city}',
+    '/percentiles?q=50,90,99&incident_type={incident_type}',
+    '/top?dimension=city&n=5',
+    '/top?dimension=incident_type&n=8&start={start}',
+    '/timeseries?freq=month',
+    '/timeseries?freq=day&city={city}&start={start}',
+    '/rows?page=1&page_size=100&city={city}',
+    '/rows?page=2&page_size=100&format=arrow',
+]
+
+
+async def load_generate(host, port, paths, requests=2000, concurrency=16):
+    """Issue requests over `concurrency` keep-alive connections and report latency percentiles and throughput."""
+    latencies = []
+    errors = 0
+    counter = iter(range(requests))
+
+    async def worker():
+        nonlocal errors
+        reader, writer = await asyncio.open_connection(host, port)
+        try:
+            for i in counter:
+                started = time.perf_counter()
+                status, _ = await _request(reader, writer, paths[i % len(paths)], host)
+                latencies.append(time.perf_counter() - started)
+                errors += status != 200
+        finally:
+            writer.close()
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    latencies = np.array(latencies) * 1000
+    return {
+        'requests': len(latencies),
+        'errors': errors,
+        'concurrency': concurrency,
+        'seconds': round(elapsed, 3),
+        'requests_per_second': round(len(latencies) / elapsed, 1),
+        'p50_ms': round(float(np.percentile(latencies, 50)), 2),
+        'p99_ms': round(float(np.percentile(latencies, 99)), 2),
+    }
+
+
+def bench_paths(df):
+    """Fill the default request mix with values that exist in the data."""
+    values = {
+        'city': df['city'].mode().iloc[0],
+        'incident_type': df['incident_main_type'].mode().iloc[0],
+        'start': (df['alarm_datetime'].max() - pd.Timedelta(days=90)).date().isoformat(),
+    }
+    return [path.format(**values).replace(' ', '%20') for path in DEFAULT_BENCH_PATHS]
+
+
+async def run_local_bench(df, requests, concurrency):
+    """Start the service on a free localhost port and load-test it in the same event loop."""
+    service = await QueryService(IncidentQueryEngine(df), port=0).start()
+    async with service.server:
+        return await load_generate(service.host, service.port, bench_paths(df), requests, concurrency)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Incident query API")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    serve = subparsers.add_parser('serve', help="Run the query service")
+    serve.add_argument('source', help="CSV file or partitioned dataset directory")
+    serve.add_argument('--host', default='127.0.0.1')
+    serve.add_argument('--port', type=int, default=8765)
+
+    bench = subparsers.add_parser('bench', help="Measure latency and throughput on localhost")
+    bench.add_argument('source', help="CSV file or partitioned dataset directory")
+    bench.add_argument('--requests', type=int, default=2000)
+    bench.add_argument('--concurrency', type=int, default=16)
+    bench.add_argument('--host', help="Benchmark an already running service instead of a local one")
+    bench.add_argument('--port', type=int, default=8765)
+
+    args = parser.parse_args()
+    df = load_incidents(args.source)
+
+    if args.command == 'serve':
+        service = QueryService(IncidentQueryEngine(df), args.host, args.port)
+        print(f"🚀 Serving {len(df):,} incidents on http://{args.host}:{args.port}")
+        try:
+            asyncio.run(service.serve_forever())
+        except KeyboardInterrupt:
+            print(f"\n📊 Served {service.requests:,} requests over {service.connections:,} connections")
+        return
+
+    if args.host:
+        stats = asyncio.run(load_generate(args.host, args.port, bench_paths(df), args.requests, args.concurrency))
+    else:
+        stats = asyncio.run(run_local_bench(df, args.requests, args.concurrency))
+    print("📊 Load test results:")
+    for key, value in stats.items():
+        print(f"   {key}: {value}")
+
+
+if __name__ == "__main__":
+    main()
@@ -9,6 +9,9 @@ import numpy as np
 from datetime import datetime
 import matplotlib.pyplot as plt
 import seaborn as sns
+from data_profiler import DataProfiler
+from cardinality_sketch import distinct_count
+from incident_schema import CategoryTables, observed_counts
 
 def quick_data_preview():
     """Generate a quick preview of the data."""
@@ -17,23 +20,30 @@ def quick_data_preview():
     print("=" * 50)
     
     # Load data
-    df = pd.read_csv('/Users/test/emergency-incidents-analysis/NERIS_COMPLETE_INCIDENTS.csv')
+    csv_path = '/Users/test/emergency-incidents-analysis/NERIS_COMPLETE_INCIDENTS.csv'
+    df = pd.read_csv(csv_path)
+    raw_size = df.memory_usage(deep=True).sum()
+    
+    # Low-cardinality strings as categoricals over the code tables kept beside the CSV
+    category_tables = CategoryTables.for_data(csv_path)
+    category_tables.encode(df)
+    category_tables.save()
     
     print(f"📊 Dataset Info:")
     print(f"   Total Records: {len(df):,}")
     print(f"   Total Columns: {len(df.columns)}")
-    print(f"   File Size: {df.memory_usage(deep=True).sum() / 1024**2:.1f} MB")
+    print(f"   File Size: {raw_size / 1024**2:.1f} MB ({df.memory_usage(deep=True).sum() / 1024**2:.1f} MB encoded)")
     
     # Basic statistics
     print(f"\n📈 Quick Statistics:")
     print(f"   Date Range: {df['alarm_datetime'].min()} to {df['alarm_datetime'].max()}")
-    print(f"   Cities: {df['city'].nunique()} unique cities")
-    print(f"   Incident Types: {df['incident_type'].nunique()} unique types")
+    print(f"   Cities: {distinct_count(df['city'])} unique cities")
+    print(f"   Incident Types: {distinct_count(df['incident_type'])} unique types")
     
     # Top incident types
     print(f"\n🔥 Top 5 Incident Types:")
     # Split incident types and get main category
-    incident_main_types = df['incident_type'].str.split('||').str[0]
+    incident_main_types = df['incident_type'].str.split('||', regex=False).str[0]
     incident_main_types = incident_main_types[incident_main_types.notna() & (incident_main_types != '')]
     
     if len(incident_main_types) > 0:
@@ -43,14 +53,14 @@ def quick_data_preview():
             print(f"   {i}. {incident_type}: {count:,} ({percentage:.1f}%)")
     else:
         # Fallback to full incident description
-        incident_descriptions = df['incident_description'].value_counts()
+        incident_descriptions = observed_counts(df['incident_description'])
         for i, (incident_desc, count) in enumerate(incident_descriptions.head(5).items(), 1):
             percentage = (count / len(df)) * 100
             print(f"   {i}. {incident_desc}: {count:,} ({percentage:.1f}%)")
     
     # Top cities
     print(f"\n🏙️ Top 5 Cities:")
-    city_counts = df['city'].value_counts()
+    city_counts = observed_counts(df['city'])
     for i, (city, count) in enumerate(city_counts.head(5).items(), 1):
         percentage = (count / len(df)) * 100
         print(f"   {i}. {city}: {count:,} ({percentage:.1f}%)")
@@ -72,13 +82,21 @@ def quick_data_preview():
     
     # Data quality
     print(f"\n🔍 Data Quality:")
-    missing_percentages = (df.isnull().sum() / len(df) * 100).sort_values(ascending=False)
+    profiler = DataProfiler().update(df)
+    missing_percentages = profiler.missing_percentages()
     print(f"   Columns with Missing Data: {(missing_percentages > 0).sum()}")
     
     top_missing = missing_percentages[missing_percentages > 0].head(5)
     for col, pct in top_missing.items():
         print(f"   - {col}: {pct:.1f}% missing")
     
+    for col, count in profiler.results()['invalid_parse_counts'].items():
+        print(f"   - {col}: {count:,} unparseable values")
+    
+    for rule, count in profiler.rule_counts.items():
+        if count > 0:
+            print(f"   ⚠️ {rule.replace('_', ' ')}: {count:,} records")
+    
     print(f"\n✅ Data Preview Complete!")
     print(f"   Ready for analysis with data_analyzer.py")
     print(f"   Ready for dashboard with dashboard.py")
@@ -97,7 +115,7 @@ def create_quick_visualization(df):
     df_viz['alarm_datetime'] = pd.to_datetime(df_viz['alarm_datetime'], errors='coerce', utc=True)
     
     # 1. Incident types - fix empty values
-    incident_types = df_viz['incident_type'].str.split('||').str[0]
+    incident_types = df_viz['incident_type'].str.split('||', regex=False).str[0]
     incident_types = incident_types[incident_types.notna() & (incident_types != '')]
     
     if len(incident_types) > 0:
@@ -124,7 +142,7 @@ def create_quick_visualization(df):
         axes[0, 1].set_title('Response Times - No Data')
     
     # 3. Top cities
-    city_counts = df_viz['city'].value_counts().head(8)
+    city_counts = observed_counts(df_viz['city']).head(8)
     if len(city_counts) > 0:
         axes[1, 0].barh(range(len(city_counts)), city_counts.values)
         axes[1, 0].set_yticks(range(len(city_counts)))
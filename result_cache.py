@@ -0,0 +1,134 @@
+"""
+Result Cache
+Process-wide LRU cache of filtered aggregates shared across dashboard sessions
+"""
+
+import hashlib
+import json
+import sys
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+
+def make_key(chart_id, dataset_version, filter_state):
+    """Return a canonical hash of (chart, dataset version, filters).
+
+    Filters are serialized with sorted keys, so the same selection made in any
+    order or session maps to the same key.
+    """
+    payload = json.dumps([chart_id, dataset_version, filter_state or {}], sort_keys=True, default=str)
+    return hashlib.sha1(payload.encode()).hexdigest()
+
+
+def estimate_size(value):
+    """Approximate memory held by a cached result in bytes."""
+    if isinstance(value, (pd.DataFrame, pd.Series)):
+        usage = value.memory_usage(deep=True)
+        return int(usage.sum() if isinstance(usage, pd.Series) else usage)
+    if isinstance(value, np.ndarray):
+        return value.nbytes
+    if isinstance(value, (tuple, list)):
+        return sys.getsizeof(value) + sum(estimate_size(item) for item in value)
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(estimate_size(item) for item in value.values())
+    return sys.getsizeof(value)
+
+
+class ResultCache:
+    """Thread-safe LRU cache bounded by entry count and total bytes.
+
+    Keys combine the chart id, the dataset version and the filter state, so
+    entries from an older dataset are never served. Callers holding different
+    versions (e.g. dashboard sessions on different dataset slices) share the
+    cache without clearing each other's entries; those of versions no longer
+    in use age out of the LRU. Concurrent misses on the same key are computed
+    once; other callers wait for that result.
+    """
+
+    def __init__(self, max_entries=256, max_bytes=256 * 1024 ** 2):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.dataset_version = None
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.nbytes = 0
+        self._entries = OrderedDict()
+        self._sizes = {}
+        self._pending = {}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def set_dataset_version(self, version):
+        """Set the dataset version used when get_or_compute is not given one."""
+        with self._lock:
+            self.dataset_version = version
+
+    def invalidate(self, chart_id=None):
+        """Drop every entry (or every entry of one chart)."""
+        with self._lock:
+            keys = [key for key, (_, entry_chart, _) in self._entries.items()
+                    if chart_id is None or entry_chart == chart_id]
+            for key in keys:
+                self._remove(key)
+
+    def get_or_compute(self, chart_id, filter_state, compute, dataset_version=None):
+        """Return the cached result for the key, calling compute() on a miss."""
+        version = self.dataset_version if dataset_version is None else dataset_version
+        key = make_key(chart_id, version, filter_state)
+
+        while True:
+            with self._lock:
+                if key in self._entries:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return self._entries[key][2]
+                pending = self._pending.get(key)
+                if pending is None:
+                    self.misses += 1
+                    self._pending[key] = threading.Event()
+                    break
+            # Another thread is computing this key; wait and re-check
+            pending.wait()
+
+        try:
+            result = compute()
+            with self._lock:
+                self._store(key, version, chart_id, result)
+            return result
+        finally:
+            with self._lock:
+                self._pending.pop(key).set()
+
+    def _store(self, key, version, chart_id, result):
+        size = estimate_size(result)
+        if size > self.max_bytes:
+            return
+        self._entries[key] = (version, chart_id, result)
+        self._sizes[key] = size
+        self.nbytes += size
+        while len(self._entries) > self.max_entries or self.nbytes > self.max_bytes:
+            self._remove(next(iter(self._entries)))
+            self.evictions += 1
+
+    def _remove(self, key):
+        del self._entries[key]
+        self.nbytes -= self._sizes.pop(key)
+
+    def stats(self):
+        """Return hit/miss/eviction counters and the current footprint."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'nbytes': self.nbytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+            }
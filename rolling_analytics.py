@@ -0,0 +1,283 @@
+"""
+Rolling Incident Analytics
+Incremental rolling-window statistics, hour-of-week baselines and anomaly flags
+"""
+
+from collections import deque
+
+import numpy as np
+import pandas as pd
+
+HOURS_PER_WEEK = 168
+NS_PER_HOUR = 3600 * 10**9
+ALL_GROUP = 'All'
+
+
+def hour_of_week(epoch_hours):
+    """Map epoch hours (UTC) to a Monday-based hour-of-week index (0-167)."""
+    epoch_hours = np.asarray(epoch_hours, dtype=np.int64)
+    # 1970-01-01 was a Thursday, i.e. day 3 of a Monday-based week
+    return ((epoch_hours // 24 + 3) % 7) * 24 + epoch_hours % 24
+
+
+class SeasonalBaseline:
+    """Running mean/variance of an hourly metric for each hour of the week."""
+
+    def __init__(self, min_periods=4):
+        self.min_periods = min_periods
+        self.n = np.zeros(HOURS_PER_WEEK)
+        self.mean = np.zeros(HOURS_PER_WEEK)
+        self.m2 = np.zeros(HOURS_PER_WEEK)
+
+    @property
+    def std(self):
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return np.sqrt(self.m2 / (self.n - 1))
+
+    def expected(self, how):
+        """Return the baseline mean for each hour-of-week index (NaN if too little history)."""
+        expected = self.mean[how].copy()
+        expected[self.n[how] < self.min_periods] = np.nan
+        return expected
+
+    def score(self, how, values):
+        """Return z-scores of values against the baseline for their hour of week."""
+        std = self.std[how]
+        with np.errstate(invalid='ignore', divide='ignore'):
+            z = (values - self.mean[how]) / std
+        z[(self.n[how] < self.min_periods) | ~(std > 0)] = np.nan
+        return z
+
+    def merge(self, how, values):
+        """Fold a batch of observations into the baseline (Chan's parallel update)."""
+        valid = ~np.isnan(values)
+        how, values = how[valid], values[valid]
+        if len(values) == 0:
+            return
+        n_b = np.bincount(how, minlength=HOURS_PER_WEEK).astype(float)
+        sum_b = np.bincount(how, weights=values, minlength=HOURS_PER_WEEK)
+        sumsq_b = np.bincount(how, weights=values ** 2, minlength=HOURS_PER_WEEK)
+        touched = n_b > 0
+        mean_b = np.zeros(HOURS_PER_WEEK)
+        mean_b[touched] = sum_b[touched] / n_b[touched]
+        m2_b = np.maximum(sumsq_b - n_b * mean_b ** 2, 0.0)
+
+        n_a = self.n
+        total = n_a + n_b
+        delta = mean_b - self.mean
+        with np.errstate(invalid='ignore', divide='ignore'):
+            self.mean = np.where(touched, self.mean + delta * n_b / total, self.mean)
+            self.m2 = np.where(touched, self.m2 + m2_b + delta ** 2 * n_a * n_b / total, self.m2)
+        self.n = total
+
+
+class RollingIncidentMonitor:
+    """Incrementally maintained rolling windows and hourly anomaly detection.
+
+    Feed time-sorted batches of incidents through ``update``; each call costs
+    O(batch + window) rather than a rescan of the full history.
+    """
+
+    def __init__(self, window='1h', group_cols=('city', 'incident_main_type'),
+                 method='zscore', threshold=3.0, min_deviation=1.0, ewma_alpha=0.3, min_periods=4,
+                 history_hours=HOURS_PER_WEEK * 2, max_anomalies=1000):
+        if method not in ('zscore', 'ewma'):
+            raise ValueError(f"Unknown anomaly method: {method}")
+        self.window = pd.Timedelta(window)
+        self.group_cols = list(group_cols)
+        self.method = method
+        self.threshold = threshold
+        self.min_deviation = min_deviation
+        self.ewma_alpha = ewma_alpha
+        self.min_periods = min_periods
+
+        self.watermark = None
+        self.late_rows = 0
+        self._window_rows = pd.DataFrame(columns=['ts'] + self.group_cols + ['response_time_minutes'])
+        self._next_hour = None
+        self._pending = pd.DataFrame(columns=['hour', 'city', 'response_time_minutes'])
+        self._baselines = {}
+        self._ewma = {}
+        self._history = {}
+        self.history_hours = history_hours
+        self.anomalies = deque(maxlen=max_anomalies)
+
+    @classmethod
+    def from_frame(cls, df, **kwargs):
+        """Build a monitor from a full historical frame."""
+        monitor = cls(**kwargs)
+        monitor.update(df)
+        return monitor
+
+    def update(self, batch):
+        """Add new incidents and return the anomalies raised by hours they closed."""
+        rows = self._prepare(batch)
+        if rows.empty:
+            return []
+
+        ts_ns = rows['ts'].to_numpy(dtype='datetime64[ns]').astype(np.int64)
+        if self.watermark is not None:
+            late = ts_ns < self.watermark.value - self.window.value
+            self.late_rows += int(late.sum())
+            rows, ts_ns = rows[~late], ts_ns[~late]
+            if rows.empty:
+                return []
+        newest = rows['ts'].iloc[-1]
+        self.watermark = newest if self.watermark is None else max(self.watermark, newest)
+
+        # 1. Rolling window: append and trim everything older than watermark - window
+        window_rows = pd.concat([self._window_rows, rows], ignore_index=True) if len(self._window_rows) else rows
+        window_rows = window_rows.sort_values('ts', kind='stable')
+        cutoff = self.watermark - self.window
+        start = window_rows['ts'].searchsorted(cutoff, side='right')
+        self._window_rows = window_rows.iloc[start:].reset_index(drop=True)
+
+        # 2. Hourly buckets: rows for hours that are still open wait in _pending
+        hours = ts_ns // NS_PER_HOUR
+        if self._next_hour is None:
+            self._next_hour = int(hours.min())
+        open_rows = hours >= self._next_hour
+        self.late_rows += int((~open_rows).sum())
+        pending = pd.DataFrame({
+            'hour': hours[open_rows],
+            'city': rows['city'].to_numpy()[open_rows],
+            'response_time_minutes': rows['response_time_minutes'].to_numpy()[open_rows],
+        })
+        self._pending = pd.concat([self._pending, pending], ignore_index=True) if len(self._pending) else pending
+
+        current_hour = self.watermark.value // NS_PER_HOUR
+        if current_hour > self._next_hour:
+            return self._close_hours(self._next_hour, current_hour)
+        return []
+
+    def _prepare(self, batch):
+        """Select, type and time-sort the columns the monitor needs."""
+        rows = pd.DataFrame({'ts': pd.to_datetime(batch['alarm_datetime'], errors='coerce', utc=True)})
+        for col in dict.fromkeys(self.group_cols + ['city']):
+            rows[col] = batch[col].astype(object).fillna('Unknown').to_numpy()
+        rows['response_time_minutes'] = pd.to_numeric(batch['response_time_minutes'], errors='coerce').to_numpy()
+        rows = rows.dropna(subset=['ts'])
+        return rows.sort_values('ts', kind='stable').reset_index(drop=True)
+
+    def _close_hours(self, first_hour, end_hour):
+        """Aggregate pending rows for completed hours, score them and fold them into the baselines."""
+        pending = self._pending
+        closing = pending['hour'].to_numpy(dtype=np.int64) < end_hour
+        closed, self._pending = pending[closing], pending[~closing].reset_index(drop=True)
+        self._next_hour = end_hour
+
+        hours = np.arange(first_hour, end_hour, dtype=np.int64)
+        groups = {ALL_GROUP: closed}
+        groups.update({city: rows for city, rows in closed.groupby('city', sort=False, observed=True)})
+        groups.update({key: closed.iloc[0:0] for key in self._baselines if key not in groups})
+
+        raised = []
+        for group, rows in groups.items():
+            offset = rows['hour'].to_numpy(dtype=np.int64) - first_hour
+            response = rows['response_time_minutes'].to_numpy(dtype=float)
+            has_response = ~np.isnan(response)
+            counts = np.bincount(offset, minlength=len(hours)).astype(float)
+            response_n = np.bincount(offset[has_response], minlength=len(hours))
+            response_sum = np.bincount(offset[has_response], weights=response[has_response], minlength=len(hours))
+            with np.errstate(invalid='ignore', divide='ignore'):
+                mean_response = np.where(response_n > 0, response_sum / response_n, np.nan)
+            raised.extend(self._score_group(group, hours, {
+                'incident_count': counts,
+                'mean_response_time': mean_response,
+            }))
+        self.anomalies.extend(raised)
+        return raised
+
+    def _score_group(self, group, hours, metrics):
+        """Score closed hours for one group a week at a time, then merge them into its baseline."""
+        baselines = self._baselines.setdefault(
+            group, {metric: SeasonalBaseline(self.min_periods) for metric in metrics})
+        history = self._history.setdefault(group, deque(maxlen=self.history_hours))
+        raised = []
+
+        # Score each week against the weeks before it so a backfill behaves like a live feed
+        for start in range(0, len(hours), HOURS_PER_WEEK):
+            chunk = slice(start, start + HOURS_PER_WEEK)
+            how = hour_of_week(hours[chunk])
+            expected_counts = baselines['incident_count'].expected(how)
+            for metric, values in metrics.items():
+                values = values[chunk]
+                if self.method == 'zscore':
+                    expected = baselines[metric].expected(how)
+                    scores = baselines[metric].score(how, values)
+                else:
+                    expected, scores = self._ewma_scores(group, metric, values)
+                # Sparse hours give large z-scores for tiny deviations, so require both
+                flagged = ((np.abs(np.nan_to_num(scores)) >= self.threshold) &
+                           (np.abs(np.nan_to_num(values - expected)) >= self.min_deviation))
+                for i in np.flatnonzero(flagged):
+                    raised.append({
+                        'hour': pd.Timestamp(int(hours[chunk][i]) * NS_PER_HOUR, tz='UTC'),
+                        'group': group,
+                        'metric': metric,
+                        'value': float(values[i]),
+                        'expected': float(expected[i]),
+                        'score': float(scores[i]),
+                        'method': self.method,
+                    })
+                baselines[metric].merge(how, values)
+            history.extend(zip(hours[chunk], metrics['incident_count'][chunk], expected_counts))
+        return raised
+
+    def _ewma_scores(self, group, metric, values):
+        """Score values against an exponentially weighted mean/variance carried across batches."""
+        state = self._ewma.setdefault((group, metric), {'mean': np.nan, 'var': 0.0, 'n': 0})
+        alpha = self.ewma_alpha
+        expected = np.full(len(values), np.nan)
+        scores = np.full(len(values), np.nan)
+        for i, value in enumerate(values):
+            if np.isnan(value):
+                continue
+            if state['n'] >= self.min_periods:
+                expected[i] = state['mean']
+                if state['var'] > 0:
+                    scores[i] = (value - state['mean']) / np.sqrt(state['var'])
+            if state['n'] == 0:
+                state['mean'] = value
+            else:
+                diff = value - state['mean']
+                state['mean'] += alpha * diff
+                state['var'] = (1 - alpha) * (state['var'] + alpha * diff ** 2)
+            state['n'] += 1
+        return expected, scores
+
+    def rolling_stats(self):
+        """Return incident counts and p90 response time per group over the current window."""
+        grouped = self._window_rows.groupby(self.group_cols, observed=True)['response_time_minutes']
+        stats = pd.DataFrame({
+            'incidents': grouped.size(),
+            'p90_response_time': grouped.quantile(0.9),
+        })
+        return stats.sort_values('incidents', ascending=False)
+
+    def rolling_count(self):
+        """Return the total number of incidents in the current window."""
+        return len(self._window_rows)
+
+    def hourly_history(self, group=ALL_GROUP):
+        """Return recent closed hours for a group with their hour-of-week baseline."""
+        history = pd.DataFrame(list(self._history.get(group, [])), columns=['hour', 'incidents', 'expected'])
+        history['hour'] = pd.to_datetime(history['hour'].astype(np.int64) * NS_PER_HOUR, utc=True)
+        return history
+
+    def seasonal_baseline(self, group=ALL_GROUP, metric='incident_count'):
+        """Return the hour-of-week baseline (mean and std) for a group as a frame."""
+        baseline = self._baselines[group][metric]
+        return pd.DataFrame({
+            'hour_of_week': np.arange(HOURS_PER_WEEK),
+            'samples': baseline.n,
+            'mean': baseline.mean,
+            'std': baseline.std,
+        })
+
+    def recent_anomalies(self, limit=20):
+        """Return the most recent anomalies, newest first."""
+        anomalies = pd.DataFrame(list(self.anomalies))
+        if anomalies.empty:
+            return anomalies
+        return anomalies.sort_values('hour', ascending=False).head(limit).reset_index(drop=True)
@@ -0,0 +1,169 @@
+"""
+Sampling Engine
+Seeded stratified samples and streaming reservoir samples for maps and previews
+"""
+
+import numpy as np
+import pandas as pd
+
+DEFAULT_SEED = 42
+SAMPLE_TIERS = (1_000, 10_000, 100_000)
+STRATA_COLUMNS = ['incident_main_type', 'city']
+
+
+def stratum_ids(df, strata=STRATA_COLUMNS):
+    """Return an integer stratum id per row (missing values form their own strata)."""
+    strata = [col for col in strata if col in df.columns]
+    if not strata or len(df) == 0:
+        return np.zeros(len(df), dtype=np.int64)
+    return df.groupby(strata, observed=True, sort=False, dropna=False).ngroup().to_numpy(dtype=np.int64)
+
+
+def allocate(counts, n, minimum=1):
+    """Split n sample slots across strata proportionally, with at least ``minimum`` per stratum.
+
+    The minimum keeps rare incident types on the map; it is taken from the
+    largest strata, so the total stays n whenever n >= the number of strata.
+    """
+    counts = np.asarray(counts, dtype=np.int64)
+    total = counts.sum()
+    if total <= n:
+        return counts.copy()
+    share = n * counts / total
+    quota = np.minimum(counts, np.maximum(minimum, np.floor(share).astype(np.int64)))
+
+    # Hand out the rounding remainder one slot per stratum per pass, largest fractional share first
+    short = n - quota.sum()
+    while short > 0:
+        order = np.argsort(quota - share, kind='stable')
+        order = order[quota[order] < counts[order]][:short]
+        if not len(order):
+            break
+        quota[order] += 1
+        short -= len(order)
+
+    # Pay for the minimums out of the largest strata, one slot at a time
+    while short < 0:
+        i = int(np.argmax(quota))
+        if quota[i] <= minimum:
+            break
+        quota[i] -= 1
+        short += 1
+    return quota
+
+
+def _stratified_positions(strata, keys, quota):
+    """Row positions holding the ``quota[s]`` smallest keys of each stratum s, in row order."""
+    order = np.lexsort((keys, strata))
+    sorted_strata = strata[order]
+    rank = np.arange(len(order)) - np.searchsorted(sorted_strata, sorted_strata, side='left')
+    return np.sort(order[rank < quota[sorted_strata]])
+
+
+class SampleTiers:
+    """Stable stratified samples of one dataset.
+
+    Every row gets a seeded random key once; a sample of size n takes the
+    smallest keys of each (incident type, city) stratum, so samples are
+    repeatable across reruns, nested across sizes and need no shuffle of the
+    frame. The 1K/10K/100K tiers of the full frame are precomputed.
+    """
+
+    def __init__(self, df, tiers=SAMPLE_TIERS, strata=STRATA_COLUMNS, seed=DEFAULT_SEED):
+        self.df = df
+        self.strata = strata
+        self.seed = seed
+        self.keys = pd.Series(np.random.default_rng(seed).random(len(df)), index=df.index)
+        self._strata = stratum_ids(df, strata)
+        self._counts = np.bincount(self._strata)
+        self.tiers = {n: self._positions(self._strata, self.keys.to_numpy(), self._counts, n) for n in tiers}
+
+    @staticmethod
+    def _positions(strata, keys, counts, n):
+        if len(keys) <= n:
+            return np.arange(len(keys))
+        return _stratified_positions(strata, keys, allocate(counts, n))
+
+    def sample(self, df=None, n=SAMPLE_TIERS[0]):
+        """Return a stratified sample of n rows of the dataset or of a filtered subset of it.
+
+        Subsets (e.g. the dashboard's filtered frame) reuse the dataset's row
+        keys, so the same filters always give the same sample.
+        """
+        if df is None or df is self.df:
+            positions = self.tiers.get(n)
+            if positions is None:
+                positions = self._positions(self._strata, self.keys.to_numpy(), self._counts, n)
+            return self.df.iloc[positions]
+        if len(df) <= n:
+            return df
+        keys = self.keys.reindex(df.index).to_numpy()
+        keys = np.where(np.isnan(keys), np.random.default_rng(self.seed).random(len(df)), keys)
+        strata = stratum_ids(df, self.strata)
+        return df.iloc[self._positions(strata, keys, np.bincount(strata), n)]
+
+
+class ReservoirSampler:
+    """Fixed-size sample of a stream of chunks (e.g. ``pd.read_csv(..., chunksize=...)``).
+
+    Keeps the rows with the smallest seeded random keys, which is a uniform
+    sample of everything seen so far. With ``strata`` it keeps up to n rows
+    per stratum and ``sample`` applies the same allocation as ``SampleTiers``.
+    """
+
+    def __init__(self, n=SAMPLE_TIERS[0], strata=None, seed=DEFAULT_SEED):
+        self.n = n
+        self.strata = strata
+        self.rng = np.random.default_rng(seed)
+        self.rows = None
+        self.keys = np.empty(0)
+        self.labels = np.empty(0, dtype=object)
+        self.counts = {}
+        self.seen = 0
+
+    def _labels(self, chunk):
+        """One string label per row identifying its stratum."""
+        labels = chunk[self.strata[0]].astype(object).astype(str)
+        for col in self.strata[1:]:
+            labels = labels + '\x1f' + chunk[col].astype(object).astype(str)
+        return labels.to_numpy(dtype=object)
+
+    def update(self, chunk):
+        """Fold a chunk into the reservoir."""
+        self.seen += len(chunk)
+        rows = chunk if self.rows is None else pd.concat([self.rows, chunk], ignore_index=True)
+        keys = np.concatenate([self.keys, self.rng.random(len(chunk))])
+
+        if self.strata is None:
+            keep = np.sort(np.argpartition(keys, self.n - 1)[:self.n]) if len(keys) > self.n else np.arange(len(keys))
+        else:
+            chunk_labels = self._labels(chunk)
+            for label, count in pd.Series(chunk_labels).value_counts().items():
+                self.counts[label] = self.counts.get(label, 0) + int(count)
+            self.labels = np.concatenate([self.labels, chunk_labels])
+            strata, uniques = pd.factorize(self.labels)
+            keep = _stratified_positions(strata, keys, np.full(len(uniques), self.n))
+            self.labels = self.labels[keep]
+
+        self.rows = rows.iloc[keep].reset_index(drop=True)
+        self.keys = keys[keep]
+        return self
+
+    def sample(self):
+        """Return the current sample (at most n rows)."""
+        if self.rows is None:
+            return pd.DataFrame()
+        if self.strata is None:
+            return self.rows
+        # Allocate on the stream's full stratum sizes, not the reservoir's
+        strata, uniques = pd.factorize(self.labels)
+        counts = np.array([self.counts[label] for label in uniques], dtype=np.int64)
+        return self.rows.iloc[_stratified_positions(strata, self.keys, allocate(counts, self.n))]
+
+    @classmethod
+    def from_csv(cls, csv_path, n=SAMPLE_TIERS[0], strata=None, seed=DEFAULT_SEED, chunksize=100_000, **read_csv_kwargs):
+        """Sample a CSV in one streaming pass without loading it."""
+        sampler = cls(n, strata, seed)
+        for chunk in pd.read_csv(csv_path, chunksize=chunksize, **read_csv_kwargs):
+            sampler.update(chunk)
+        return sampler
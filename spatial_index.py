@@ -0,0 +1,167 @@
+"""
+Incident Spatial Index
+KD-tree over incident locations for radius, nearest-neighbor and hotspot queries
+"""
+
+import numpy as np
+import pandas as pd
+from scipy.ndimage import gaussian_filter
+from scipy.spatial import cKDTree
+
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_DEGREE_LAT = np.pi * EARTH_RADIUS_KM / 180
+
+
+def to_unit_xyz(lat, lon):
+    """Project latitude/longitude (degrees) onto the unit sphere."""
+    lat = np.radians(np.asarray(lat, dtype=float))
+    lon = np.radians(np.asarray(lon, dtype=float))
+    cos_lat = np.cos(lat)
+    return np.column_stack([cos_lat * np.cos(lon), cos_lat * np.sin(lon), np.sin(lat)])
+
+
+def km_to_chord(km):
+    """Convert a great-circle distance to the straight-line distance on the unit sphere."""
+    return 2 * np.sin(np.asarray(km, dtype=float) / (2 * EARTH_RADIUS_KM))
+
+
+def to_utc_datetime64(ts):
+    """Convert a timestamp (naive treated as UTC) to a numpy datetime64[ns] in UTC."""
+    ts = pd.Timestamp(ts)
+    ts = ts.tz_localize('UTC') if ts.tzinfo is None else ts.tz_convert('UTC')
+    return np.datetime64(ts.value, 'ns')
+
+
+def chord_to_km(chord):
+    """Convert a unit-sphere chord length back to a great-circle distance."""
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.clip(np.asarray(chord, dtype=float) / 2, 0, 1))
+
+
+class IncidentSpatialIndex:
+    """KD-tree over incident coordinates.
+
+    Points are stored as 3D unit vectors, so Euclidean chord distance in the
+    tree is monotonic in haversine distance and radius/k-NN queries are exact.
+    Build it once per dataset load and reuse it for every query.
+    """
+
+    def __init__(self, df, lat_col='latitude', lon_col='longitude', time_col='alarm_datetime'):
+        self.df = df
+        lat = pd.to_numeric(df[lat_col], errors='coerce').to_numpy(dtype=float)
+        lon = pd.to_numeric(df[lon_col], errors='coerce').to_numpy(dtype=float)
+        valid = np.isfinite(lat) & np.isfinite(lon) & (np.abs(lat) <= 90) & (np.abs(lon) <= 180)
+
+        # Row positions (into df) of every point in the tree
+        self.positions = np.flatnonzero(valid)
+        self.lat = lat[valid]
+        self.lon = lon[valid]
+        self.tree = cKDTree(to_unit_xyz(self.lat, self.lon))
+
+        if time_col in df.columns:
+            times = pd.to_datetime(df[time_col], errors='coerce', utc=True)
+            self.times = times.to_numpy(dtype='datetime64[ns]')[valid]
+        else:
+            self.times = None
+
+    def __len__(self):
+        return len(self.positions)
+
+    def _time_mask(self, points, since=None, until=None):
+        """Return a mask over tree points that fall inside [since, until)."""
+        mask = np.ones(len(points), dtype=bool)
+        if self.times is None or (since is None and until is None):
+            return mask
+        times = self.times[points]
+        if since is not None:
+            mask &= times >= to_utc_datetime64(since)
+        if until is not None:
+            mask &= times < to_utc_datetime64(until)
+        return mask
+
+    def _result(self, points, distances_km):
+        """Return the incident rows for tree points with a distance column, nearest first."""
+        order = np.argsort(distances_km, kind='stable')
+        points, distances_km = points[order], distances_km[order]
+        result = self.df.iloc[self.positions[points]].copy()
+        result['distance_km'] = distances_km
+        return result
+
+    def radius_search(self, lat, lon, radius_km, since=None, until=None):
+        """Return incidents within radius_km of a point, optionally limited to a time range."""
+        center = to_unit_xyz([lat], [lon])[0]
+        points = np.asarray(self.tree.query_ball_point(center, km_to_chord(radius_km)), dtype=np.int64)
+        points = points[self._time_mask(points, since, until)]
+        distances = chord_to_km(np.linalg.norm(self.tree.data[points] - center, axis=1))
+        return self._result(points, distances)
+
+    def nearest(self, lat, lon, k=10, since=None, until=None):
+        """Return the k nearest incidents to a point, optionally limited to a time range."""
+        center = to_unit_xyz([lat], [lon])[0]
+        k = min(k, len(self))
+        if k == 0:
+            return self._result(np.array([], dtype=np.int64), np.array([]))
+
+        # Widen the search until enough neighbors pass the time filter
+        n_query = k
+        while True:
+            distances, points = self.tree.query(center, k=n_query)
+            distances, points = np.atleast_1d(distances), np.atleast_1d(points)
+            keep = self._time_mask(points, since, until)
+            if keep.sum() >= k or n_query >= len(self):
+                break
+            n_query = min(n_query * 4, len(self))
+        return self._result(points[keep][:k], chord_to_km(distances[keep][:k]))
+
+    def nearest_to_incident(self, position, k=10, prior_only=True):
+        """Return the k nearest incidents to the incident at a given df row position."""
+        row = self.df.iloc[position]
+        until = row['alarm_datetime'] if prior_only and self.times is not None else None
+        neighbors = self.nearest(row['latitude'], row['longitude'], k=k + 1, until=until)
+        return neighbors[neighbors.index != self.df.index[position]].head(k)
+
+    def density_grid(self, cell_km=0.25, bandwidth_km=0.5, bounds=None, since=None, until=None,
+                     max_cells=1_000_000):
+        """Estimate incident density on a regular lat/lon grid with a Gaussian kernel.
+
+        Bounds default to the 0.5-99.5 percentile box so a few bad coordinates
+        cannot stretch the grid; cells are widened if it would exceed max_cells.
+        Returns (lat_centers, lon_centers, density) where density is in incidents per km².
+        """
+        points = np.arange(len(self))
+        keep = self._time_mask(points, since, until)
+        lat, lon = self.lat[keep], self.lon[keep]
+        if bounds is None:
+            if len(lat):
+                lat_min, lat_max = np.percentile(lat, [0.5, 99.5])
+                lon_min, lon_max = np.percentile(lon, [0.5, 99.5])
+                bounds = (lat_min, lat_max, lon_min, lon_max)
+            else:
+                bounds = (0, 0, 0, 0)
+        lat_min, lat_max, lon_min, lon_max = bounds
+
+        km_per_degree_lon = KM_PER_DEGREE_LAT * np.cos(np.radians((lat_min + lat_max) / 2))
+        height_km = (lat_max - lat_min) * KM_PER_DEGREE_LAT
+        width_km = (lon_max - lon_min) * km_per_degree_lon
+        cell_km = max(cell_km, np.sqrt(height_km * width_km / max_cells))
+        n_lat = max(int(np.ceil(height_km / cell_km)), 1)
+        n_lon = max(int(np.ceil(width_km / cell_km)), 1)
+        counts, lat_edges, lon_edges = np.histogram2d(
+            lat, lon, bins=[n_lat, n_lon], range=[[lat_min, lat_max], [lon_min, lon_max]])
+
+        cell_area = ((lat_edges[1] - lat_edges[0]) * KM_PER_DEGREE_LAT *
+                     (lon_edges[1] - lon_edges[0]) * km_per_degree_lon)
+        density = gaussian_filter(counts, sigma=bandwidth_km / cell_km, mode='constant') / cell_area
+        lat_centers = (lat_edges[:-1] + lat_edges[1:]) / 2
+        lon_centers = (lon_edges[:-1] + lon_edges[1:]) / 2
+        return lat_centers, lon_centers, density
+
+    def hotspots(self, top=10, **grid_kwargs):
+        """Return the densest grid cells as a frame of centers and densities."""
+        lat_centers, lon_centers, density = self.density_grid(**grid_kwargs)
+        flat = np.argsort(density, axis=None)[::-1][:top]
+        rows, cols = np.unravel_index(flat, density.shape)
+        return pd.DataFrame({
+            'latitude': lat_centers[rows],
+            'longitude': lon_centers[cols],
+            'density_per_km2': density[rows, cols],
+        })
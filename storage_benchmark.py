@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+"""
+Storage Format Benchmark
+Compare Parquet codecs, dictionary encoding and row-group sizes for the incident dataset
+"""
+
+import argparse
+import itertools
+import json
+import multiprocessing
+import os
+import resource
+import shutil
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+
+from incident_dataset import IncidentDataset, read_incidents, storage_frame, write_parquet
+
+CODECS = ['none', 'snappy', 'lz4', 'zstd:1', 'zstd:3', 'zstd:9', 'gzip:6']
+ROW_GROUP_SIZES = [16_384, 131_072, 1_048_576]
+# Columns behind the dashboard's default charts
+SUBSET_COLUMNS = ['alarm_datetime', 'city', 'incident_type', 'response_time_minutes']
+
+
+def storage_options(codec, use_dictionary=True, row_group_size=131_072):
+    """Turn 'zstd:3' style codec names into write options for ``write_parquet``."""
+    compression, _, level = codec.partition(':')
+    options = {'compression': compression, 'use_dictionary': use_dictionary, 'row_group_size': row_group_size}
+    if level:
+        options['compression_level'] = int(level)
+    elif compression != 'none':
+        options['compression_level'] = None
+    return options
+
+
+def _rss_mb(field):
+    """Current (VmRSS) or peak (VmHWM) resident memory in MB from /proc, or None."""
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith(field + ':'):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return None
+
+
+def _reset_peak_rss():
+    """Start a new peak resident memory measurement (Linux); returns the resident MB to measure from.
+
+    Elsewhere the process's peak so far is returned, so imports that used
+    more memory than the loads can hide them.
+    """
+    try:
+        with open('/proc/self/clear_refs', 'w') as f:
+            f.write('5')
+        return _rss_mb('VmRSS')
+    except OSError:
+        return _peak_rss_mb()
+
+
+def _peak_rss_mb():
+    peak = _rss_mb('VmHWM')
+    if peak is None:
+        # ru_maxrss is KB on Linux (bytes on macOS)
+        scale = 1024 * 1024 if sys.platform == 'darwin' else 1024
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / scale
+    return peak
+
+
+def measure_loads(path, columns, repeat):
+    """Time full and column-subset loads of one file.
+
+    Runs in a fresh process, so the rise of its peak resident memory over the
+    full loads is the peak memory of decoding this file alone (Arrow buffers
+    plus the pandas conversion).
+    """
+    baseline = _reset_peak_rss()
+    full = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        df = pd.read_parquet(path)
+        full.append(time.perf_counter() - started)
+    peak = _peak_rss_mb() - baseline
+    frame = df.memory_usage(deep=True).sum() / 1024 ** 2
+    del df
+
+    subset = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        pd.read_parquet(path, columns=columns)
+        subset.append(time.perf_counter() - started)
+    return {'full_load_s': min(full), 'subset_load_s': min(subset), 'peak_load_mb': peak, 'frame_mb': frame}
+
+
+def run_benchmark(df, codecs=CODECS, row_group_sizes=ROW_GROUP_SIZES, repeat=3, columns=SUBSET_COLUMNS):
+    """Write the frame with every candidate and measure size, load times and peak memory."""
+    columns = [col for col in columns if col in df.columns]
+    workdir = tempfile.mkdtemp(prefix='storage_benchmark_')
+    results = []
+    try:
+        # Spawned workers start without the benchmark frame in memory
+        context = multiprocessing.get_context('spawn')
+        for codec, use_dictionary, row_group_size in itertools.product(codecs, (True, False), row_group_sizes):
+            options = storage_options(codec, use_dictionary, row_group_size)
+            path = os.path.join(workdir, f"{codec.replace(':', '-')}_{int(use_dictionary)}_{row_group_size}.parquet")
+            started = time.perf_counter()
+            write_parquet(df, path, options)
+            write_s = time.perf_counter() - started
+
+            with ProcessPoolExecutor(max_workers=1, mp_context=context) as pool:
+                loads = pool.submit(measure_loads, path, columns, repeat).result()
+            results.append({
+                'codec': codec, 'use_dictionary': use_dictionary, 'row_group_size': row_group_size,
+                'size_mb': os.path.getsize(path) / 1024 ** 2, 'write_s': write_s, **loads,
+            })
+            os.remove(path)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+    return results
+
+
+def recommend(results, size_slack=0.10):
+    """Pick the fastest full load among candidates within size_slack of the smallest file."""
+    smallest = min(result['size_mb'] for result in results)
+    compact = [result for result in results if result['size_mb'] <= smallest * (1 + size_slack)]
+    best = min(compact, key=lambda result: (result['full_load_s'], result['subset_load_s']))
+    return storage_options(best['codec'], best['use_dictionary'], best['row_group_size']), best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark Parquet storage options on the incidents data.")
+    parser.add_argument('source', help="CSV file or partitioned dataset directory")
+    parser.add_argument('--codecs', nargs='+', default=CODECS, help="e.g. snappy zstd:3 lz4 none")
+    parser.add_argument('--row-group-sizes', nargs='+', type=int, default=ROW_GROUP_SIZES)
+    parser.add_argument('--repeat', type=int, default=3, help="Loads per candidate (best time is kept)")
+    parser.add_argument('--size-slack', type=float, default=0.10,
+                        help="Consider files up to this much larger than the smallest")
+    parser.add_argument('--output', default='storage_benchmark.json')
+    parser.add_argument('--apply', metavar='DATASET_ROOT', help="Save the recommendation as the dataset's storage default")
+    args = parser.parse_args()
+
+    df = storage_frame(read_incidents(args.source))
+    print(f"📦 Benchmarking {len(args.codecs) * 2 * len(args.row_group_sizes)} storage variants "
+          f"on {len(df):,} rows x {len(df.columns)} columns...")
+    results = run_benchmark(df, args.codecs, args.row_group_sizes, args.repeat)
+    options, best = recommend(results, args.size_slack)
+
+    table = pd.DataFrame(results).sort_values(['size_mb', 'full_load_s'])
+    print(table.to_string(index=False, float_format=lambda value: f"{value:.3f}"))
+    print(f"\n🏆 Recommended: {options} ({best['size_mb']:.2f} MB, full load {best['full_load_s'] * 1000:.0f} ms, "
+          f"subset load {best['subset_load_s'] * 1000:.0f} ms)")
+
+    with open(args.output, 'w') as f:
+        json.dump({'rows': len(df), 'results': results, 'recommended': options}, f, indent=2)
+    print(f"📄 Results saved to {args.output}")
+
+    if args.apply:
+        IncidentDataset(args.apply).set_storage(options)
+        print(f"✅ {args.apply} will write new files with {options}")
+
+
+if __name__ == "__main__":
+    main()
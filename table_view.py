@@ -0,0 +1,75 @@
+"""
+Paginated Table View
+Precomputed sort orders and page slicing over filtered incident row positions
+"""
+
+import numpy as np
+import pandas as pd
+
+SORT_COLUMNS = ['alarm_datetime', 'response_time_minutes', 'city']
+PAGE_SIZES = [25, 50, 100, 250, 500]
+
+
+def sort_order(series):
+    """Row positions that sort the column ascending (stable, missing values last)."""
+    values = series.reset_index(drop=True)
+    if isinstance(values.dtype, pd.CategoricalDtype):
+        # Code tables keep first-seen order; sort by the labels instead
+        ranks = np.empty(len(values.cat.categories), dtype=np.int64)
+        ranks[np.argsort(values.cat.categories.astype(str), kind='stable')] = np.arange(len(ranks))
+        codes = values.cat.codes.to_numpy()
+        values = pd.Series(np.where(codes >= 0, ranks[codes], np.nan))
+    return values.sort_values(kind='stable', na_position='last').index.to_numpy()
+
+
+class SortedTableView:
+    """Sortable, paginated view of a dataset and of filtered selections of it.
+
+    Sort orders over the whole dataset are computed once per column (the
+    common ones up front). Ordering a filtered selection is then a mask over
+    the precomputed order rather than a sort, and a page is a slice of the
+    resulting positions, so only the visible rows are ever materialized.
+    """
+
+    def __init__(self, df, sort_columns=SORT_COLUMNS):
+        self.df = df
+        self.orders = {}
+        self.missing = {}
+        for col in sort_columns:
+            if col in df.columns:
+                self._order(col)
+
+    def _order(self, column):
+        if column not in self.orders:
+            self.orders[column] = sort_order(self.df[column])
+            self.missing[column] = self.df[column].isna().to_numpy()
+        return self.orders[column]
+
+    def row_positions(self, selection):
+        """Positions in the dataset of the rows of a filtered frame (which keeps the dataset's index)."""
+        positions = self.df.index.get_indexer(selection.index)
+        return positions[positions >= 0]
+
+    def positions(self, rows=None, sort_by=None, ascending=True):
+        """Positions of the selected rows (all if None) in display order; missing values sort last."""
+        if sort_by is None:
+            return np.arange(len(self.df)) if rows is None else np.sort(rows)
+        order = self._order(sort_by)
+        if rows is not None:
+            selected = np.zeros(len(self.df), dtype=bool)
+            selected[rows] = True
+            order = order[selected[order]]
+        if ascending:
+            return order
+        missing = self.missing[sort_by][order]
+        return np.concatenate([order[~missing][::-1], order[missing]])
+
+    def page(self, positions, page=1, page_size=PAGE_SIZES[2], columns=None):
+        """Rows of one 1-based page of the ordered positions."""
+        start = (page - 1) * page_size
+        frame = self.df.iloc[positions[start:start + page_size]]
+        return frame if columns is None else frame[columns]
+
+    @staticmethod
+    def page_count(positions, page_size):
+        return max(1, -(-len(positions) // page_size))
@@ -0,0 +1,77 @@
+"""
+Column Transport Tests
+Round-trip frames through shared memory and compare them with the original
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from column_transport import SharedFrame, publish, release
+
+
+def round_trip(df):
+    descriptor = publish(df)
+    try:
+        shared = SharedFrame(descriptor)
+        frame = shared.frame.copy()
+        shared.close()
+    finally:
+        release(descriptor)
+    return frame
+
+
+def analyzer_frame():
+    """One column per dtype the analyzer produces, each with missing values where it can hold them."""
+    return pd.DataFrame({
+        'incident_number': pd.array(['FD-1', None, 'FD-3', 'FD-4'], dtype='str'),
+        'address_line_1': ['1 Main', None, '3 Oak', '4 Elm'],
+        'city': pd.Categorical(['Columbia', None, 'Laurel', 'Columbia']),
+        'people_present': [True, False, True, False],
+        'units_responded': np.array([1, 2, 3, 4], dtype=np.int64),
+        'location_id': np.array([0, 1, 2, 0], dtype=np.int32),
+        'geo_flags': np.array([0, 1, 0, 2], dtype=np.uint8),
+        'response_time_minutes': [4.5, np.nan, 7.0, 3.25],
+        'alarm_datetime': pd.to_datetime(['2024-01-01 10:00', None, '2024-01-02 11:30', '2024-01-03 09:15'],
+                                         utc=True).as_unit('us'),
+        'fire_suppression_present': pd.Series([True, np.nan, False, np.nan], dtype=object),
+        'animals_rescued': pd.array([1, None, 1, None], dtype='Int64'),
+        'latitude': pd.array([39.1, None, 39.1, None], dtype='Float64'),
+        'verified': pd.array([True, None, True, None], dtype='boolean'),
+    })
+
+
+def test_round_trip_keeps_every_dtype_and_missing_value():
+    df = analyzer_frame()
+    pd.testing.assert_frame_equal(round_trip(df), df)
+
+
+def test_near_unique_strings_keep_missing_values():
+    df = pd.DataFrame({'address_line_1': ['1 Main', None, '3 Oak', '4 Elm']})
+    result = round_trip(df)['address_line_1']
+    assert result.isna().tolist() == [False, True, False, False]
+    assert result.dropna().tolist() == ['1 Main', '3 Oak', '4 Elm']
+
+
+def test_repetitive_strings_attach_as_categoricals():
+    df = pd.DataFrame({'state': ['MD', None, 'MD', 'MD', 'VA', 'MD']})
+    result = round_trip(df)
+    assert isinstance(result['state'].dtype, pd.CategoricalDtype)
+    pd.testing.assert_series_equal(result['state'].astype(object), df['state'], check_dtype=False)
+
+
+@pytest.mark.parametrize('dtype', ['str', 'Int64', 'Float64', 'boolean'])
+def test_all_missing_column(dtype):
+    df = pd.DataFrame({'value': pd.array([None, None, None], dtype=dtype)})
+    pd.testing.assert_frame_equal(round_trip(df), df)
+
+
+def test_attachments_travel_with_the_frame():
+    df = pd.DataFrame({'location_id': np.array([1, 0, 1], dtype=np.int32)})
+    descriptor = publish(df, attachments={'labels': ['2 OAK AVE', '3 ELM RD']})
+    try:
+        shared = SharedFrame(descriptor)
+        assert shared.attachment('labels') == ['2 OAK AVE', '3 ELM RD']
+        shared.close()
+    finally:
+        release(descriptor)